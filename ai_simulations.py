@@ -1,7 +1,11 @@
 """
 Runs simulations with Player and AIPlayer and compares their performances
+With a time limit, the flat Monte Carlo and the ISMCTS strategies of AIPlayer
+are compared instead, all given the same time per play
 
 Example usage: python3 ai_simuations 2 50
+               python3 ai_simuations 2 50 --time_limit 0.5
+               python3 ai_simuations 2 50 --seed 1
 """
 
 import argparse
@@ -11,17 +15,21 @@ from pokai.game.card import Card
 from pokai.game.game_state import GameState
 from pokai.game.hand import Hand
 from pokai.game.player import Player
-from pokai.ai.aiplayer import AIPlayer
-from pokai.ai.monte_carlo import simulate, simulate_multiprocesses
+from pokai.ai.aiplayer import AIPlayer, FLAT_STRATEGY, ISMCTS_STRATEGY, PARALLEL_ISMCTS_STRATEGY
+from pokai.ai.monte_carlo import simulate, simulate_multiprocesses, use_strength_store, get_rng,\
+                                 get_task_seeds
 
 parser = argparse.ArgumentParser(description='Simulate AI and Player.')
 parser.add_argument("hand_strength", type=int, choices=[1, 2, 3], 
                     help='choose the strength of the starting hand.')
 parser.add_argument("num_simulations", type=int,
                     help='choose the number of simulations.')
-parsed_args = parser.parse_args()
-hand_strength = parsed_args.hand_strength
-num_simulations = parsed_args.num_simulations
+parser.add_argument("--time_limit", type=float, default=None,
+                    help='compare the AI strategies with this many seconds per play.')
+parser.add_argument("--store", type=str, default=None,
+                    help='sqlite file that keeps simulated strengths across runs.')
+parser.add_argument("--seed", type=int, default=None,
+                    help='seed of the deals and the AI estimates, for reproducible runs.')
 
 def time_simulation(simulation):
     def wrapper(*args, **kwargs):
@@ -37,23 +45,46 @@ def time_simulation(simulation):
 
     return wrapper
 
-def setup_game(card_strs):
+def get_seeds(seed, n_seeds):
+    """
+    Returns n_seeds independent seeds drawn from seed, the dealer's and one for each AI,
+    so an AI never samples deals from the stream that dealt the hidden cards
+    Returns None for each without a seed
+    """
+    return get_task_seeds(get_rng(seed), n_seeds)
+
+def setup_game(card_strs, ai_seed=None):
     hand = Hand(Card.strs_to_cards(card_strs))
     print("Starting hand:", hand)
-    aiplayer = AIPlayer(hand, 0, "")
+    aiplayer = AIPlayer(hand, 0, "", seed=ai_seed)
     player = Player(hand, 0, "")
     game_state = GameState(17, 17)
     return aiplayer, player, game_state
 
 @time_simulation
-def simulate_ai_with_cards(card_strs, num_simulations):
-    aiplayer, player, game_state = setup_game(card_strs)
-    player_wins = simulate_multiprocesses(player, num_simulations, game_state, 4)
-    ai_wins = simulate(aiplayer, num_simulations, game_state, display_progress_only=True)
+def simulate_ai_with_cards(card_strs, num_simulations, seed=None):
+    dealer_seed, ai_seed = get_seeds(seed, 2)
+    aiplayer, player, game_state = setup_game(card_strs, ai_seed)
+    player_wins = simulate_multiprocesses(player, num_simulations, game_state, 4, rng=dealer_seed)
+    ai_wins = simulate(aiplayer, num_simulations, game_state, display_progress_only=True, rng=dealer_seed)
     print(player_wins, ai_wins)
     return ai_wins, player_wins
 
-def main(hand, num_simulations):
+def simulate_strategies_with_cards(card_strs, num_simulations, time_limit, seed=None):
+    hand = Hand(Card.strs_to_cards(card_strs))
+    print("Starting hand:", hand)
+    game_state = GameState(17, 17)
+    strategies = [FLAT_STRATEGY, ISMCTS_STRATEGY, PARALLEL_ISMCTS_STRATEGY]
+    dealer_seed, *ai_seeds = get_seeds(seed, len(strategies) + 1)
+    for strategy, ai_seed in zip(strategies, ai_seeds):
+        aiplayer = AIPlayer(hand, 0, "", time_limit=time_limit, strategy=strategy, seed=ai_seed)
+        start = time()
+        # every strategy plays the same deals
+        wins = simulate(aiplayer, num_simulations, game_state, rng=dealer_seed)
+        duration = int(time() - start)
+        print('{} won {} of {} games in {} seconds.'.format(strategy, wins, num_simulations, duration))
+
+def main(hand, num_simulations, time_limit=None, seed=None):
     strength1 = ['7h', '6h', '0d', '3s', '6s', 'Js', '7d', '9c', 'Ac',
                  'Kd', '5h', '2H', '5C', '0C', '0H', '4D', 'KH']
     strength2 = ['3h', '4s', '4h', '5d', '6s', '7c', '9h', '9d', '0c',
@@ -61,7 +92,13 @@ def main(hand, num_simulations):
     strength3 = ['4h', '5d', '6c', '7s', '8s', '0s', '0c', '0d', '0h',
                  'QH', 'QD', 'QS', 'KH', 'KS', 'KD', 'KC', 'AC']
     hands = [strength1, strength2, strength3]
-    simulate_ai_with_cards(hands[hand - 1], num_simulations)
+    if time_limit is None:
+        simulate_ai_with_cards(hands[hand - 1], num_simulations, seed)
+    else:
+        simulate_strategies_with_cards(hands[hand - 1], num_simulations, time_limit, seed)
 
 if __name__ == '__main__':
-    main(hand_strength, num_simulations)
+    parsed_args = parser.parse_args()
+    if parsed_args.store:
+        use_strength_store(parsed_args.store)
+    main(parsed_args.hand_strength, parsed_args.num_simulations, parsed_args.time_limit, parsed_args.seed)
@@ -0,0 +1,81 @@
+"""
+Compares successive halving with the exhaustive estimation of every candidate play.
+Random lead positions are dealt, both methods pick the best lead, and the
+decision agreement and wall time of each method are reported.
+
+Example usage: python3 bandit_benchmark.py 20 --num_cards 8
+"""
+
+import argparse
+from time import time
+
+from pokai.game.game_state import GameState
+from pokai.game.game_tools import get_new_shuffled_deck
+from pokai.game.hand import Hand
+from pokai.game.player import Player
+from pokai.ai.monte_carlo import estimate_play_strengths, estimate_play_strengths_bandit, get_pool,\
+                                 ESTIMATION_SIMULATIONS, BANDIT_SIMULATIONS
+
+parser = argparse.ArgumentParser(description='Benchmark bandit play selection.')
+parser.add_argument("num_positions", type=int,
+                    help='choose the number of random positions.')
+parser.add_argument("--num_cards", type=int, default=8,
+                    help='choose the number of cards each player holds.')
+parser.add_argument("--games", type=int, default=ESTIMATION_SIMULATIONS,
+                    help='choose the number of games per play of the exhaustive method.')
+parser.add_argument("--budget", type=int, default=BANDIT_SIMULATIONS,
+                    help='choose the total number of games per decision of the bandit.')
+
+def deal_position(num_cards):
+    """Returns a player leading with num_cards cards and a game state where every player has num_cards"""
+    deck = get_new_shuffled_deck()
+    player = Player(Hand(deck[0: num_cards]), 0, "")
+    game_state = GameState(20, 17)
+    game_state.used_cards = deck[3 * num_cards:]
+    game_state.player_cards = [num_cards, num_cards, num_cards]
+    game_state.current_turn = 0
+    return player, game_state
+
+def exhaustive_best_play(card_plays, player, game_state, n_games):
+    strengths = estimate_play_strengths(card_plays, player, game_state, n_games=n_games)
+    return max(range(len(card_plays)), key=lambda i: strengths[i])
+
+def bandit_best_play(card_plays, player, game_state, budget):
+    """Returns the index of the best play and the total number of games simulated"""
+    strengths, games = estimate_play_strengths_bandit(card_plays, player, game_state, budget)
+    # the survivor of the last round has the most games
+    return max(range(len(card_plays)), key=lambda i: (games[i], strengths[i])), sum(games)
+
+def main(num_positions, num_cards, games, budget):
+    get_pool()
+    agreements = 0
+    exhaustive_time = bandit_time = 0
+    exhaustive_games = bandit_games = 0
+    for _ in range(num_positions):
+        player, game_state = deal_position(num_cards)
+        card_plays = list(Hand.unique_plays(player.hand.all_legal_plays(None)))
+        for play in card_plays:
+            play.position = player.position
+
+        start = time()
+        exhaustive_index = exhaustive_best_play(card_plays, player, game_state, games)
+        exhaustive_time += time() - start
+        exhaustive_games += games * len(card_plays)
+
+        start = time()
+        bandit_index, n_games = bandit_best_play(card_plays, player, game_state, budget)
+        bandit_time += time() - start
+        bandit_games += n_games
+
+        if bandit_index == exhaustive_index:
+            agreements += 1
+        print('{} candidates, exhaustive: {}, bandit: {}'.format(
+            len(card_plays), card_plays[exhaustive_index], card_plays[bandit_index]))
+
+    print('Decision agreement: {}/{}'.format(agreements, num_positions))
+    print('Exhaustive: {:.2f} seconds, {} games'.format(exhaustive_time, exhaustive_games))
+    print('Bandit: {:.2f} seconds, {} games'.format(bandit_time, bandit_games))
+
+if __name__ == '__main__':
+    parsed_args = parser.parse_args()
+    main(parsed_args.num_positions, parsed_args.num_cards, parsed_args.games, parsed_args.budget)
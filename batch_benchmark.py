@@ -0,0 +1,48 @@
+"""
+Compares the games per second of the batch simulator with simulate.
+A random 20 card hand is dealt to player 0 and both simulators play random deals
+of the other cards from the start of the game. Needs NumPy.
+simulate solves the endgame exactly and the batch simulator does not, so the win
+rates are close but not the same.
+
+Example usage: python3 batch_benchmark.py 20000 --loop_games 1000
+"""
+
+import argparse
+from time import time
+
+import numpy as np
+
+from pokai.ai.batch_simulator import simulate_batch, BATCH_GAMES_PER_SECOND
+from pokai.ai.monte_carlo import simulate
+from pokai.game.game_state import GameState
+from pokai.game.game_tools import get_new_shuffled_deck
+from pokai.game.hand import Hand
+from pokai.game.player import Player
+
+parser = argparse.ArgumentParser(description='Benchmark the batch simulator.')
+parser.add_argument("num_games", type=int,
+                    help='choose the number of games of the batch simulator.')
+parser.add_argument("--loop_games", type=int, default=1000,
+                    help='choose the number of games of simulate.')
+parser.add_argument("--seed", type=int, default=None,
+                    help='choose the seed of the batch deals.')
+
+def main(num_games, loop_games, seed):
+    player = Player(Hand(get_new_shuffled_deck()[0: 20]), 0, "")
+    game_state = GameState(20, 17)
+
+    start = time()
+    loop_wins = simulate(player, loop_games, game_state)
+    loop_rate = loop_games / (time() - start)
+    start = time()
+    batch_wins = simulate_batch(player, num_games, game_state, np.random.default_rng(seed))
+    batch_rate = num_games / (time() - start)
+
+    print('simulate: {:.0f} games per second, {:.1%} won'.format(loop_rate, loop_wins / loop_games))
+    print('simulate_batch: {:.0f} games per second, {:.1%} won, {:.0f}x faster, target {} games per second'
+          .format(batch_rate, batch_wins / num_games, batch_rate / loop_rate, BATCH_GAMES_PER_SECOND))
+
+if __name__ == '__main__':
+    parsed_args = parser.parse_args()
+    main(parsed_args.num_games, parsed_args.loop_games, parsed_args.seed)
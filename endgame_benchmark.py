@@ -0,0 +1,49 @@
+"""
+Measures the endgame solver on random perfect information endgames.
+For each number of remaining cards, random deals are split as evenly as possible
+between the three players and solved with player 0 to lead, starting each
+position from an empty transposition table.
+
+Example usage: python3 endgame_benchmark.py 100 --cards 6 10 14
+"""
+
+import argparse
+from time import time
+
+from pokai.ai.endgame import EndgameSolver, get_counts
+from pokai.game.game_tools import get_new_shuffled_deck
+
+parser = argparse.ArgumentParser(description='Benchmark the endgame solver.')
+parser.add_argument("num_positions", type=int,
+                    help='choose the number of random positions for each number of cards.')
+parser.add_argument("--cards", type=int, nargs='+', default=[6, 10, 14],
+                    help='choose the total numbers of cards left.')
+
+def deal_endgame(num_cards):
+    """Returns the value counts of three hands holding num_cards cards between them"""
+    deck = get_new_shuffled_deck()
+    hands = []
+    start = 0
+    for position in range(3):
+        size = num_cards // 3 + (1 if position < num_cards % 3 else 0)
+        hands.append(get_counts(deck[start: start + size]))
+        start += size
+    return hands
+
+def main(num_positions, all_cards):
+    for num_cards in all_cards:
+        solver = EndgameSolver()
+        wins = 0
+        duration = 0
+        for _ in range(num_positions):
+            hands = deal_endgame(num_cards)
+            solver.table.clear()
+            start = time()
+            wins += solver.solve(hands, 0, None, 0, 0)
+            duration += time() - start
+        print('{} cards: {:.1f} positions per second, {:.0f} nodes per position, {}/{} won by the leader'.format(
+            num_cards, num_positions / duration, solver.nodes / num_positions, wins, num_positions))
+
+if __name__ == '__main__':
+    parsed_args = parser.parse_args()
+    main(parsed_args.num_positions, parsed_args.cards)
@@ -0,0 +1,71 @@
+"""
+Measures how often the forced win check fires in random games.
+Random deals are played out by three fixed-strategy players. Before every decision the
+forced win check runs for the player to move, and a player with a forced win
+follows it, which must make that player go out first.
+
+Example usage: python3 forced_win_benchmark.py 200
+"""
+
+import argparse
+from time import time
+
+from pokai.ai.endgame import get_forced_win, FORCED_WIN_PLAYS
+from pokai.game.game_state import GameState
+from pokai.game.game_tools import get_new_shuffled_deck
+from pokai.game.hand import Hand
+from pokai.game.player import Player
+
+parser = argparse.ArgumentParser(description='Benchmark the forced win check.')
+parser.add_argument("num_games", type=int,
+                    help='choose the number of random games.')
+parser.add_argument("--max_plays", type=int, default=FORCED_WIN_PLAYS,
+                    help='choose the number of unbeatable plays chained before going out.')
+
+def deal_game():
+    """Returns three players holding a random deal and the game state with player 0 to lead"""
+    deck = get_new_shuffled_deck()
+    players = [Player(Hand(deck[0: 20]), 0, ""), Player(Hand(deck[20: 37]), 1, ""),
+               Player(Hand(deck[37:]), 2, "")]
+    return players, GameState(20, 17)
+
+def main(num_games, max_plays):
+    decisions = fired = early = games_fired = won = 0
+    duration = slowest = 0
+    for _ in range(num_games):
+        players, game_state = deal_game()
+        forced_player = None
+        while game_state.game_is_on():
+            turn = game_state.get_current_turn()
+            player = players[turn]
+            start = time()
+            next_play = get_forced_win(player, game_state, max_plays)
+            duration += time() - start
+            slowest = max(slowest, time() - start)
+            decisions += 1
+            if next_play:
+                fired += 1
+                # the forced win needs an unbeatable play before going out
+                early += next_play.num_cards() < player.amount()
+                if forced_player is None:
+                    forced_player = turn
+            else:
+                next_play = player.get_best_play(game_state)
+
+            if next_play:
+                player.play(next_play)
+                game_state.cards_played(next_play)
+            game_state.increment_turn()
+        if forced_player is not None:
+            games_fired += 1
+            won += game_state.get_winner() == forced_player
+    print('{}/{} decisions ({:.1%}) had a forced win, {} of them before the last play'.format(
+        fired, decisions, fired / decisions, early))
+    print('{:.0f} microseconds per check, {:.1f} milliseconds at most'.format(
+        1e6 * duration / decisions, 1e3 * slowest))
+    print('{}/{} games had a forced win, {} won by the first player to have one'.format(
+        games_fired, num_games, won))
+
+if __name__ == '__main__':
+    parsed_args = parser.parse_args()
+    main(parsed_args.num_games, parsed_args.max_plays)
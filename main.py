@@ -12,6 +12,7 @@ import argparse
 from pokai.game.card import Card
 from pokai.game.hand import Hand
 from pokai.ai.aiplayer import AIPlayer
+from pokai.ai.monte_carlo import use_strength_store
 from pokai.game.game_tools import get_new_ordered_deck, remove_from_deck
 from pokai.game.game_state import GameState
 from pokai.game.card_play import Play
@@ -27,10 +28,16 @@ parser.add_argument("player_2_file", type=str,
                     help='filename for player 2 cards.')
 parser.add_argument('-d', '--debug', dest='debug', action='store_true',
                     help="debugs AI performance")
+parser.add_argument('-t', '--time_limit', dest='time_limit', type=float, default=None,
+                    help="seconds the AI may think per play")
+parser.add_argument('-s', '--store', dest='store', type=str, default=None,
+                    help="sqlite file that keeps simulated strengths across runs")
 parsed_args = parser.parse_args()
 player_1_file = parsed_args.player_1_file
 player_2_file = parsed_args.player_2_file
 debug = parsed_args.debug
+time_limit = parsed_args.time_limit
+store = parsed_args.store
 
 def get_cards_from_file(filename):
     """returns a list of cards from file"""
@@ -59,7 +66,7 @@ def init_game():
     hand = get_ai_hand()
     n_cards1 = get_num_cards_1()
     game_state = GameState(hand.num_cards(), n_cards1)
-    ai = AIPlayer(hand, 0, "Computer")
+    ai = AIPlayer(hand, 0, "Computer", time_limit=time_limit)
     if debug:
         print("AI's hand:")
         ai.reveal()
@@ -90,6 +97,8 @@ def on_turn_end(next_play, game_state):
     game_state.increment_turn()
 
 def main():
+    if store:
+        use_strength_store(store)
     game_state, ai = init_game()
 
     while game_state.game_is_on():
@@ -100,6 +109,9 @@ def main():
             print("Computer's turn.")
             next_play = ai.get_best_play(game_state)                
             ai.play(next_play)
+            if debug and time_limit is not None:
+                for play in ai.last_candidates:
+                    print('{} strength {:.3f} after {} rollouts'.format(play, play.strength, play.rollouts))
         else:
             print("Player {}'s turn.".format(turn))
             next_play = prompt_user_for_play(game_state)
@@ -3,9 +3,13 @@ AIPlayer module with AIPlayer class
 """
 
 from copy import deepcopy
+from time import time
 
-from pokai.ai.monte_carlo import get_best_play, estimate_play_strength,\
-                                 estimate_hand_strength
+from pokai.ai.monte_carlo import get_best_play, set_play_strengths, estimate_hand_strength,\
+                                 estimate_play_strengths_anytime, sample_deals, get_rng, EXHAUSTIVE
+from pokai.ai.endgame import get_best_endgame_play, get_forced_win, is_endgame, AI_ENDGAME_CARDS,\
+                             ENDGAME_DEALS, FORCED_WIN_PLAYS
+from pokai.ai.ismcts import ISMCTS, get_best_play_parallel
 
 from pokai.game.card_play import Play
 from pokai.game.hand import Hand
@@ -13,9 +17,16 @@ from pokai.game.game_tools import SINGLES, DOUBLES, TRIPLES, QUADRUPLES, STRAIGH
                                       DOUBLE_STRAIGHTS, ADJ_TRIPLES, DOUBLE_JOKER
 from pokai.game.player import Player
 
+# flat Monte Carlo estimation of each candidate play
+FLAT_STRATEGY = 'flat'
+# information set Monte Carlo tree search
+ISMCTS_STRATEGY = 'ismcts'
+# information set Monte Carlo tree search with one tree per worker process
+PARALLEL_ISMCTS_STRATEGY = 'parallel_ismcts'
+
 class AIPlayer(Player):
 
-    def __init__(self, hand, position, t):
+    def __init__(self, hand, position, t, time_limit=None, strategy=FLAT_STRATEGY, seed=None):
         super(AIPlayer, self).__init__(hand, position, t)
 
         """ Mutable configuration to decide lead play
@@ -24,9 +35,82 @@ class AIPlayer(Player):
                       DOUBLES, SINGLES, QUADRUPLES, DOUBLE_JOKER]
         """
         self.pass_play_significance = 0.05 # will only pass pass play strength is >= best play strength + 0.05
+        self.estimation_method = EXHAUSTIVE # how candidate plays are estimated, see monte_carlo.set_play_strengths
+        self.time_limit = time_limit # seconds per play, None to estimate every candidate fully
+        self.last_candidates = [] # candidates of the last timed play with their strengths and rollouts
+        self.strategy = strategy
+        self.endgame_cards = AI_ENDGAME_CARDS # cards left at which deals are solved exactly, None to never solve
+        self.forced_win_plays = FORCED_WIN_PLAYS # unbeatable plays chained by the forced win check, None to skip it
+        self.rng = get_rng(seed) # random.Random of every estimation, None for the global random stream
+        self.search = ISMCTS(position, rng=self.rng) if strategy == ISMCTS_STRATEGY else None # keeps its tree between plays
 
     def get_hand_strength(self, game_state):
-        return estimate_hand_strength(self, game_state)
+        return estimate_hand_strength(self, game_state, rng=self.rng)
+
+    def get_best_play(self, game_state):
+        """
+        Returns the best play, within time_limit seconds if it is set
+        A play winning whatever the other players hold is returned without estimating,
+        and in the endgame, sampled deals are solved exactly instead
+        With a seed, the plays are reproducible for the number of worker processes,
+        except under a time limit where the number of rollouts depends on timing
+        """
+        if self.forced_win_plays is not None:
+            forced_win = get_forced_win(self, game_state, self.forced_win_plays)
+            if forced_win:
+                return forced_win
+        if is_endgame(game_state, self.endgame_cards):
+            deals = sample_deals(self, game_state, ENDGAME_DEALS, self.rng)
+            return get_best_endgame_play(self, game_state, deals)
+        if self.strategy == ISMCTS_STRATEGY:
+            deadline = None if self.time_limit is None else time() + self.time_limit
+            return self.search.get_best_play(self.hand, game_state, deadline=deadline)
+        if self.strategy == PARALLEL_ISMCTS_STRATEGY:
+            deadline = None if self.time_limit is None else time() + self.time_limit
+            return get_best_play_parallel(self.hand, game_state, self.position, deadline=deadline,
+                                          rng=self.rng)
+        if self.time_limit is None:
+            return super(AIPlayer, self).get_best_play(game_state)
+        return self.get_best_play_before(game_state, time() + self.time_limit)
+
+    def get_best_play_before(self, game_state, deadline):
+        """
+        Estimates every legal play and passing until deadline and returns the best one.
+        The play of the fixed strategy Player is returned if no rollout finished in time.
+        deadline -- time.time() by which the play should be chosen
+        """
+        prev_play = game_state.prev_play
+        leading = not prev_play or prev_play.position == self.position
+        candidates = list(Hand.unique_plays(self.hand.all_legal_plays(None if leading else prev_play)))
+        pass_play = Play.get_pass_play(position=self.position)
+        if not leading:
+            candidates.append(pass_play)
+        for play in candidates:
+            play.position = self.position
+        self.last_candidates = candidates
+        if len(candidates) == 1:
+            return candidates[0]
+
+        strengths, n_games = estimate_play_strengths_anytime(candidates, self, game_state, deadline,
+                                                             rng=self.rng)
+        if not n_games:
+            return Player(self.hand, self.position, self.name).get_best_play(game_state)
+        for play, strength in zip(candidates, strengths):
+            play.strength = strength
+            play.rollouts = n_games
+
+        best_play = max(filter(lambda play: play, candidates), key=lambda play: play.strength)
+        # will only pass if pass play strength is >= best play strength + significance
+        if not leading and best_play.strength < pass_play.strength - self.pass_play_significance:
+            return pass_play
+        return best_play
+
+    def _get_best_play(self, card_plays, game_state):
+        """
+        Gets the best play of card_plays, simulating each suit free equivalence class once
+        """
+        return get_best_play(Hand.unique_plays(card_plays), self, game_state,
+                             method=self.estimation_method, rng=self.rng)
 
     def _get_best_singular_basic(self, game_state, each_count):
         """
@@ -36,7 +120,7 @@ class AIPlayer(Player):
         prev_play = game_state.prev_play
         base_card = None if not prev_play else prev_play.get_base_card()
         possible_plays = self.hand.generate_possible_basics(base_card, each_count)
-        return get_best_play(possible_plays, self, game_state)
+        return self._get_best_play(possible_plays, game_state)
 
     def _get_best_play_with_extra(self, game_state, base_play, extra_count, extra_each_count):
         """
@@ -55,7 +139,7 @@ class AIPlayer(Player):
         possible_extras = self.hand.generate_possible_extra_cards(base_play.cards, extra_each_count, extra_count)
         possible_plays = [Play(self.position, base_play.cards + extra, prev_play.num_extra, prev_play.play_type)\
                           for extra in possible_extras]
-        return get_best_play(possible_plays, self, game_state)
+        return self._get_best_play(possible_plays, game_state)
 
     def _get_best_quad_with_extra(self, game_state):
         """
@@ -67,11 +151,13 @@ class AIPlayer(Player):
         extra_each_count = game_state.prev_play.num_extra // 2
         base_card = None if not prev_play else prev_play.get_base_card()
         possible_quads = self.hand.generate_possible_basics(base_card, 4)
-        best_quads_with_extras = []
+        best_play = Play.get_pass_play(position=self.position)
         for quad in possible_quads:
+            # the extras of each quad are already estimated, so the strengths can be compared
             best_quad = self._get_best_play_with_extra(game_state, quad, 2, extra_each_count)
-            best_quads_with_extras.append(best_quad)
-        return get_best_play(best_quads_with_extras, self, game_state)
+            if not best_play or best_quad.strength > best_play.strength:
+                best_play = best_quad
+        return best_play
 
     def _get_best_singular_straight(self, game_state, each_count):
         """
@@ -83,28 +169,28 @@ class AIPlayer(Player):
         base_card = None if not prev_play else prev_play.get_base_card()
         base_length = -1 if not prev_play else prev_play.num_base_cards() // each_count
         possible_plays = self.hand.generate_possible_straights(base_card, each_count, base_length)
-        return get_best_play(possible_plays, self, game_state)
+        return self._get_best_play(possible_plays, game_state)
 
-    def include_wild_play(get_best_specific_play):
-        def wrapper(self, game_state):
-            play = get_best_specific_play(self, game_state)
-            wild_play = self.get_best_wild(game_state)
-            if wild_play.strength > play.strength:
-                return wild_play
-            return play
-        return wrapper
-
-    def include_pass_play(get_best_specific_play):
+    def include_wild_and_pass_play(get_best_specific_play):
+        """
+        Compares the best specific play with the wild plays and passing.
+        The wild plays and the pass play are estimated together in one batch.
+        """
         def wrapper(self, game_state):
             best_play = get_best_specific_play(self, game_state)
-            if best_play:
-                pass_play_strength = estimate_play_strength(None, self, game_state)
-
-                if best_play.strength < pass_play_strength - self.pass_play_significance:
-                    pass_play = Play.get_pass_play(position=self.position)
-                    pass_play.strength = pass_play_strength
-                    return pass_play
-            
+            wild_plays = list(Hand.unique_plays(self._generate_wild_plays(game_state)))
+            pass_play = Play.get_pass_play(position=self.position)
+            candidates = wild_plays + ([pass_play] if best_play else [])
+            set_play_strengths(candidates, self, game_state, self.estimation_method, self.rng)
+
+            # will only pass if pass play strength is >= best play strength + significance
+            if best_play and best_play.strength < pass_play.strength - self.pass_play_significance:
+                best_play = pass_play
+
+            if wild_plays:
+                wild_play = max(wild_plays, key=lambda play: play.strength)
+                if wild_play.strength > best_play.strength:
+                    return wild_play
             return best_play
         return wrapper
 
@@ -114,20 +200,17 @@ class AIPlayer(Player):
         Returns lead play
         """
         possible_leads = self.get_possible_leads(game_state)
-        return get_best_play(possible_leads, self, game_state)
+        return self._get_best_play(possible_leads, game_state)
 
-    @include_wild_play
-    @include_pass_play
+    @include_wild_and_pass_play
     def get_best_singles(self, game_state):
         return self._get_best_singular_basic(game_state, 1)
 
-    @include_wild_play
-    @include_pass_play
+    @include_wild_and_pass_play
     def get_best_doubles(self, game_state):
         return self._get_best_singular_basic(game_state, 2)
 
-    @include_wild_play
-    @include_pass_play
+    @include_wild_and_pass_play
     def get_best_triples(self, game_state):
         best_play = self._get_best_singular_basic(game_state, 3)
         if not best_play:
@@ -135,18 +218,15 @@ class AIPlayer(Player):
         extra_each_count = game_state.prev_play.num_extra
         return self._get_best_play_with_extra(game_state, best_play, 1, extra_each_count)
 
-    @include_wild_play
-    @include_pass_play
+    @include_wild_and_pass_play
     def get_best_straights(self, game_state):
         return self._get_best_singular_straight(game_state, 1)
 
-    @include_wild_play
-    @include_pass_play
+    @include_wild_and_pass_play
     def get_best_double_straights(self, game_state):
         return self._get_best_singular_straight(game_state, 2)
 
-    @include_wild_play
-    @include_pass_play
+    @include_wild_and_pass_play
     def get_best_adj_triples(self, game_state):
         best_play = self._get_best_singular_straight(game_state, 3)
         if not best_play:
@@ -154,8 +234,7 @@ class AIPlayer(Player):
         extra_each_count = game_state.prev_play.num_extra // 2
         return self._get_best_play_with_extra(game_state, best_play, 2, extra_each_count)
 
-    @include_wild_play
-    @include_pass_play
+    @include_wild_and_pass_play
     def get_best_quad(self, game_state):
         prev_play = game_state.prev_play
         if not prev_play.num_extra:
@@ -163,11 +242,14 @@ class AIPlayer(Player):
         else:
             return self._get_best_quad_with_extra(game_state)
        
-    def get_best_wild(self, game_state):
+    def _generate_wild_plays(self, game_state):
+        """Returns an iterator of the wild plays that can beat the previous play"""
         prev_play = game_state.prev_play
         if not prev_play:
             base_card = None
         else:
             base_card = prev_play.get_base_card() if prev_play.is_wild() else None
-        possible_plays = self.hand.generate_possible_wilds(base_card)
-        return get_best_play(possible_plays, self, game_state)
+        return self.hand.generate_possible_wilds(base_card)
+
+    def get_best_wild(self, game_state):
+        return self._get_best_play(self._generate_wild_plays(game_state), game_state)
@@ -0,0 +1,295 @@
+"""
+Batch simulator module.
+Plays thousands of games of the fixed strategy Player at once with NumPy.
+
+Every game is a row of rank histograms, one per player, held as the level masks
+of move_generator with one integer per game and level. At each step every game
+still on makes the play Player.get_best_play would, found with array operations
+over all games at once: the first of Player.generate_possible_leads when leading,
+otherwise the lowest play beating the previous play or, failing that, the lowest
+wild. Games are played in lockstep until all finish, without the endgame solver.
+
+simulate, simulate_deal and fast_rollout.play_deal solve the last ENDGAME_CARDS
+cards exactly instead of playing them with the fixed strategy, so their win rates
+are not comparable with the batch win rates. They match simulate_one_game with
+endgame_cards=None.
+
+NumPy is only needed by this module.
+"""
+
+import numpy as np
+
+from pokai.game.card import MAX_VALUE, SMALL_JOKER_VALUE, BIG_JOKER_VALUE
+from pokai.game.card_set import CardSet
+from pokai.game.game_tools import NUM_PLAYERS, SINGLES, DOUBLES, TRIPLES, QUADRUPLES, STRAIGHTS,\
+                                  DOUBLE_STRAIGHTS, ADJ_TRIPLES, DOUBLE_JOKER
+from pokai.game.move_generator import STRAIGHT_TERMINAL_VAL, SMALLEST_STRAIGHT, EACH_COUNT,\
+                                      get_play_signature
+
+# throughput simulate_batch is expected to reach, in games per second on one core
+BATCH_GAMES_PER_SECOND = 50000
+
+NUM_VALUES = MAX_VALUE + 1
+VALUES = np.arange(NUM_VALUES)
+# play types are held as their index in PLAY_TYPES, NO_PLAY for a pass or no play
+PLAY_TYPES = [SINGLES, DOUBLES, TRIPLES, QUADRUPLES, STRAIGHTS, DOUBLE_STRAIGHTS,
+              ADJ_TRIPLES, DOUBLE_JOKER]
+PLAY_CODES = {play_type: code for code, play_type in enumerate(PLAY_TYPES)}
+NO_PLAY = -1
+EACH_COUNTS = np.array([EACH_COUNT[play_type] for play_type in PLAY_TYPES])
+
+def get_counts_array(hands):
+    """Returns the rank histograms of hands, a list of Hand, CardSet or cards, as an array"""
+    counts = []
+    for hand in hands:
+        if hasattr(hand, 'get_card_set'):
+            hand = hand.get_card_set()
+        counts.append(CardSet.from_cards(hand).get_value_counts())
+    return np.array(counts, dtype=np.int8)
+
+def deal_batch(player, game_state, n_games, rng=None):
+    """
+    Returns the rank histograms of n_games random deals of the unrevealed cards, an array
+    of shape (n_games, 3, values) holding player's hand, the next player's and the
+    following player's, like simulate_deal
+    rng -- numpy Generator the deals are drawn from, a fresh one if None
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    known_cards = player.hand.get_card_set().union(game_state.used_card_set)
+    unrevealed = np.array([card.value for card in CardSet.full_deck().difference(known_cards)])
+    n_cards1 = game_state.get_player_num_cards((player.position + 1) % NUM_PLAYERS)
+    shuffled = unrevealed[rng.random((n_games, len(unrevealed))).argsort(axis=1)[:, 0: n_cards1]]
+
+    counts = np.zeros((n_games, NUM_PLAYERS, NUM_VALUES), dtype=np.int8)
+    counts[:, 0] = get_counts_array([player.hand])[0]
+    counts[:, 1] = (shuffled[:, :, None] == VALUES).sum(axis=1)
+    counts[:, 2] = np.bincount(unrevealed, minlength=NUM_VALUES) - counts[:, 1]
+    return counts
+
+def _get_lowest_bits():
+    """Returns the table of the lowest set bit of every value mask, NO_PLAY for none"""
+    masks = np.arange(1 << NUM_VALUES)
+    lowest = masks & -masks
+    return np.where(masks == 0, NO_PLAY, np.log2(np.maximum(lowest, 1)).astype(np.int32))
+
+# LOWEST_BITS[mask] -- the lowest value of mask, POPCOUNTS[mask] -- the number of values of mask
+LOWEST_BITS = _get_lowest_bits()
+POPCOUNTS = np.array([bin(mask).count('1') for mask in range(1 << NUM_VALUES)], dtype=np.int32)
+VALUE_BITS = (1 << VALUES).astype(np.int32)
+ALL_VALUES_MASK = (1 << NUM_VALUES) - 1
+STRAIGHT_VALUES_MASK = (1 << (STRAIGHT_TERMINAL_VAL + 1)) - 1
+DOUBLE_JOKER_MASK = 1 << SMALL_JOKER_VALUE | 1 << BIG_JOKER_VALUE
+
+def _get_above(base):
+    """Returns the mask of the values strictly greater than base in each row"""
+    return ALL_VALUES_MASK & ~((1 << (base + 1)) - 1)
+
+def _get_window(base, length):
+    """Returns the mask of the values base .. base + length - 1 in each row, 0 for no base"""
+    return np.where(base >= 0, ((1 << length) - 1) << np.maximum(base, 0), 0)
+
+def _get_window_starts(mask, length):
+    """Returns the mask of the values that start length consecutive values of mask in each row"""
+    starts = mask
+    for k in range(1, int(np.max(length, initial=1))):
+        starts = starts & np.where(k < length, mask >> k, ALL_VALUES_MASK)
+    return starts
+
+def _get_kicker_shape(play_type, num_extra):
+    """Returns the kicker (each_count, num_groups) of each row, see move_generator"""
+    triples = play_type == PLAY_CODES[TRIPLES]
+    each_count = np.where(triples, num_extra, num_extra // 2)
+    return each_count, np.where(num_extra == 0, 0, np.where(triples, 1, 2))
+
+def _get_lowest_with_kickers(starts, width, masks, each_count, num_groups):
+    """
+    Returns the lowest start of starts that leaves enough kickers and the kicker mask,
+    the lowest num_groups values held each_count times outside the width values of the start
+    """
+    candidates = np.where(each_count == 1, masks[0], np.where(each_count == 2, masks[1], 0))
+    left = POPCOUNTS[candidates] - num_groups
+    # a start leaves enough kickers unless its own values are among the last candidates
+    if width == 1:
+        allowed = np.where(left >= 1, starts, np.where(left == 0, starts & ~candidates, 0))
+    else:
+        allowed = np.where(left >= 2, starts,
+                           np.where(left == 1, starts & ~(candidates & candidates >> 1),
+                                    np.where(left == 0, starts & ~(candidates | candidates >> 1), 0)))
+    base = LOWEST_BITS[allowed]
+    free = candidates & ~_get_window(base, width)
+    first = free & -free
+    rest = free ^ first
+    kickers = np.where(num_groups >= 1, first, 0) | np.where(num_groups >= 2, rest & -rest, 0)
+    return base, kickers
+
+class _Choice(object):
+    """The play chosen in each row, filled in order of preference"""
+
+    def __init__(self, n_rows):
+        self.play_type = np.full(n_rows, NO_PLAY, dtype=np.int32)
+        self.base = np.zeros(n_rows, dtype=np.int32)
+        self.length = np.zeros(n_rows, dtype=np.int32)
+        self.kickers = np.zeros(n_rows, dtype=np.int32)
+        self.kicker_count = np.zeros(n_rows, dtype=np.int32)
+
+    def take(self, rows, play_type, base, length, kickers=0, kicker_count=0):
+        """Chooses the play in rows that have none yet and where base is a value"""
+        rows = rows & (self.play_type == NO_PLAY) & (base >= 0)
+        self.play_type = np.where(rows, PLAY_CODES[play_type], self.play_type)
+        self.base = np.where(rows, base, self.base)
+        self.length = np.where(rows, length, self.length)
+        self.kickers = np.where(rows, kickers, self.kickers)
+        self.kicker_count = np.where(rows, kicker_count, self.kicker_count)
+
+    def update(self, rows, other):
+        """Copies the plays of other, the choice of the rows of indices rows"""
+        self.play_type[rows] = other.play_type
+        self.base[rows] = other.base
+        self.length[rows] = other.length
+        self.kickers[rows] = other.kickers
+        self.kicker_count[rows] = other.kicker_count
+
+def _choose_leads(choice, rows, masks, adj_starts):
+    """Chooses the first possible lead of Player.generate_possible_leads"""
+    n_rows = len(rows)
+    for each_count, num_groups in [(1, 2), (2, 2), (0, 0)]:
+        each_count = np.full(n_rows, each_count, dtype=np.int32)
+        base, kickers = _get_lowest_with_kickers(adj_starts, 2, masks, each_count,
+                                                 np.full(n_rows, num_groups, dtype=np.int32))
+        choice.take(rows, ADJ_TRIPLES, base, 2, kickers, each_count)
+    for each_count in [2, 1]:
+        mask = masks[each_count - 1] & STRAIGHT_VALUES_MASK
+        # the lowest window of the smallest length starts the first run that is long enough
+        base = LOWEST_BITS[_get_window_starts(mask, SMALLEST_STRAIGHT[each_count - 1])]
+        run = mask & ~((1 << np.maximum(base, 0)) - 1)
+        length = LOWEST_BITS[(run + (1 << np.maximum(base, 0))) & ~run] - base
+        choice.take(rows, STRAIGHTS if each_count == 1 else DOUBLE_STRAIGHTS, base, length)
+    for num_extra in [2, 1, 0]:
+        each_count = np.full(n_rows, num_extra, dtype=np.int32)
+        base, kickers = _get_lowest_with_kickers(masks[2], 1, masks, each_count,
+                                                 np.full(n_rows, 1 if num_extra else 0, dtype=np.int32))
+        choice.take(rows, TRIPLES, base, 1, kickers, each_count)
+    choice.take(rows, DOUBLES, LOWEST_BITS[masks[1]], 1)
+    choice.take(rows, SINGLES, LOWEST_BITS[masks[0]], 1)
+
+def _choose_follows(choice, rows, masks, adj_starts, prev_type, prev_base, prev_length, prev_extra):
+    """Chooses the lowest play beating the previous play, or the lowest wild"""
+    above = _get_above(prev_base)
+    each_count, num_groups = _get_kicker_shape(prev_type, prev_extra)
+    following = {play_type: rows & (prev_type == PLAY_CODES[play_type]) for play_type in PLAY_TYPES}
+
+    choice.take(following[SINGLES], SINGLES, LOWEST_BITS[masks[0] & above], 1)
+    choice.take(following[DOUBLES], DOUBLES, LOWEST_BITS[masks[1] & above], 1)
+    for play_type, starts, width in [(TRIPLES, masks[2], 1), (QUADRUPLES, masks[3], 1),
+                                     (ADJ_TRIPLES, adj_starts, 2)]:
+        if following[play_type].any():
+            base, kickers = _get_lowest_with_kickers(starts & above, width, masks, each_count, num_groups)
+            choice.take(following[play_type], play_type, base, width, kickers, each_count)
+    for play_type, mask in [(STRAIGHTS, masks[0]), (DOUBLE_STRAIGHTS, masks[1])]:
+        if following[play_type].any():
+            length = np.where(following[play_type], prev_length, 1)
+            starts = _get_window_starts(mask & STRAIGHT_VALUES_MASK, length)
+            choice.take(following[play_type], play_type, LOWEST_BITS[starts & above], prev_length)
+
+    # only plays that are not wild fall back to the lowest wild
+    wild = following[DOUBLE_JOKER] | (following[QUADRUPLES] & (prev_extra == 0))
+    fallback = rows & ~wild
+    choice.take(fallback, QUADRUPLES, LOWEST_BITS[masks[3]], 1)
+    double_joker = masks[0] & DOUBLE_JOKER_MASK == DOUBLE_JOKER_MASK
+    choice.take(fallback, DOUBLE_JOKER, np.where(double_joker, SMALL_JOKER_VALUE, NO_PLAY), 2)
+
+def _remove_values(masks, removed):
+    """
+    Returns the level masks of hands after removing cards
+    masks -- the level masks of the hands
+    removed -- removed[k] is the mask of the values of which k cards are removed
+    """
+    kept = ~(removed[1] | removed[2] | removed[3] | removed[4])
+    return [(masks[level] & kept) |
+            np.bitwise_or.reduce([removed[k] & masks[level + k] for k in range(1, len(masks) - level)]
+                                 + [np.zeros_like(kept)])
+            for level in range(len(masks))]
+
+def play_batch(counts, game_state):
+    """
+    Plays out every game of counts with the fixed strategy Player
+    counts -- array of shape (n_games, 3, values) of the rank histogram of each player
+    game_state -- the turn and previous play every game starts from
+    Returns the array of the winner of each game
+    """
+    n_games = len(counts)
+    winners = np.full(n_games, NO_PLAY, dtype=np.int32)
+    turn = np.full(n_games, game_state.current_turn, dtype=np.int32)
+    prev_play = game_state.prev_play
+    prev_type = np.full(n_games, NO_PLAY, dtype=np.int32)
+    prev_base = np.zeros(n_games, dtype=np.int32)
+    prev_length = np.zeros(n_games, dtype=np.int32)
+    prev_extra = np.zeros(n_games, dtype=np.int32)
+    owner = np.full(n_games, NO_PLAY, dtype=np.int32)
+    if prev_play:
+        play_type, base, length, num_extra = get_play_signature(prev_play)
+        prev_type[:] = PLAY_CODES[play_type]
+        prev_base[:], prev_length[:], prev_extra[:] = base, length, num_extra
+        owner[:] = prev_play.position
+    # the histograms are held as level masks, bit v of levels[:, :, i] is set when
+    # the player has more than i cards of value v
+    levels = np.stack([(counts > level) @ VALUE_BITS for level in range(4)], axis=2)
+    # games already over
+    finished = (levels[:, :, 0] == 0).any(axis=1)
+    winners[finished] = (levels[finished, :, 0] == 0).argmax(axis=1)
+
+    games = np.flatnonzero(winners == NO_PLAY)
+    while len(games):
+        players = turn[games]
+        masks = list(levels[games, players].T)
+        exact_triples = masks[2] & ~masks[3]
+        adj_starts = exact_triples & exact_triples >> 1
+
+        leading = (prev_type[games] == NO_PLAY) | (owner[games] == players)
+        # plays are chosen on the leading and the following games apart
+        choice = _Choice(len(games))
+        for rows in [np.flatnonzero(leading), np.flatnonzero(~leading)]:
+            if not len(rows):
+                continue
+            row_masks = [mask[rows] for mask in masks]
+            row_adj_starts = adj_starts[rows]
+            row_choice = _Choice(len(rows))
+            all_rows = np.ones(len(rows), dtype=bool)
+            if leading[rows[0]]:
+                _choose_leads(row_choice, all_rows, row_masks, row_adj_starts)
+            else:
+                row_games = games[rows]
+                _choose_follows(row_choice, all_rows, row_masks, row_adj_starts, prev_type[row_games],
+                                prev_base[row_games], prev_length[row_games], prev_extra[row_games])
+            choice.update(rows, row_choice)
+
+        played = choice.play_type != NO_PLAY
+        base_values = _get_window(choice.base, choice.length)
+        each_count = EACH_COUNTS[choice.play_type]
+        removed = [np.where(played & (each_count == k), base_values, 0) |
+                   np.where(played & (choice.kicker_count == k), choice.kickers, 0) for k in range(5)]
+        masks = _remove_values(masks, removed)
+        levels[games, players] = np.stack(masks, axis=1)
+
+        moved = games[played]
+        prev_type[moved] = choice.play_type[played]
+        prev_base[moved] = choice.base[played]
+        prev_length[moved] = choice.length[played]
+        prev_extra[moved] = (POPCOUNTS[choice.kickers] * choice.kicker_count)[played]
+        owner[moved] = players[played]
+        out = played & (masks[0] == 0)
+        winners[games[out]] = players[out]
+        turn[games] = (players + 1) % NUM_PLAYERS
+        games = games[~out]
+    return winners
+
+def simulate_batch(player, n_games, game_state, rng=None):
+    """
+    Simulates n_games random games of player at once, like simulate without the endgame solver
+    The fixed strategy plays every game to the end, so the wins are not comparable with
+    simulate, which solves the last ENDGAME_CARDS cards exactly
+    rng -- numpy Generator the deals are drawn from, a fresh one if None
+    Returns number of wins
+    """
+    winners = play_batch(deal_batch(player, game_state, n_games, rng), game_state)
+    return int((winners == 0).sum())
@@ -0,0 +1,236 @@
+"""
+Endgame module.
+Exact solver of perfect information endgames.
+
+The player solved for wins by going out first and the two other players play
+together against it, so every position is either won or lost. The solver is a
+depth first AND/OR search that stops at the first move proving the outcome, the
+boolean form of alpha-beta, with a transposition table of solved positions and
+move ordering that tries the plays shedding the most cards first.
+Hands are suit free value count tuples and moves come from move_generator.
+
+get_forced_win is a cheap check, needing no deal, for plays that win whatever
+the other players hold.
+"""
+
+from functools import lru_cache
+
+from pokai.game.card_play import Play
+from pokai.game.card import SMALL_JOKER_VALUE, BIG_JOKER_VALUE
+from pokai.game.card_set import CardSet
+from pokai.game.game_tools import NUM_PLAYERS, QUADRUPLES, DOUBLE_JOKER
+from pokai.game.move_generator import get_legal_moves, get_move_signature, get_move_values,\
+                                      get_play_signature
+
+# total number of cards left at or below which simulated games are solved exactly
+ENDGAME_CARDS = 8
+# total number of cards left at or below which AIPlayer solves its deals exactly
+AI_ENDGAME_CARDS = 14
+# deals an AIPlayer solves for each candidate play
+ENDGAME_DEALS = 20
+# solved positions kept before the transposition table is cleared
+TRANSPOSITION_TABLE_SIZE = 2 ** 20
+ORDERED_MOVES_CACHE_SIZE = 2 ** 16
+# unbeatable plays get_forced_win chains before going out
+FORCED_WIN_PLAYS = 2
+
+def get_counts(cards):
+    """Returns the value count tuple of cards, a Hand, CardSet or list of cards"""
+    if hasattr(cards, 'get_card_set'):
+        cards = cards.get_card_set()
+    return tuple(CardSet.from_cards(cards).get_value_counts())
+
+@lru_cache(maxsize=ORDERED_MOVES_CACHE_SIZE)
+def get_ordered_moves(counts, signature):
+    """
+    Returns (move, counts after the move, signature of the move) of every legal move,
+    the moves that shed the most cards first and the wild plays last among equals
+    """
+    children = []
+    for move in get_legal_moves(counts, signature):
+        remaining = list(counts)
+        for value in get_move_values(move):
+            remaining[value] -= 1
+        children.append((move, tuple(remaining), get_move_signature(move)))
+    children.sort(key=lambda child: (-len(get_move_values(child[0])),
+                                     child[0].play_type in (QUADRUPLES, DOUBLE_JOKER)
+                                     and not child[0].kickers))
+    return tuple(children)
+
+@lru_cache(maxsize=ORDERED_MOVES_CACHE_SIZE)
+def can_beat(counts, signature, max_cards):
+    """
+    Returns true if some play of at most max_cards of the cards with value counts counts
+    beats the play with signature, so false means no hand drawn from them can
+    """
+    play_type = signature[0]
+    # a rocket or a bomb the other players can hold beats every basic play
+    if play_type != DOUBLE_JOKER and counts[SMALL_JOKER_VALUE] and counts[BIG_JOKER_VALUE] and max_cards >= 2:
+        return True
+    if play_type != QUADRUPLES and play_type != DOUBLE_JOKER and 4 in counts and max_cards >= 4:
+        return True
+    return any(len(get_move_values(move)) <= max_cards for move in get_legal_moves(counts, signature))
+
+def find_forced_win(counts, signature, unrevealed, max_cards, max_plays):
+    """
+    Returns the first move of a forced win of the hand with value counts counts, or None:
+    a move shedding every card, or a move no hand of at most max_cards of the unrevealed
+    value counts can beat followed by a forced win of the rest within max_plays such moves
+    signature -- play signature of the play to beat, None when leading
+    """
+    moves = get_legal_moves(counts, signature)
+    num_cards = sum(counts)
+    for move in moves:
+        if len(get_move_values(move)) == num_cards:
+            return move
+    if not max_plays:
+        return None
+    for move in moves:
+        if not can_beat(unrevealed, get_move_signature(move), max_cards):
+            remaining = list(counts)
+            for value in get_move_values(move):
+                remaining[value] -= 1
+            if find_forced_win(tuple(remaining), None, unrevealed, max_cards, max_plays - 1) is not None:
+                return move
+    return None
+
+def get_forced_win(player, game_state, max_plays=FORCED_WIN_PLAYS):
+    """
+    Returns a play of player that wins whatever the other players hold, or None if
+    there is no forced win within max_plays unbeatable plays, see find_forced_win
+    The play has a strength of 1 and no rollouts
+    """
+    position = player.position
+    prev_play = game_state.prev_play
+    signature = None if not prev_play or prev_play.position == position else get_play_signature(prev_play)
+    unrevealed = get_counts(game_state.get_unrevealed_cards(player.hand.get_card_set()))
+    max_cards = max(game_state.get_player_num_cards((position + 1) % NUM_PLAYERS),
+                    game_state.get_player_num_cards((position + 2) % NUM_PLAYERS))
+    move = find_forced_win(tuple(player.hand.get_counts()), signature, unrevealed, max_cards, max_plays)
+    if move is None:
+        return None
+    card_play = player.hand.make_play(move)
+    card_play.position = position
+    card_play.strength = 1
+    card_play.rollouts = 0
+    return card_play
+
+class EndgameSolver(object):
+    """
+    Solves positions for one target player, keeping a transposition table between solves
+    nodes -- number of positions searched, for benchmarking
+    """
+
+    def __init__(self, table_size=TRANSPOSITION_TABLE_SIZE):
+        self.table_size = table_size
+        self.table = {}
+        self.nodes = 0
+
+    def solve(self, hands, turn, signature, owner, target):
+        """
+        Returns true if target goes out first with best play from both sides
+        hands -- value count tuple of each player
+        turn -- the player to move
+        signature -- play signature of the play to beat, None when leading
+        owner -- the player who made that play
+        """
+        if len(self.table) >= self.table_size:
+            self.table.clear()
+        if signature is None:
+            owner = turn
+        return self._solve(tuple(hands), turn, signature, owner, target)
+
+    def _solve(self, hands, turn, signature, owner, target):
+        self.nodes += 1
+        leading = owner == turn
+        if leading:
+            signature = None
+        key = (hands, turn, signature, owner, target)
+        result = self.table.get(key)
+        if result is not None:
+            return result
+
+        maximizing = turn == target
+        next_turn = (turn + 1) % NUM_PLAYERS
+        result = not maximizing
+        for _, remaining, move_signature in get_ordered_moves(hands[turn], signature):
+            if not any(remaining):
+                outcome = maximizing
+            else:
+                child = list(hands)
+                child[turn] = remaining
+                outcome = self._solve(tuple(child), next_turn, move_signature, turn, target)
+            if outcome == maximizing:
+                result = maximizing
+                break
+        else:
+            if not leading:
+                result = self._solve(hands, next_turn, signature, owner, target)
+        self.table[key] = result
+        return result
+
+# shared by every solve of this process, so positions repeated across games are solved once
+_solver = EndgameSolver()
+
+def get_solver():
+    """Returns the endgame solver of this process"""
+    return _solver
+
+def solve_game(hands, game_state, target=0):
+    """
+    Returns true if target goes out first with best play from both sides
+    hands -- the Hand, CardSet or cards of each player, indexed by position
+    """
+    prev_play = game_state.prev_play
+    owner = prev_play.position if prev_play else game_state.current_turn
+    return _solver.solve([get_counts(hand) for hand in hands], game_state.current_turn,
+                         get_play_signature(prev_play), owner, target)
+
+def is_endgame(game_state, endgame_cards):
+    """Returns true if at most endgame_cards cards are left, endgame_cards of None never is"""
+    return endgame_cards is not None and sum(game_state.player_cards) <= endgame_cards
+
+def get_best_endgame_play(player, game_state, deals):
+    """
+    Solves every deal after each candidate play of player and returns the play
+    winning the most deals, passing only when no play wins more
+    deals -- (bits of the next player's cards, bits of the following player's cards)
+    The play has the fraction of deals won and the number of deals as strength and rollouts
+    """
+    position = player.position
+    prev_play = game_state.prev_play
+    owner = prev_play.position if prev_play else position
+    signature = None if owner == position else get_play_signature(prev_play)
+    counts = get_counts(player.hand)
+    candidates = [(player.hand.make_play(move), remaining, move_signature)
+                  for move, remaining, move_signature in get_ordered_moves(counts, signature)]
+    if signature is not None:
+        candidates.append((Play.get_pass_play(position=position), counts, signature))
+
+    all_hands = []
+    for deal in deals:
+        hands = [None] * NUM_PLAYERS
+        hands[(position + 1) % NUM_PLAYERS] = get_counts(CardSet(deal[0]))
+        hands[(position + 2) % NUM_PLAYERS] = get_counts(CardSet(deal[1]))
+        all_hands.append(hands)
+
+    next_turn = (position + 1) % NUM_PLAYERS
+    best_play = None
+    for card_play, remaining, move_signature in candidates:
+        card_play.position = position
+        wins = 0
+        for hands in all_hands:
+            if not any(remaining):
+                wins += 1
+                continue
+            hands[position] = remaining
+            if card_play:
+                wins += _solver.solve(hands, next_turn, move_signature, position, position)
+            else:
+                wins += _solver.solve(hands, next_turn, signature, owner, position)
+        card_play.strength = wins / len(all_hands) if all_hands else 0
+        card_play.rollouts = len(all_hands)
+        # the pass play is the last candidate and is only chosen if it is strictly better
+        if best_play is None or card_play.strength > best_play.strength:
+            best_play = card_play
+    return best_play
@@ -0,0 +1,118 @@
+"""
+Fast rollout module.
+Plays out games of the fixed strategy Player on plain value count lists.
+Like simulate_one_game, the last ENDGAME_CARDS cards are solved exactly by default,
+while batch_simulator plays the fixed strategy to the end.
+
+Player chooses through Hand, which makes a Play and its list of Cards for every
+play it looks at. A rollout makes the same choices straight from the level masks
+of move_generator and takes the values of the chosen Move off the counts, so a
+play only costs the small Move tuple describing it.
+"""
+
+from pokai.ai.endgame import ENDGAME_CARDS, get_solver
+from pokai.game.card_set import CardSet
+from pokai.game.game_tools import NUM_PLAYERS, SINGLES, DOUBLES, TRIPLES, QUADRUPLES, STRAIGHTS,\
+                                  DOUBLE_STRAIGHTS, ADJ_TRIPLES, DOUBLE_JOKER
+from pokai.game.move_generator import get_level_masks, get_lowest_adj_triple, get_lowest_basic,\
+                                      get_lowest_straight, get_lowest_wild, get_move_signature,\
+                                      get_move_values, get_play_signature
+
+def get_lead_move(masks):
+    """Returns the Move of Player.get_best_lead_play, the first of Player.generate_possible_leads"""
+    for num_extra in [2, 4, 0]:
+        move = get_lowest_adj_triple(masks, -1, num_extra)
+        if move is not None:
+            return move
+    for each_count in [2, 1]:
+        move = get_lowest_straight(masks, each_count)
+        if move is not None:
+            return move
+    for num_extra in [2, 1, 0]:
+        move = get_lowest_basic(masks, 3, -1, num_extra)
+        if move is not None:
+            return move
+    for each_count in [2, 1]:
+        move = get_lowest_basic(masks, each_count)
+        if move is not None:
+            return move
+    for num_extra in [4, 2, 0]:
+        move = get_lowest_basic(masks, 4, -1, num_extra)
+        if move is not None:
+            return move
+    return get_lowest_wild(masks)
+
+def get_follow_move(masks, signature):
+    """
+    Returns the Move of Player.get_best_play against the play with signature,
+    the lowest play beating it or else the lowest wild, None to pass
+    """
+    play_type, base, length, num_extra = signature
+    if play_type == DOUBLE_JOKER:
+        return None
+    if play_type == SINGLES:
+        move = get_lowest_basic(masks, 1, base)
+    elif play_type == DOUBLES:
+        move = get_lowest_basic(masks, 2, base)
+    elif play_type == TRIPLES:
+        move = get_lowest_basic(masks, 3, base, num_extra)
+    elif play_type == STRAIGHTS:
+        move = get_lowest_straight(masks, 1, base, length)
+    elif play_type == DOUBLE_STRAIGHTS:
+        move = get_lowest_straight(masks, 2, base, length)
+    elif play_type == ADJ_TRIPLES:
+        move = get_lowest_adj_triple(masks, base, num_extra)
+    else:
+        move = get_lowest_basic(masks, 4, base, num_extra)
+    # only plays that are not wild fall back to the lowest wild
+    if move is None and not (play_type == QUADRUPLES and not num_extra):
+        move = get_lowest_wild(masks)
+    return move
+
+def play_out(counts, num_cards, turn, signature, owner, endgame_cards=ENDGAME_CARDS):
+    """
+    Plays out a game of three fixed strategy players, like simulate_one_game
+    counts -- the value count list of each player, changed in place
+    num_cards -- the number of cards of each player, changed in place
+    signature -- play signature of the previous play, None if there is none
+    owner -- the player who made the previous play
+    endgame_cards -- once this many cards are left the game is solved exactly, None to play it out
+    Returns true if player 0 goes out first
+    """
+    all_masks = [get_level_masks(hand) for hand in counts]
+    while all(num_cards):
+        if endgame_cards is not None and sum(num_cards) <= endgame_cards:
+            if signature is None:
+                owner = turn
+            return get_solver().solve([tuple(hand) for hand in counts], turn, signature, owner, 0)
+        hand = counts[turn]
+        masks = all_masks[turn]
+        if signature is None or owner == turn:
+            move = get_lead_move(masks)
+        else:
+            move = get_follow_move(masks, signature)
+
+        if move is not None:
+            values = get_move_values(move)
+            for value in values:
+                hand[value] -= 1
+                masks[hand[value]] &= ~(1 << value)
+            num_cards[turn] -= len(values)
+            signature = get_move_signature(move)
+            owner = turn
+        turn = (turn + 1) % NUM_PLAYERS
+    return num_cards.index(0) == 0
+
+def play_deal(hand, game_state, deal, endgame_cards=ENDGAME_CARDS):
+    """
+    Plays out 1 game of the hand of player 0 with the other players holding a fixed deal,
+    like simulate_deal
+    deal -- (bits of the next player's cards, bits of the following player's cards)
+    Returns if hand wins the game
+    """
+    counts = [list(hand.get_counts()), CardSet(deal[0]).get_value_counts(),
+              CardSet(deal[1]).get_value_counts()]
+    prev_play = game_state.prev_play
+    owner = prev_play.position if prev_play else game_state.current_turn
+    return play_out(counts, list(game_state.player_cards), game_state.current_turn,
+                    get_play_signature(prev_play), owner, endgame_cards)
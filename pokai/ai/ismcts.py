@@ -0,0 +1,289 @@
+"""
+ISMCTS module.
+Information set Monte Carlo tree search from the view of one player.
+
+Every iteration samples a determinization, a deal of the unrevealed cards to the
+other players, and walks a single tree shared by all determinizations. Edges are
+suit free play keys, so plays can be matched between determinizations and with
+the plays that actually happen. Leaves are finished with rollouts of the fixed
+strategy Player, like the flat Monte Carlo simulations.
+"""
+
+import random
+import time
+from functools import lru_cache
+from math import log, sqrt
+
+from pokai.ai.monte_carlo import sample_deal, get_pool, get_pool_size, get_rng, get_task_seeds,\
+                                 split_games
+from pokai.game.card_play import Play
+from pokai.game.card_set import CardSet
+from pokai.game.hand import Hand
+from pokai.game.move_generator import get_move_values
+from pokai.game.player import Player
+
+ISMCTS_ITERATIONS = 2000
+EXPLORATION = 0.7
+
+@lru_cache(maxsize=None)
+def get_move_key(move):
+    """
+    Returns the suit free key of a Move, equal to Play.get_rank_key of its play,
+    or None for passing
+    """
+    if move is None:
+        return None
+    return (move.play_type, get_move_values(move), len(move.kickers))
+
+def get_cards_key(cards):
+    """Returns the suit free key of the play made of cards, or None if they are not a play"""
+    card_play = Play.get_play_from_cards(CardSet.from_cards(cards).to_cards())
+    return None if card_play is None else card_play.get_rank_key()
+
+def get_legal_moves(hand, game_state, turn):
+    """
+    Returns the legal Moves of the player at turn, None stands for passing
+    """
+    prev_play = game_state.prev_play
+    if not prev_play or prev_play.position == turn:
+        return hand.all_legal_moves(None)
+    return hand.all_legal_moves(prev_play) + (None,)
+
+def apply_move(hands, game_state, turn, move):
+    """Makes move for the player at turn and passes the turn on"""
+    card_play = None
+    if move is not None:
+        card_play = hands[turn].make_play(move)
+        card_play.position = turn
+        hands[turn].apply_play(card_play)
+    game_state.apply_play(card_play)
+
+def rollout(hands, game_state):
+    """
+    Finishes the game with fixed strategy players
+    Returns the position of the winner
+    """
+    players = [Player(hand, position, "") for position, hand in enumerate(hands)]
+    while game_state.game_is_on():
+        turn = game_state.get_current_turn()
+        next_play = players[turn].get_best_play(game_state)
+        if next_play:
+            players[turn].play(next_play)
+            game_state.cards_played(next_play)
+        game_state.increment_turn()
+    return game_state.get_winner()
+
+def choose_play(hand, game_state, position, statistics):
+    """
+    Returns the legal play with the most visits
+    statistics -- {play key: (visits, wins)} of the root
+    The play has its win rate and visits as strength and rollouts
+    """
+    def get_visits(move):
+        return statistics.get(get_move_key(move), (0, 0))[0]
+    best_move = max(get_legal_moves(hand, game_state, position), key=get_visits)
+    if best_move is None:
+        best_play = Play.get_pass_play(position=position)
+    else:
+        best_play = hand.make_play(best_move)
+        best_play.position = position
+    visits, wins = statistics.get(get_move_key(best_move), (0, 0))
+    if visits:
+        best_play.strength = wins / visits
+        best_play.rollouts = visits
+    return best_play
+
+def merge_statistics(all_statistics):
+    """Returns the sum of several {play key: (visits, wins)} root statistics"""
+    merged = {}
+    for statistics in all_statistics:
+        for key, (visits, wins) in statistics.items():
+            total_visits, total_wins = merged.get(key, (0, 0))
+            merged[key] = (total_visits + visits, total_wins + wins)
+    return merged
+
+def _search_chunk(task):
+    """
+    Worker for root parallel search, grows its own tree from the game state
+    task -- (hand bits, position, game_state, n_iterations, deadline, seed)
+    Returns the root statistics, the tree itself stays in the worker
+    """
+    bits, position, game_state, n_iterations, deadline, seed = task
+    search = ISMCTS(position, rng=seed)
+    search.search(Hand(CardSet(bits)), game_state, n_iterations, deadline)
+    return search.get_root_statistics()
+
+def get_best_play_parallel(hand, game_state, position, n_iterations=None, deadline=None,
+                           n_processes=None, rng=None):
+    """
+    Root parallel search: every worker of the monte carlo pool grows an independent
+    tree and only the root statistics are sent back and merged
+    n_iterations -- total number of iterations, ISMCTS_ITERATIONS if no deadline is given
+    deadline -- time.time() by which the search should be finished
+    n_processes -- number of processes, defaults to the number of CPUs
+    rng -- int seed or random.Random of the seed of each tree, None to use the worker's own stream
+    """
+    pool = get_pool(n_processes)
+    n_workers = get_pool_size()
+    if n_iterations is None and deadline is None:
+        n_iterations = ISMCTS_ITERATIONS
+    if n_iterations is None:
+        chunks = [None] * n_workers
+    else:
+        chunks = split_games(n_iterations, n_workers)
+    bits = hand.get_card_set().bits
+    seeds = get_task_seeds(get_rng(rng), len(chunks))
+    tasks = [(bits, position, game_state, chunk, deadline, seed) for chunk, seed in zip(chunks, seeds)]
+    statistics = merge_statistics(pool.map(_search_chunk, tasks))
+    return choose_play(hand, game_state, position, statistics)
+
+class Node(object):
+    """
+    Node of the search tree
+    player -- position of the player whose play leads to this node
+    availability -- number of iterations in which the play was legal
+    """
+    __slots__ = ('player', 'children', 'visits', 'wins', 'availability')
+
+    def __init__(self, player=None):
+        self.player = player
+        self.children = {}
+        self.visits = 0
+        self.wins = 0
+        self.availability = 1
+
+    def get_score(self, exploration):
+        """Upper confidence bound of the win rate, counting only iterations where the play was legal"""
+        return self.wins / self.visits + exploration * sqrt(log(self.availability) / self.visits)
+
+class ISMCTS(object):
+    """
+    Search engine of one player.
+    The tree is kept between decisions and the subtree of the plays that were
+    actually made is reused at the next decision.
+    """
+
+    def __init__(self, position, exploration=EXPLORATION, rng=None):
+        self.position = position
+        self.exploration = exploration
+        # int seed or random.Random of the determinizations and expansions, None for the global stream
+        self.rng = get_rng(rng)
+        self.root = Node()
+        # (key of the chosen play, its cards, used cards and card counts before it)
+        self._last_decision = None
+
+    def get_best_play(self, hand, game_state, n_iterations=None, deadline=None):
+        """
+        Searches from the current game state and returns the most visited play
+        n_iterations -- number of iterations, ISMCTS_ITERATIONS if no deadline is given
+        deadline -- time.time() by which the search should be finished
+        The returned play has the win rate and visits of its node as strength and rollouts
+        """
+        self._advance(game_state)
+        self.search(hand, game_state, n_iterations, deadline)
+        best_play = choose_play(hand, game_state, self.position, self.get_root_statistics())
+        self._last_decision = (best_play.get_rank_key() if best_play else None, best_play.cards,
+                               game_state.used_card_set, list(game_state.player_cards))
+        return best_play
+
+    def search(self, hand, game_state, n_iterations=None, deadline=None):
+        """
+        Grows the tree from the current root
+        n_iterations -- number of iterations, ISMCTS_ITERATIONS if no deadline is given
+        deadline -- time.time() by which the search should be finished
+        """
+        if n_iterations is None and deadline is None:
+            n_iterations = ISMCTS_ITERATIONS
+        player = Player(hand, self.position, "")
+        count = 0
+        while (n_iterations is None or count < n_iterations) and\
+              (deadline is None or time.time() < deadline):
+            self._iterate(player, game_state)
+            count += 1
+
+    def get_root_statistics(self):
+        """Returns {play key: (visits, wins)} of the plays at the root"""
+        return {key: (child.visits, child.wins) for key, child in self.root.children.items()}
+
+    def _iterate(self, player, game_state):
+        """Runs one iteration on a new determinization"""
+        hands = [None] * 3
+        deal = sample_deal(player, game_state, self.rng)
+        hands[self.position] = Hand(player.hand.get_card_set())
+        hands[(self.position + 1) % 3] = Hand(CardSet(deal[0]))
+        hands[(self.position + 2) % 3] = Hand(CardSet(deal[1]))
+        # the iteration is played out in place and the game state restored afterwards,
+        # even if it is interrupted
+        snapshot = game_state.snapshot()
+
+        node = self.root
+        path = [node]
+        try:
+            while game_state.game_is_on():
+                turn = game_state.get_current_turn()
+                moves = get_legal_moves(hands[turn], game_state, turn)
+                untried = []
+                for move in moves:
+                    child = node.children.get(get_move_key(move))
+                    if child is None:
+                        untried.append(move)
+                    else:
+                        child.availability += 1
+                if untried:
+                    move = (self.rng or random).choice(untried)
+                    child = Node(turn)
+                    node.children[get_move_key(move)] = child
+                    path.append(child)
+                    apply_move(hands, game_state, turn, move)
+                    break
+                move = max(moves, key=lambda move: node.children[get_move_key(move)].get_score(self.exploration))
+                node = node.children[get_move_key(move)]
+                path.append(node)
+                apply_move(hands, game_state, turn, move)
+
+            winner = rollout(hands, game_state)
+        finally:
+            game_state.restore(snapshot)
+        for node in path:
+            node.visits += 1
+            if node.player == winner:
+                node.wins += 1
+
+    def _get_observed_keys(self, game_state):
+        """
+        Returns the keys of this player's last play and the plays of the two
+        following players since then, or None if they cannot be recovered
+        """
+        if self._last_decision is None or game_state.get_current_turn() != self.position:
+            return None
+        key, cards, used_card_set, player_cards = self._last_decision
+        played = game_state.used_card_set.difference(used_card_set)
+        deltas = [before - after for before, after in zip(player_cards, game_state.player_cards)]
+        next1, next2 = (self.position + 1) % 3, (self.position + 2) % 3
+        if deltas[self.position] != len(cards) or len(played) != sum(deltas):
+            return None
+
+        prev_play = game_state.prev_play
+        key1 = key2 = None
+        played = played.difference(cards)
+        if deltas[next2]:
+            if not prev_play or prev_play.position != next2:
+                return None
+            key2 = prev_play.get_rank_key()
+            played = played.difference(prev_play.cards)
+        if deltas[next1]:
+            key1 = get_cards_key(played)
+            if key1 is None:
+                return None
+        return [key, key1, key2]
+
+    def _advance(self, game_state):
+        """Moves the root to the node of the current game state, or starts a new tree"""
+        keys = self._get_observed_keys(game_state)
+        node = self.root
+        for key in keys or []:
+            node = node.children.get(key)
+            if node is None:
+                break
+        self.root = node if keys and node is not None else Node()
+        self._last_decision = None
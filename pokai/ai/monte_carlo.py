@@ -2,29 +2,184 @@
 Monte Carlo module.
 Provides functionality to estimate hand and play strength
 """
+import atexit
+from collections import OrderedDict
 import multiprocessing
-from copy import deepcopy
+from math import ceil, log2, sqrt
+import random
 from random import randint
+import threading
+import time
 
 import pokai.game.game_tools as game_tools
 from pokai.game.game_tools import *
 from pokai.game.hand import Hand
 from pokai.game.player import Player
 from pokai.game.card_play import Play
+from pokai.game.card_set import CardSet
+from pokai.game.canonical import get_position_key
+from pokai.ai.probabilities import choose
+from pokai.ai.strength_store import StrengthStore
+from pokai.ai.endgame import ENDGAME_CARDS, solve_game, is_endgame
+from pokai.ai.fast_rollout import play_deal
 
 ESTIMATION_SIMULATIONS = 1000
+# paired comparisons on common deals need far fewer rollouts per candidate
+PAIRED_SIMULATIONS = 250
+# adaptive estimation runs in rounds of this many games per candidate
+ROUND_SIMULATIONS = 100
+# z score of the confidence intervals used to stop adaptive estimation, 99%
+CONFIDENCE_Z = 2.576
+# adaptive hand strength stops once the half width of its interval is this small
+HAND_STRENGTH_PRECISION = 0.03
+# total number of games per decision shared among the candidates by successive halving
+BANDIT_SIMULATIONS = 2000
+# games per candidate in the first round of anytime estimation, later rounds are
+# sized from the measured time per game
+ANYTIME_FIRST_ROUND = 1
+# number of positions kept in the strength cache
+STRENGTH_CACHE_SIZE = 100000
+# positions with at most this many deals of the unrevealed cards are estimated exactly
+# by simulating every distinct deal once, which never takes more games than sampling
+EXACT_DEALS = ESTIMATION_SIMULATIONS
 
-def simulate_one_game(players, game_state, display):
+# ways get_best_play can estimate the strength of the candidate plays
+EXHAUSTIVE = 'exhaustive'
+PAIRED = 'paired'
+ADAPTIVE = 'adaptive'
+BANDIT = 'bandit'
+
+# long lived worker pool, started lazily by get_pool
+_pool = None
+_pool_size = 0
+
+class StrengthCache(object):
+    """
+    Bounded least recently used memo of the wins and games simulated from positions.
+    Entries hold counts rather than rates, so they can be topped up with more games.
+    Only the process that hands out work to the pool reads and writes the cache, the
+    workers never see it, and a lock makes it safe to share between threads.
+    """
+
+    def __init__(self, maxsize=STRENGTH_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.top_ups = 0
+        self.misses = 0
+
+    def lookup(self, key, n_games):
+        """
+        Returns the (wins, games) of key, (0, 0) if it is not cached
+        Counts a hit if at least n_games are cached, a top up if fewer are and a miss otherwise
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return 0, 0
+            self._entries.move_to_end(key)
+            if entry[1] >= n_games:
+                self.hits += 1
+            else:
+                self.top_ups += 1
+            return entry
+
+    def add(self, key, wins, n_games):
+        """Adds wins out of n_games more games to the entry of key"""
+        if not n_games:
+            return
+        with self._lock:
+            old_wins, old_games = self._entries.pop(key, (0, 0))
+            self._entries[key] = (old_wins + wins, old_games + n_games)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_hit_rate(self):
+        """Returns the fraction of lookups that needed no more games"""
+        lookups = self.hits + self.top_ups + self.misses
+        return self.hits / lookups if lookups else 0
+
+    def get_statistics(self):
+        """Returns a dictionary of the lookup counts, hit rate and size"""
+        with self._lock:
+            return {'hits': self.hits, 'top_ups': self.top_ups, 'misses': self.misses,
+                    'hit_rate': self.get_hit_rate(), 'size': len(self._entries)}
+
+    def clear(self):
+        """Drops every entry and resets the statistics"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.top_ups = self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+# strengths estimated by estimate_hand_strength and estimate_play_strengths
+_strength_cache = StrengthCache()
+# optional on disk StrengthStore behind the cache
+_strength_store = None
+
+def get_strength_cache():
+    """Returns the strength cache of this process"""
+    return _strength_cache
+
+def get_strength_store():
+    """Returns the strength store in use, None if there is none"""
+    return _strength_store
+
+def use_strength_store(path):
+    """
+    Opens the sqlite strength store at path, creating it if needed, warm loads the
+    strength cache from it and records every newly simulated game in it
+    The cache is cleared first, so the store's totals are not added to games already cached
+    Returns the store
+    """
+    global _strength_store
+    close_strength_store()
+    _strength_store = StrengthStore(path)
+    _strength_cache.clear()
+    _strength_store.warm_load(_strength_cache)
+    return _strength_store
+
+def close_strength_store():
+    """Stops recording games in the strength store and closes it"""
+    global _strength_store
+    if _strength_store is not None:
+        _strength_store.close()
+    _strength_store = None
+
+def _lookup_position(key, n_games):
+    """
+    Returns the cached (wins, games) of a position, asking the strength store
+    when the position is not cached
+    """
+    wins, games = _strength_cache.lookup(key, n_games)
+    if not games and _strength_store is not None:
+        wins, games = _strength_store.lookup(key)
+        _strength_cache.add(key, wins, games)
+    return wins, games
+
+def _record_positions(results):
+    """Adds the (key, wins, games) of newly simulated games to the cache and the store"""
+    for key, wins, games in results:
+        _strength_cache.add(key, wins, games)
+    if _strength_store is not None:
+        _strength_store.add_many(results)
+
+def simulate_one_game(players, game_state, display, endgame_cards=ENDGAME_CARDS):
     """
     Simulates 1 game with:
     players -- list of players where starting hand is at index 0
     game_state -- the starting game state
     display -- print out results if True
+    endgame_cards -- once this many cards are left the game is solved exactly, None to play it out
 
     To simulate hands fairly, we use a basic Poker player to wrap all hands
     Returns if hand wins the game
     """
-    game_state_sim = deepcopy(game_state)
+    snapshot = game_state.snapshot()
     # display=True
     if display:
         print("Player 0:", players[0].hand)
@@ -32,139 +187,633 @@ def simulate_one_game(players, game_state, display):
         print("Player 2:", players[2].hand)
         print("simulation start")
 
-    while game_state_sim.game_is_on():
-        turn = game_state_sim.get_current_turn()
-        next_play = players[turn].get_best_play(game_state_sim)
+    # the game is played out in place and the game state restored afterwards
+    try:
+        while game_state.game_is_on():
+            if is_endgame(game_state, endgame_cards):
+                if display:
+                    print("endgame solved")
+                return solve_game([player.hand for player in players], game_state, 0)
+            turn = game_state.get_current_turn()
+            next_play = players[turn].get_best_play(game_state)
+
+            if next_play:
+                players[turn].play(next_play)
+                game_state.cards_played(next_play)
+                if display:
+                    print(next_play)
 
-        if next_play:
-            players[turn].play(next_play)
-            game_state_sim.cards_played(next_play)
-            if display:
-                print(next_play)
+            game_state.increment_turn()
 
-        game_state_sim.increment_turn()
+        return game_state.get_winner() == 0
+    finally:
+        game_state.restore(snapshot)
 
-    return game_state_sim.get_winner() == 0
+def get_rng(rng=None):
+    """
+    Returns the random.Random of rng, which may be an int seed or a random.Random,
+    or None for the global random stream
+    """
+    if rng is None or isinstance(rng, random.Random):
+        return rng
+    return random.Random(rng)
+
+def get_task_seeds(rng, n_tasks):
+    """
+    Returns a seed for each of n_tasks worker tasks drawn from rng, so every task
+    plays from its own stream whatever worker runs it, or None for each task when
+    rng is None and the workers use their own reseeded stream
+    """
+    if rng is None:
+        return [None] * n_tasks
+    return [rng.getrandbits(64) for _ in range(n_tasks)]
 
-def simulate_one_random_game(player, game_state, display):
+def sample_deal(player, game_state, rng=None):
+    """
+    Samples a random deal of the unrevealed cards to the two other players
+    rng -- random.Random to sample with, None for the global random stream
+    Returns the bits of the CardSets of the next and the following player
+    """
+    n_cards1 = game_state.get_player_num_cards((player.position + 1) % 3)
+    known_cards = player.hand.get_card_set().union(game_state.used_card_set)
+    deck = game_tools.get_new_shuffled_deck(rng)
+    deck = game_tools.remove_from_deck(deck, known_cards)
+    return CardSet.from_cards(deck[0: n_cards1]).bits, CardSet.from_cards(deck[n_cards1:]).bits
+
+def sample_deals(player, game_state, n_deals, rng=None):
+    """Samples n_deals random deals, see sample_deal"""
+    return [sample_deal(player, game_state, rng) for _ in range(n_deals)]
+
+def get_exact_deals(bits, position, game_state, max_deals=EXACT_DEALS):
+    """
+    Returns every deal of the unrevealed cards to the two other players up to suits, as
+    (deal, weight) where weight is the number of deals that only differ from it in suits,
+    or None if there are more than max_deals deals
+    bits -- the cards of the player at position
+    """
+    unrevealed = CardSet.full_deck().difference(game_state.used_card_set).difference(CardSet(bits))
+    n_cards1 = game_state.get_player_num_cards((position + 1) % 3)
+    n_cards2 = game_state.get_player_num_cards((position + 2) % 3)
+    if n_cards1 + n_cards2 != len(unrevealed) or choose(len(unrevealed), n_cards1) > max_deals:
+        return None
+    value_bits = {}
+    for card in unrevealed:
+        value_bits.setdefault(card.value, []).append(1 << card.id)
+    groups = list(value_bits.values())
+    # cards left in the groups after each group
+    left = [sum(len(group) for group in groups[i:]) for i in range(1, len(groups) + 1)]
+
+    deals = []
+    def split(i, needed, bits1, bits2, weight):
+        if i == len(groups):
+            deals.append(((bits1, bits2), weight))
+            return
+        group = groups[i]
+        # the next player takes the lowest suits of each value
+        for k in range(max(0, needed - left[i]), min(len(group), needed) + 1):
+            split(i + 1, needed - k, bits1 | sum(group[0: k]), bits2 | sum(group[k:]),
+                  weight * choose(len(group), k))
+    split(0, n_cards1, 0, 0, 1)
+    return deals
+
+def simulate_deal(player, game_state, deal, display=False):
+    """
+    Simulates 1 game with the other players holding a fixed deal
+    deal -- (bits of the next player's cards, bits of the following player's cards)
+    The game is played out on value counts by fast_rollout.play_deal only when player is
+    a plain Player, not a subclass such as AIPlayer, at position 0 and display is off.
+    Otherwise it is played with Player objects by simulate_one_game. Both paths make the
+    fixed strategy's plays until ENDGAME_CARDS cards are left and then solve the game
+    exactly, so unlike batch_simulator they do not play the fixed strategy to the end.
+    Returns if hand wins the game
+    """
+    if not display and type(player) is Player and player.position == 0:
+        return play_deal(player.hand, game_state, deal)
+    player1 = Player(Hand(CardSet(deal[0])), 1, "")
+    player2 = Player(Hand(CardSet(deal[1])), 2, "")
+    return simulate_one_game([player, player1, player2], game_state, display)
+
+def simulate_one_random_game(player, game_state, display, rng=None):
     """
     Simulates 1 random game with:
     player -- the player object
     game_state -- game information
     display -- print out results if True
+    rng -- random.Random to deal with, None for the global random stream
 
     Returns if hand wins the game
     """
-    n_cards1 = game_state.get_player_num_cards((player.position + 1) % 3)
-    deck = game_tools.get_new_shuffled_deck()
-    deck = game_tools.remove_from_deck(deck, player.get_cards())
-    deck = game_tools.remove_from_deck(deck, game_state.used_cards)
+    return simulate_deal(player, game_state, sample_deal(player, game_state, rng), display)
 
-    player1 = Player(Hand(deck[0: n_cards1]), 1, "")
-    player2 = Player(Hand(deck[n_cards1:]), 2, "")
-
-    return simulate_one_game([player, player1, player2], game_state, display)
-
-def simulate(player, n_games, game_state, display_progress_only=False, display=False):
+def simulate(player, n_games, game_state, display_progress_only=False, display=False, rng=None):
     """
     Simulates n games with:
     player -- the player object
     n_games -- number of games
     game_state -- game information
+    rng -- int seed or random.Random of the deals, None for the global random stream
     Returns number of wins
     """
+    rng = get_rng(rng)
     wins = 0
+    snapshot = player.hand.snapshot()
     for count in range(n_games):
         if display or display_progress_only:
             print("Simulation {}".format(count))
-        player_sim = deepcopy(player)
-        if simulate_one_random_game(player_sim, game_state, display=display):
-            wins += 1
+        try:
+            if simulate_one_random_game(player, game_state, display=display, rng=rng):
+                wins += 1
+        finally:
+            player.hand.restore(snapshot)
 
     return wins
 
-def _simulation_worker(index, player, n_games, game_state, return_list):
+def get_default_num_processes():
+    """Returns the default number of worker processes, one per CPU"""
+    return multiprocessing.cpu_count() or 1
+
+def _init_worker():
+    """
+    Reseeds each forked worker so that workers do not share a random stream,
+    tasks with a seed play from their own stream instead
+    """
+    random.seed()
+
+def start_pool(n_processes=None):
+    """
+    Starts the long lived simulation worker pool if it is not already running
+    n_processes -- number of worker processes, defaults to the number of CPUs
+    Returns the pool
+    """
+    global _pool, _pool_size
+    n_processes = n_processes or get_default_num_processes()
+    if _pool is not None and _pool_size == n_processes:
+        return _pool
+    shutdown_pool()
+    _pool = multiprocessing.Pool(n_processes, initializer=_init_worker)
+    _pool_size = n_processes
+    return _pool
+
+def shutdown_pool():
+    """Stops the simulation worker pool if it is running"""
+    global _pool, _pool_size
+    if _pool is None:
+        return
+    _pool.close()
+    _pool.join()
+    _pool = None
+    _pool_size = 0
+
+def get_pool(n_processes=None):
+    """Returns the running worker pool, starting it lazily"""
+    if _pool is None or (n_processes and n_processes != _pool_size):
+        return start_pool(n_processes)
+    return _pool
+
+def get_pool_size():
+    """Returns the number of worker processes of the running pool, 0 if it is not running"""
+    return _pool_size
+
+atexit.register(shutdown_pool)
+
+def split_games(n_games, n_chunks):
+    """Returns the number of games in each of n_chunks chunks"""
+    n_chunks = max(1, min(n_games, n_chunks))
+    size, remainder = divmod(n_games, n_chunks)
+    return [size + 1 if i < remainder else size for i in range(n_chunks)]
+
+def _simulation_chunk(chunk):
     """
     Worker for multiprocessed simulation
-    index -- index of the worker and where to store the data
-    player -- the player object
-    n_games -- number of games
-    game_state -- game information
-    return_list -- where to store the data
+    chunk -- (hand bits, position, game_state, n_games, seed), the player is sent as
+             the bits of its CardSet to keep the task small, seed is None to use
+             the worker's own random stream
+    Returns number of wins
     """
-    return_list[index] = simulate(player, n_games, game_state)
+    bits, position, game_state, n_games, seed = chunk
+    player = Player(Hand(CardSet(bits)), position, "")
+    return simulate(player, n_games, game_state, rng=get_rng(seed))
 
-def simulate_multiprocesses(player, n_games, game_state, n_processes):
+def simulate_multiprocesses(player, n_games, game_state, n_processes=None, rng=None):
     """
-    Simulates n games but uses multiple processes
+    Simulates n games on the worker pool
     player -- the player object
     n_games -- number of games
     game_state -- game information
-    n_processes -- number of processes
+    n_processes -- number of processes, defaults to the number of CPUs
+    rng -- int seed or random.Random of the chunk seeds, None to deal from each worker's
+           own stream. The wins are reproducible for a seed and number of processes.
     Returns number of wins
     """
     # should only use multiprocesses when simulating player
     # ai uses multiple processes behind the scenes when determining play strengths
     assert type(player) == Player
-    
-    manager = multiprocessing.Manager()
-    return_list = manager.list([0] * n_processes)
 
-    processes = []
-    sim_per_process = int(n_games / n_processes)
+    pool = get_pool(n_processes)
+    bits = player.hand.get_card_set().bits
+    sizes = split_games(n_games, _pool_size)
+    chunks = [(bits, player.position, game_state, games, seed)
+              for games, seed in zip(sizes, get_task_seeds(get_rng(rng), len(sizes)))]
+    return sum(pool.map(_simulation_chunk, chunks))
 
-    for i in range(n_processes):
-        sim_args = (i, player, sim_per_process, game_state, return_list)
-        p = multiprocessing.Process(target=_simulation_worker, args=sim_args)
-        processes.append(p)
-        p.start()
-
-    for p in processes:
-        p.join()
-
-    return sum(return_list)
-
-def estimate_hand_strength(player, game_state):
+def estimate_hand_strength(player, game_state, use_cache=True, rng=None):
     """
     Estimates hand strength by estimating the probability that the hand wins
     player -- the player object
     game_state -- game information
+    use_cache -- reuse and top up the games cached for the position
+    rng -- int seed or random.Random of the games, see simulate_multiprocesses.
+           Seeded games are always simulated and never read from or added to the cache,
+           so the strength only depends on the seed.
     """
     player = Player(player.hand, player.position, player.name)
-    return simulate_multiprocesses(player, ESTIMATION_SIMULATIONS, game_state, 4) / ESTIMATION_SIMULATIONS
+    rng = get_rng(rng)
+    use_cache = use_cache and rng is None
+    bits = player.hand.get_card_set().bits
+    deals = get_exact_deals(bits, player.position, game_state)
+    if deals is not None:
+        exact = {None: (bits, game_state, deals)}
+        return _estimate_exact_strengths(exact, player.position, get_pool())[None]
+    key = get_position_key(bits, player.position, game_state)
+    wins, n_games = _lookup_position(key, ESTIMATION_SIMULATIONS) if use_cache else (0, 0)
+    if n_games < ESTIMATION_SIMULATIONS:
+        games = ESTIMATION_SIMULATIONS - n_games
+        new_wins = simulate_multiprocesses(player, games, game_state, rng=rng)
+        if use_cache:
+            _record_positions([(key, new_wins, games)])
+        wins += new_wins
+        n_games += games
+    return wins / n_games
 
-def estimate_play_strength(card_play, player, game_state):
-    """Estimates play strength"""
-    # TODO: use probabilities here
-    player_sim = deepcopy(player)
-    game_state_sim = deepcopy(game_state)
+def get_confidence_interval(wins, n_games, z=CONFIDENCE_Z):
+    """Returns the Wilson score interval (low, high) of a win rate"""
+    if not n_games:
+        return 0.0, 1.0
+    rate = wins / n_games
+    z2 = z * z
+    denominator = 1 + z2 / n_games
+    centre = (rate + z2 / (2 * n_games)) / denominator
+    margin = z * sqrt(rate * (1 - rate) / n_games + z2 / (4 * n_games * n_games)) / denominator
+    return max(0.0, centre - margin), min(1.0, centre + margin)
+
+def is_best_separated(wins, n_games, z=CONFIDENCE_Z):
+    """
+    Returns true if the interval of the play with the most wins lies above the
+    intervals of all other plays
+    wins -- wins of each play, all simulated on n_games games
+    """
+    if len(wins) < 2:
+        return bool(wins) and n_games > 0
+    best = max(range(len(wins)), key=lambda i: wins[i])
+    best_low = get_confidence_interval(wins[best], n_games, z)[0]
+    return all(best_low > get_confidence_interval(play_wins, n_games, z)[1]
+               for i, play_wins in enumerate(wins) if i != best)
+
+def estimate_hand_strength_adaptive(player, game_state, precision=HAND_STRENGTH_PRECISION,
+                                    max_games=ESTIMATION_SIMULATIONS, round_games=ROUND_SIMULATIONS,
+                                    z=CONFIDENCE_Z, rng=None):
+    """
+    Estimates hand strength in rounds, stopping once the confidence interval is
+    narrower than precision on each side or max_games games were simulated
+    rng -- int seed or random.Random of the games, see simulate_multiprocesses
+    Returns (strength, number of games simulated)
+    """
+    player = Player(player.hand, player.position, player.name)
+    rng = get_rng(rng)
+    wins = n_games = 0
+    while n_games < max_games:
+        games = min(round_games, max_games - n_games)
+        wins += simulate_multiprocesses(player, games, game_state, rng=rng)
+        n_games += games
+        low, high = get_confidence_interval(wins, n_games, z)
+        if high - low <= 2 * precision:
+            break
+    return wins / n_games if n_games else 0, n_games
+
+def _get_position_after_play(card_play, player, game_state):
+    """
+    Returns the bits of player's cards and a copy of the game state after player makes card_play
+    card_play -- the play, None or a pass play to pass
+    """
+    game_state_sim = game_state.copy()
+    game_state_sim.apply_play(card_play)
+    bits = player.hand.get_card_set().bits
     if card_play:
-        player_sim.play(card_play)
-        game_state_sim.cards_played(card_play)
-    game_state_sim.increment_turn()
-    return estimate_hand_strength(player_sim, game_state_sim)
+        bits = player.hand.get_card_set().difference(card_play.cards).bits
+    return bits, game_state_sim
+
+def _indexed_simulation_chunk(task):
+    """
+    Worker for batched simulation
+    task -- (index of the position, chunk for _simulation_chunk)
+    Returns (index of the position, number of wins)
+    """
+    index, chunk = task
+    return index, _simulation_chunk(chunk)
+
+def estimate_play_strengths(card_plays, player, game_state, n_games=ESTIMATION_SIMULATIONS,
+                            n_processes=None, use_cache=True, rng=None):
+    """
+    Estimates the strengths of several plays in one batch on the worker pool.
+    Every (position, chunk) task is submitted at once and gathered as it completes,
+    so workers do not wait on each other between plays.
+    Plays leading to the same position are simulated once, and positions with few
+    enough deals of the unrevealed cards are estimated exactly on every deal.
+    card_plays -- plays of player, None or a pass play stands for passing
+    n_games -- number of games simulated for each play that is not estimated exactly
+    n_processes -- number of processes, defaults to the number of CPUs
+    use_cache -- reuse the games cached for each position and only simulate the missing ones
+    rng -- int seed or random.Random of the task seeds, None to deal from each worker's
+           own stream. Every task gets its own seed, so the strengths are reproducible
+           for a seed and number of processes whatever order the tasks finish in.
+           Seeded estimates bypass the cache like use_cache=False.
+    Returns a list of the strengths in the order of card_plays
+    """
+    card_plays = list(card_plays)
+    rng = get_rng(rng)
+    use_cache = use_cache and rng is None
+    if not card_plays:
+        return []
+    pool = get_pool(n_processes)
+    keys = []
+    positions = {}
+    for card_play in card_plays:
+        bits, game_state_sim = _get_position_after_play(card_play, player, game_state)
+        key = get_position_key(bits, player.position, game_state_sim)
+        keys.append(key)
+        positions.setdefault(key, (bits, game_state_sim))
+
+    exact = {}
+    for key, (bits, game_state_sim) in positions.items():
+        deals = get_exact_deals(bits, player.position, game_state_sim)
+        if deals is not None:
+            exact[key] = (bits, game_state_sim, deals)
+    strengths = _estimate_exact_strengths(exact, player.position, pool) if exact else {}
+    positions = {key: position for key, position in positions.items() if key not in exact}
+
+    cached = {}
+    tasks = []
+    for key, (bits, game_state_sim) in positions.items():
+        cached[key] = _lookup_position(key, n_games) if use_cache else (0, 0)
+        missing = n_games - cached[key][1]
+        if missing > 0:
+            for games in split_games(missing, _pool_size):
+                tasks.append((key, (bits, player.position, game_state_sim, games)))
+    seeds = get_task_seeds(rng, len(tasks))
+    tasks = [(key, chunk + (seed,)) for (key, chunk), seed in zip(tasks, seeds)]
+
+    new_wins = dict.fromkeys(positions, 0)
+    new_games = dict.fromkeys(positions, 0)
+    for key, chunk_wins in pool.imap_unordered(_indexed_simulation_chunk, tasks):
+        new_wins[key] += chunk_wins
+    for key, (_, _, _, games, _) in tasks:
+        new_games[key] += games
+    if use_cache:
+        _record_positions([(key, new_wins[key], new_games[key]) for key in positions])
+    for key, (wins, games) in cached.items():
+        strengths[key] = (wins + new_wins[key]) / (games + new_games[key])
+    return [strengths[key] for key in keys]
 
-def _get_single_best_play(card_plays, player, game_state):
+def _deal_chunk(task):
+    """
+    Worker for simulation on common deals
+    task -- (index of the play, hand bits, position, game_state, index of the first deal, deals)
+    Returns (index of the play, index of the first deal, list of 1 for a win and 0 for a loss)
+    """
+    index, bits, position, game_state, start, deals = task
+    player = Player(Hand(CardSet(bits)), position, "")
+    snapshot = player.hand.snapshot()
+    results = []
+    for deal in deals:
+        results.append(int(simulate_deal(player, game_state, deal)))
+        player.hand.restore(snapshot)
+    return index, start, results
+
+def _estimate_exact_strengths(exact, position, pool):
+    """
+    Simulates every deal of each position once on the pool
+    exact -- {key: (hand bits, game_state, deals with weights from get_exact_deals)}
+    Returns {key: exact strength}
+    """
+    tasks = []
+    for key, (bits, game_state, deals) in exact.items():
+        start = 0
+        for size in split_games(len(deals), _pool_size):
+            tasks.append((key, bits, position, game_state, start,
+                          [deal for deal, _ in deals[start: start + size]]))
+            start += size
+    wins = dict.fromkeys(exact, 0)
+    for key, start, results in pool.imap_unordered(_deal_chunk, tasks):
+        weights = [weight for _, weight in exact[key][2][start: start + len(results)]]
+        wins[key] += sum(weight * result for weight, result in zip(weights, results))
+    return {key: wins[key] / sum(weight for _, weight in deals)
+            for key, (_, _, deals) in exact.items()}
+
+def estimate_play_results(card_plays, player, game_state, n_deals=PAIRED_SIMULATIONS, deals=None,
+                          n_processes=None, rng=None):
+    """
+    Evaluates every play against the same set of deals of the unrevealed cards.
+    The other players' cards do not depend on which play is made, so one set of
+    deals is sampled per decision and the candidates can be compared deal by deal.
+    card_plays -- plays of player, None or a pass play stands for passing
+    n_deals -- number of deals to sample when deals is not given
+    deals -- deals from sample_deals to reuse
+    n_processes -- number of processes, defaults to the number of CPUs
+    rng -- int seed or random.Random to sample the deals with, None for the global random stream.
+           The deals are sampled before they are sent to the workers and the games on a
+           deal are deterministic, so the results only depend on rng.
+    Returns a list with a list of per deal results (1 win, 0 loss) for each play
+    """
+    card_plays = list(card_plays)
+    if deals is None:
+        deals = sample_deals(player, game_state, n_deals, get_rng(rng))
+    if not card_plays or not deals:
+        return [[] for _ in card_plays]
+    pool = get_pool(n_processes)
+    sizes = split_games(len(deals), _pool_size)
+    tasks = []
+    for index, card_play in enumerate(card_plays):
+        bits, game_state_sim = _get_position_after_play(card_play, player, game_state)
+        start = 0
+        for size in sizes:
+            tasks.append((index, bits, player.position, game_state_sim, start,
+                          deals[start: start + size]))
+            start += size
+
+    results = [[0] * len(deals) for _ in card_plays]
+    for index, start, chunk_results in pool.imap_unordered(_deal_chunk, tasks):
+        results[index][start: start + len(chunk_results)] = chunk_results
+    return results
+
+def estimate_play_strengths_adaptive(card_plays, player, game_state, max_games=ESTIMATION_SIMULATIONS,
+                                     round_games=ROUND_SIMULATIONS, z=CONFIDENCE_Z, n_processes=None,
+                                     rng=None):
+    """
+    Estimates the strengths of several plays in rounds of common deals.
+    Stops as soon as the best play is separated from the rest by the confidence
+    intervals, or once max_games games were simulated for each play.
+    round_games -- number of games simulated for each play per round
+    z -- z score of the confidence intervals
+    rng -- int seed or random.Random to sample the deals with, None for the global random stream
+    Returns (list of strengths in the order of card_plays, number of games simulated for each play)
+    """
+    card_plays = list(card_plays)
+    rng = get_rng(rng)
+    wins = [0] * len(card_plays)
+    n_games = 0
+    while card_plays and n_games < max_games:
+        deals = sample_deals(player, game_state, min(round_games, max_games - n_games), rng)
+        results = estimate_play_results(card_plays, player, game_state, deals=deals,
+                                        n_processes=n_processes)
+        for index, play_results in enumerate(results):
+            wins[index] += sum(play_results)
+        n_games += len(deals)
+        if is_best_separated(wins, n_games, z):
+            break
+    return [play_wins / n_games if n_games else 0 for play_wins in wins], n_games
+
+def estimate_play_strengths_bandit(card_plays, player, game_state, budget=BANDIT_SIMULATIONS,
+                                   n_processes=None, rng=None):
+    """
+    Estimates the strengths of several plays by successive halving.
+    The budget is split evenly over log2(number of plays) rounds. Each round the
+    remaining plays are simulated on common deals and the worse half is dropped,
+    so most games are spent telling the strongest plays apart.
+    No play is simulated on more than ESTIMATION_SIMULATIONS games per round.
+    budget -- total number of games for all plays
+    rng -- int seed or random.Random to sample the deals with, None for the global random stream
+    Returns (list of strengths in the order of card_plays, list of games simulated for each play)
+    """
+    card_plays = list(card_plays)
+    rng = get_rng(rng)
+    wins = [0] * len(card_plays)
+    games = [0] * len(card_plays)
+    active = list(range(len(card_plays)))
+    n_rounds = max(1, ceil(log2(len(card_plays)))) if card_plays else 0
+    for _ in range(n_rounds):
+        round_games = min(ESTIMATION_SIMULATIONS, max(1, budget // (n_rounds * len(active))))
+        deals = sample_deals(player, game_state, round_games, rng)
+        results = estimate_play_results([card_plays[i] for i in active], player, game_state,
+                                        deals=deals, n_processes=n_processes)
+        for index, play_results in zip(active, results):
+            wins[index] += sum(play_results)
+            games[index] += len(play_results)
+        if len(active) == 1:
+            break
+        active.sort(key=lambda i: wins[i] / games[i], reverse=True)
+        active = active[0: (len(active) + 1) // 2]
+    return [wins[i] / games[i] if games[i] else 0 for i in range(len(card_plays))], games
+
+def estimate_play_strengths_anytime(card_plays, player, game_state, deadline, z=CONFIDENCE_Z,
+                                    n_processes=None, rng=None):
+    """
+    Estimates the strengths of several plays until deadline.
+    Rollouts are interleaved: each round simulates every play on the same new
+    deals, so the estimates can be read after any round. Each round is sized to
+    take about half of the remaining time. Stops early once the best play is
+    separated from the rest by the confidence intervals.
+    deadline -- time.time() by which the estimation should be finished
+    z -- z score of the confidence intervals
+    rng -- int seed or random.Random to sample the deals with, None for the global random stream.
+           The deals follow rng, but how many rounds fit before deadline depends on timing.
+    Returns (list of strengths in the order of card_plays, number of games simulated for each play)
+    """
+    card_plays = list(card_plays)
+    rng = get_rng(rng)
+    wins = [0] * len(card_plays)
+    n_games = 0
+    round_games = ANYTIME_FIRST_ROUND
+    while card_plays and time.time() < deadline:
+        start = time.time()
+        deals = sample_deals(player, game_state, round_games, rng)
+        results = estimate_play_results(card_plays, player, game_state, deals=deals,
+                                        n_processes=n_processes)
+        for index, play_results in enumerate(results):
+            wins[index] += sum(play_results)
+        n_games += round_games
+        if is_best_separated(wins, n_games, z):
+            break
+        # time to simulate one deal for every play
+        deal_time = (time.time() - start) / round_games
+        remaining = deadline - time.time()
+        if remaining < deal_time:
+            break
+        round_games = max(1, int(remaining / (2 * deal_time)))
+    return [play_wins / n_games if n_games else 0 for play_wins in wins], n_games
+
+def estimate_play_strength(card_play, player, game_state, rng=None):
+    """
+    Estimates play strength
+    rng -- int seed or random.Random of the games, None for the global random stream,
+           see estimate_play_strengths
+    """
+    # TODO: use probabilities here
+    return estimate_play_strengths([card_play], player, game_state, rng=rng)[0]
+
+def set_play_strengths(card_plays, player, game_state, method=EXHAUSTIVE, rng=None):
+    """
+    Sets the position, strength and number of rollouts of each play, estimated in one batch
+    method -- EXHAUSTIVE for ESTIMATION_SIMULATIONS independent games per play,
+              PAIRED for PAIRED_SIMULATIONS common deals per play,
+              ADAPTIVE for rounds of common deals until the best play is separated,
+              BANDIT for successive halving of BANDIT_SIMULATIONS games
+    rng -- int seed or random.Random of the estimation, None for the global random stream
+    """
+    for play in card_plays:
+        play.position = player.position
+    if method == EXHAUSTIVE:
+        strengths = estimate_play_strengths(card_plays, player, game_state, rng=rng)
+        n_games = ESTIMATION_SIMULATIONS
+    elif method == PAIRED:
+        n_games = PAIRED_SIMULATIONS
+        strengths = [sum(results) / n_games
+                     for results in estimate_play_results(card_plays, player, game_state, n_games,
+                                                           rng=rng)]
+    elif method == ADAPTIVE:
+        strengths, n_games = estimate_play_strengths_adaptive(card_plays, player, game_state, rng=rng)
+    elif method == BANDIT:
+        strengths, rollouts = estimate_play_strengths_bandit(card_plays, player, game_state, rng=rng)
+        for play, strength, n_games in zip(card_plays, strengths, rollouts):
+            play.strength = strength
+            play.rollouts = n_games
+        return
+    else:
+        raise ValueError('unknown estimation method: {}'.format(method))
+    for play, strength in zip(card_plays, strengths):
+        play.strength = strength
+        play.rollouts = n_games
+
+def _get_play_rank(play):
+    """
+    Sort key of estimated plays, the plays that survived more rounds of
+    elimination come first, then the stronger plays
+    """
+    return play.rollouts, play.strength
+
+def _get_single_best_play(card_plays, player, game_state, method=EXHAUSTIVE, rng=None):
     """Gets the best play optimized for returning only one play"""
     best_play = Play.get_pass_play(position=player.position)
+    set_play_strengths(card_plays, player, game_state, method, rng)
     for play in card_plays:
-        play.position = player.position
-        play.strength = estimate_play_strength(play, player, game_state)
-        if not best_play or play.strength > best_play.strength:
+        if not best_play or _get_play_rank(play) > _get_play_rank(best_play):
             best_play = play
     return best_play
 
-def _get_multiple_best_plays(card_plays, player, game_state, num_best):
+def _get_multiple_best_plays(card_plays, player, game_state, num_best, method=EXHAUSTIVE, rng=None):
     """Gets the top { num_best } players"""
-    ordered_plays = sorted(card_plays,
-                           key=lambda play: estimate_play_strength(play, player, game_state),
-                           reverse=True)
+    set_play_strengths(card_plays, player, game_state, method, rng)
+    ordered_plays = sorted(card_plays, key=_get_play_rank, reverse=True)
     return ordered_plays[0: num_best]
 
-def get_best_play(card_plays, player, game_state, num_best=1):
-    """Gets best play from list of plays"""
+def get_best_play(card_plays, player, game_state, num_best=1, method=EXHAUSTIVE, rng=None):
+    """
+    Gets best play from list of plays
+    method -- how the plays are estimated, see set_play_strengths
+    rng -- int seed or random.Random of the estimation, None for the global random stream
+    """
     card_plays = list(card_plays)
+    rng = get_rng(rng)
     if num_best == 1:
-        return _get_single_best_play(card_plays, player, game_state)
+        return _get_single_best_play(card_plays, player, game_state, method, rng)
     else:
-        return _get_multiple_best_plays(card_plays, player, game_state, num_best)
+        return _get_multiple_best_plays(card_plays, player, game_state, num_best, method, rng)
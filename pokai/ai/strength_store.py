@@ -0,0 +1,110 @@
+"""
+Strength store module.
+Optional sqlite store of the wins and games simulated from positions, keyed by the
+suit free canonical position keys, so that estimates accumulate across runs.
+Any number of processes may read and write the same file.
+"""
+
+import os
+import sqlite3
+
+# seconds a writer waits for another process to release the database
+STORE_TIMEOUT = 30
+# schema version kept in PRAGMA user_version, files of other versions are rejected
+# 1 stored text keys, 2 stores the bytes of canonical.get_position_key
+STORE_VERSION = 2
+
+class StrengthStore(object):
+    """
+    Sqlite table of position key -> (wins, games).
+    Writes add to the stored counts inside one immediate transaction, so concurrent
+    writers queue up on the database lock instead of overwriting each other.
+    Every process opens its own connection, connections are never shared after a fork.
+    Opening a file written with another STORE_VERSION raises ValueError, its keys
+    could never match the keys looked up now.
+    """
+
+    def __init__(self, path, timeout=STORE_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self._connection = None
+        self._pid = None
+        connection = self._connect()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            version = connection.execute('PRAGMA user_version').fetchone()[0]
+            has_table = connection.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' "
+                                           "AND name = 'positions'").fetchone()
+            if not version and has_table:
+                # stores of the first version never set user_version
+                version = 1
+            if version and version != STORE_VERSION:
+                raise ValueError('strength store {} has version {}, expected {}, '
+                                 'simulate into a new file'.format(path, version, STORE_VERSION))
+            connection.execute('CREATE TABLE IF NOT EXISTS positions '
+                               '(key BLOB PRIMARY KEY, wins INTEGER NOT NULL, games INTEGER NOT NULL)')
+            connection.execute('PRAGMA user_version = {}'.format(STORE_VERSION))
+        except BaseException:
+            connection.execute('ROLLBACK')
+            self.close()
+            raise
+        connection.execute('COMMIT')
+
+    def _connect(self):
+        """Returns the connection of this process"""
+        if self._connection is None or self._pid != os.getpid():
+            # autocommit, transactions are opened explicitly
+            self._connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            # readers do not block the writer and the writer does not block readers
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._pid = os.getpid()
+        return self._connection
+
+    def add(self, key, wins, n_games):
+        """Adds wins out of n_games more games to the stored counts of key"""
+        self.add_many([(key, wins, n_games)])
+
+    def add_many(self, results):
+        """Adds every (key, wins, games) of results in one transaction"""
+        results = [result for result in results if result[2]]
+        if not results:
+            return
+        connection = self._connect()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.executemany('INSERT OR IGNORE INTO positions VALUES (?, 0, 0)',
+                                   [(key,) for key, _, _ in results])
+            connection.executemany('UPDATE positions SET wins = wins + ?, games = games + ? WHERE key = ?',
+                                   [(wins, games, key) for key, wins, games in results])
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def lookup(self, key):
+        """Returns the stored (wins, games) of key, (0, 0) if it is not stored"""
+        row = self._connect().execute('SELECT wins, games FROM positions WHERE key = ?',
+                                      (key,)).fetchone()
+        return (row[0], row[1]) if row else (0, 0)
+
+    def warm_load(self, cache):
+        """
+        Loads the positions with the most games into an empty StrengthCache,
+        the most simulated positions are the most recently used
+        Returns the number of positions loaded
+        """
+        rows = self._connect().execute('SELECT key, wins, games FROM positions '
+                                       'ORDER BY games DESC LIMIT ?', (cache.maxsize,)).fetchall()
+        for key, wins, games in reversed(rows):
+            cache.add(key, wins, games)
+        return len(rows)
+
+    def __len__(self):
+        return self._connect().execute('SELECT COUNT(*) FROM positions').fetchone()[0]
+
+    def close(self):
+        """Closes the connection of this process"""
+        if self._connection is not None and self._pid == os.getpid():
+            self._connection.close()
+        self._connection = None
+        self._pid = None
@@ -0,0 +1,90 @@
+"""
+Canonical module.
+Suits never matter in Dou Dizhu, so positions and plays that only differ in suits
+are equivalent. Maps positions to compact suit free keys and plays to and from
+their suit free canonical form.
+"""
+
+from pokai.game.card import MAX_VALUE
+from pokai.game.card_play import Play
+from pokai.game.card_set import CardSet
+from pokai.game.game_tools import SINGLES, DOUBLES, TRIPLES, QUADRUPLES, STRAIGHTS,\
+                                  DOUBLE_STRAIGHTS, ADJ_TRIPLES, DOUBLE_JOKER
+from pokai.game.move_generator import get_play_signature
+
+PLAY_TYPES = [SINGLES, DOUBLES, TRIPLES, QUADRUPLES, STRAIGHTS, DOUBLE_STRAIGHTS,
+              ADJ_TRIPLES, DOUBLE_JOKER]
+PLAY_TYPE_INDICES = {play_type: index for index, play_type in enumerate(PLAY_TYPES)}
+NUM_VALUES = MAX_VALUE + 1
+# bytes of two packed value histograms
+COUNTS_SIZE = (NUM_VALUES + 1) // 2
+
+def pack_counts(counts):
+    """Returns the value counts, each at most 4, packed two to a byte"""
+    counts = list(counts) + [0] * (2 * COUNTS_SIZE - len(counts))
+    return bytes(counts[i] | counts[i + 1] << 4 for i in range(0, len(counts), 2))
+
+def unpack_counts(data):
+    """Returns the value counts packed by pack_counts"""
+    counts = []
+    for byte in data:
+        counts += [byte & 15, byte >> 4]
+    return counts[0: NUM_VALUES]
+
+def get_position_key(bits, position, game_state):
+    """
+    Returns the compact suit free key of the position of the player at position holding
+    the cards bits, as bytes made of the value histograms of the hand and of the used
+    cards, the number of cards of each player, the turn, the position and the
+    signature and owner of the previous play
+    """
+    key = pack_counts(CardSet(bits).get_value_counts()) +\
+          pack_counts(game_state.used_card_set.get_value_counts()) +\
+          bytes(game_state.player_cards) + bytes((game_state.current_turn, position))
+    prev_play = game_state.prev_play
+    if prev_play:
+        play_type, base, length, num_extra = get_play_signature(prev_play)
+        key += bytes((PLAY_TYPE_INDICES[play_type], base, length, num_extra, prev_play.position))
+    return key
+
+def decode_position_key(key):
+    """
+    Returns (hand counts, used card counts, number of cards of each player, turn, position,
+    previous play signature and owner or None) of a key made by get_position_key
+    """
+    hand_counts = unpack_counts(key[0: COUNTS_SIZE])
+    used_counts = unpack_counts(key[COUNTS_SIZE: 2 * COUNTS_SIZE])
+    rest = key[2 * COUNTS_SIZE:]
+    prev = None
+    if len(rest) > 5:
+        play_type, base, length, num_extra, owner = rest[5:]
+        prev = (PLAY_TYPES[play_type], base, length, num_extra), owner
+    return hand_counts, used_counts, list(rest[0: 3]), rest[3], rest[4], prev
+
+def get_canonical_play(card_play):
+    """
+    Returns the suit free (play type, sorted values, number of extras) of a play,
+    None for a missing or pass play
+    """
+    return card_play.get_rank_key() if card_play else None
+
+def get_play_from_canonical(canonical_play, cards, position=-1):
+    """
+    Returns a Play of position made of the lowest suits of cards with the values
+    of canonical_play, a pass play for None
+    Raises ValueError if cards do not hold the values
+    """
+    if canonical_play is None:
+        return Play.get_pass_play(position=position)
+    play_type, values, num_extra = canonical_play
+    needed = [0] * NUM_VALUES
+    for value in values:
+        needed[value] += 1
+    play_cards = []
+    for card in CardSet.from_cards(cards):
+        if needed[card.value]:
+            needed[card.value] -= 1
+            play_cards.append(card)
+    if any(needed):
+        raise ValueError('cards do not hold the play {}'.format(canonical_play))
+    return Play(position, play_cards, num_extra, play_type=play_type)
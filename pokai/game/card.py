@@ -15,7 +15,10 @@ SUIT_DISPLAY = ['♥', '♦', '♠', '♣']
 class Card(object):
     """
     The Card Object
+    There is exactly one instance of each of the 54 cards, so cards are compared by id
     """
+    __slots__ = ('name', 'suit', 'value', 'display', 'id')
+
     @staticmethod
     def str_to_card(card_str):
         """
@@ -54,25 +57,42 @@ class Card(object):
         return [Card.card_to_str(card) for card in cards]
 
 
-    def __init__(self, name, suit):
-        super(Card, self).__init__()
-        self.display = 'INVALID'
-        if not name in list(VALUES):
-            return
+    @staticmethod
+    def from_id(card_id):
+        """returns the card with id card_id (0 - 53)"""
+        return DECK[card_id]
 
-        self.name = name
-        self.value = -1
-        self.suit = ''
+    def __new__(cls, name, suit):
+        card = _INTERNED.get((name, suit))
+        if card is None:
+            card = Card._create(name, suit)
+        return card
 
-        if suit in list(SUITS) and name != 'Z':
-            self.value = VALUES.index(name)
-            self.suit = SUIT_DISPLAY[SUITS.index(suit)]
-            self.display = "{}{}".format(self.suit, VALUE_DISPLAY[self.value])
-        elif name == "Z" and not str(suit).isalpha():
-            self.value = VALUES.index(name) + suit
-            self.display = "{}".format(VALUE_DISPLAY[self.value])
-        else:
-            name = "INVALID"
+    @staticmethod
+    def _create(name, suit):
+        """
+        Builds a new card object. Only called for the 54 interned cards and invalid cards,
+        every other construction returns an interned card.
+        """
+        card = object.__new__(Card)
+        card.name = name
+        card.value = -1
+        card.suit = ''
+        card.id = -1
+        card.display = 'INVALID'
+        if name not in tuple(VALUES):
+            return card
+
+        if name != 'Z' and suit in SUITS:
+            card.value = VALUES.index(name)
+            card.suit = SUIT_DISPLAY[SUITS.index(suit)]
+            card.display = "{}{}".format(card.suit, VALUE_DISPLAY[card.value])
+            card.id = card.value * len(SUITS) + SUITS.index(suit)
+        elif name == 'Z' and suit in (0, 1):
+            card.value = SMALL_JOKER_VALUE + suit
+            card.display = "{}".format(VALUE_DISPLAY[card.value])
+            card.id = SMALL_JOKER_VALUE * len(SUITS) + suit
+        return card
 
     def is_royal(self):
         """Returns true if card is greater than 10"""
@@ -81,19 +101,33 @@ class Card(object):
         return self.value > 7
 
     def __lt__(self, other):
-        return other != None and self.value < other.value
+        return other is not None and self.value < other.value
 
     def __le__(self, other):
-        return other != None and self.value <= other.value
+        return other is not None and self.value <= other.value
 
     def __eq__(self, other):
-        return other != None and str(self) == str(other)
+        return isinstance(other, Card) and self.id == other.id
 
     def __ge__(self, other):
-        return other != None and self.value >= other.value
+        return other is not None and self.value >= other.value
 
     def __gt__(self, other):
-        return other != None and self.value > other.value
+        return other is not None and self.value > other.value
+
+    def __hash__(self):
+        return self.id
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        if self.id < 0:
+            return (Card, (self.name, None))
+        return (Card.from_id, (self.id, ))
 
     def __repr__(self):
         """How the card is represented in terminal"""
@@ -102,3 +136,18 @@ class Card(object):
     def __str__(self):
         """How the card is turned into a string"""
         return self.display
+
+_INTERNED = {}
+
+def _build_deck():
+    """Builds the 54 interned cards ordered by id"""
+    deck = []
+    for name in VALUES:
+        suits = [0, 1] if name == 'Z' else SUITS
+        for suit in suits:
+            card = Card._create(name, suit)
+            _INTERNED[(name, suit)] = card
+            deck.append(card)
+    return tuple(deck)
+
+DECK = _build_deck()
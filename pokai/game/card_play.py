@@ -63,6 +63,8 @@ class Play(object):
         self.cards = cards
         self.num_extra = num_extra
         self.strength = 0
+        # number of simulated games behind strength
+        self.rollouts = 0
         if not play_type:
             self.play_type = Play.get_play_from_cards(cards).play_type
         else:
@@ -80,6 +82,13 @@ class Play(object):
         """Returns the base card of this play (the card another player needs to beat)"""
         return self[0]
 
+    def get_rank_key(self):
+        """
+        Returns a suit free key of the play.
+        Plays with the same key are strategically identical.
+        """
+        return (self.play_type, tuple(sorted(card.value for card in self.cards)), self.num_extra)
+
     def is_wild(self):
         return self.play_type == DOUBLE_JOKER or (self.play_type == QUADRUPLES and not self.num_extra)
 
@@ -108,4 +117,4 @@ class Play(object):
         return "[{}]".format(s.strip())
 
     def __bool__(self):
-        return self != None and self.play_type != PASS
+        return self.play_type != PASS
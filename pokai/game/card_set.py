@@ -0,0 +1,129 @@
+"""
+Card set module.
+Contains an immutable 54 bit set of cards used as the core card collection type.
+"""
+
+from pokai.game.card import DECK, SMALL_JOKER_VALUE, SUITS
+
+FULL_DECK_BITS = (1 << len(DECK)) - 1
+SMALL_JOKER_ID = SMALL_JOKER_VALUE * len(SUITS)
+BIG_JOKER_ID = SMALL_JOKER_ID + 1
+REGULAR_SHIFTS = tuple(range(0, SMALL_JOKER_ID, len(SUITS)))
+NIBBLE_COUNTS = tuple(bin(nibble).count('1') for nibble in range(16))
+
+def card_index(card):
+    """
+    Returns the bit index of a card, which is its id
+    Regular cards are ordered by value then suit, jokers take the last two bits
+    """
+    return card.id
+
+class CardSet(object):
+    """
+    Immutable set of cards stored as the bits of a single integer.
+    Iterating over the set yields the cards ordered by value.
+    """
+    __slots__ = ('_bits',)
+
+    @staticmethod
+    def from_cards(cards):
+        """returns a card set containing cards"""
+        if isinstance(cards, CardSet):
+            return cards
+        bits = 0
+        for card in cards:
+            bits |= 1 << card.id
+        return CardSet(bits)
+
+    @staticmethod
+    def full_deck():
+        """returns a card set of all 54 cards"""
+        return CardSet(FULL_DECK_BITS)
+
+    def __init__(self, bits=0):
+        self._bits = bits
+
+    @property
+    def bits(self):
+        """the integer representation of the set"""
+        return self._bits
+
+    def union(self, other):
+        """returns a new set with the cards of both sets"""
+        return CardSet(self._bits | CardSet.from_cards(other)._bits)
+
+    def difference(self, other):
+        """returns a new set without the cards in other"""
+        return CardSet(self._bits & ~CardSet.from_cards(other)._bits)
+
+    def intersection(self, other):
+        """returns a new set with the cards in both sets"""
+        return CardSet(self._bits & CardSet.from_cards(other)._bits)
+
+    def add(self, card):
+        """returns a new set that also contains card"""
+        return CardSet(self._bits | (1 << card.id))
+
+    def remove(self, card):
+        """returns a new set that does not contain card"""
+        return CardSet(self._bits & ~(1 << card.id))
+
+    def issubset(self, other):
+        """returns true if every card in this set is in other"""
+        return not self._bits & ~CardSet.from_cards(other)._bits
+
+    def popcount(self):
+        """number of cards in the set"""
+        return bin(self._bits).count('1')
+
+    def get_value_counts(self):
+        """returns the number of cards of each value, 3 .. 2, small joker, big joker"""
+        bits = self._bits
+        # the four suits of a regular value are one nibble of the bits
+        counts = [NIBBLE_COUNTS[bits >> shift & 15] for shift in REGULAR_SHIFTS]
+        counts.append(bits >> SMALL_JOKER_ID & 1)
+        counts.append(bits >> BIG_JOKER_ID & 1)
+        return counts
+
+    def to_cards(self):
+        """returns a list of the cards ordered by value"""
+        return list(self)
+
+    def __contains__(self, card):
+        if card is None or card.id < 0:
+            return False
+        return bool(self._bits >> card.id & 1)
+
+    def __iter__(self):
+        bits = self._bits
+        while bits:
+            low = bits & -bits
+            yield DECK[low.bit_length() - 1]
+            bits ^= low
+
+    def __len__(self):
+        return self.popcount()
+
+    def __bool__(self):
+        return self._bits != 0
+
+    def __or__(self, other):
+        return self.union(other)
+
+    def __and__(self, other):
+        return self.intersection(other)
+
+    def __sub__(self, other):
+        return self.difference(other)
+
+    def __eq__(self, other):
+        return isinstance(other, CardSet) and self._bits == other._bits
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self._bits)
+
+    def __repr__(self):
+        return 'CardSet({})'.format(' '.join(str(c) for c in self))
@@ -2,20 +2,87 @@
 Game State module
 """
 
-from pokai.game.game_tools import TOTAL_CARDS, NUM_PLAYERS,\
-                                 get_new_ordered_deck, remove_from_deck
+from pokai.game.game_tools import TOTAL_CARDS, NUM_PLAYERS
+from pokai.game.card_set import CardSet
+from pokai.game.zobrist import USED_CARD_KEYS, NUM_CARDS_KEYS, TURN_KEYS, get_cards_key, get_play_key
+
+def get_num_cards_key(player_cards):
+    """Returns the key of the number of cards of each player"""
+    key = 0
+    for position, n_cards in enumerate(player_cards):
+        key ^= NUM_CARDS_KEYS[position][n_cards]
+    return key
 
 class GameState(object):
     """
     Holds information about the current game state
+    The zobrist key of the used cards, the number of cards of each player, the turn
+    and the previous play, _key, is updated whenever one of them changes and is
+    the hash of the game state.
     """
 
     def __init__(self, n_cards0, n_cards1):
-        self.used_cards = []
+        self._used_card_set = CardSet()
+        self._player_cards = [0] * NUM_PLAYERS
+        self._current_turn = 0
+        self._prev_play = None
+        self._key = TURN_KEYS[0] ^ get_num_cards_key([0] * NUM_PLAYERS)
         self.player_cards = [n_cards0, n_cards1,
                              TOTAL_CARDS - n_cards0 - n_cards1]
         self.current_turn = self.player_cards.index(20)
-        self.prev_play = None
+
+    @property
+    def used_cards(self):
+        """list of the cards that have been played, ordered by value"""
+        return self._used_card_set.to_cards()
+
+    @used_cards.setter
+    def used_cards(self, cards):
+        self.used_card_set = CardSet.from_cards(cards)
+
+    @property
+    def used_card_set(self):
+        """CardSet of the cards that have been played"""
+        return self._used_card_set
+
+    @used_card_set.setter
+    def used_card_set(self, card_set):
+        self._key ^= get_cards_key(self._used_card_set.bits ^ card_set.bits, USED_CARD_KEYS)
+        self._used_card_set = card_set
+
+    @property
+    def player_cards(self):
+        """number of cards of each player, change it with set_num_cards to keep the key"""
+        return self._player_cards
+
+    @player_cards.setter
+    def player_cards(self, player_cards):
+        self._key ^= get_num_cards_key(self._player_cards) ^ get_num_cards_key(player_cards)
+        self._player_cards = list(player_cards)
+
+    @property
+    def current_turn(self):
+        return self._current_turn
+
+    @current_turn.setter
+    def current_turn(self, turn):
+        self._key ^= TURN_KEYS[self._current_turn] ^ TURN_KEYS[turn]
+        self._current_turn = turn
+
+    @property
+    def prev_play(self):
+        return self._prev_play
+
+    @prev_play.setter
+    def prev_play(self, card_play):
+        self._key ^= get_play_key(self._prev_play) ^ get_play_key(card_play)
+        self._prev_play = card_play
+
+    def set_num_cards(self, position, n_cards):
+        """Sets the number of cards of the player at position"""
+        keys = NUM_CARDS_KEYS[position]
+        self._key ^= keys[self._player_cards[position]] ^ keys[n_cards]
+        self._player_cards[position] = n_cards
 
     def get_prev_base_card(self):
         return self.prev_play.get_base_card()
@@ -30,16 +97,53 @@ class GameState(object):
             self.prev_play = card_play
 
     def discard_cards(self, card_play):
-        self.player_cards[card_play.position] -= len(card_play.cards)
-        self.used_cards += card_play.cards
+        position = card_play.position
+        self.set_num_cards(position, self._player_cards[position] - len(card_play.cards))
+        self.used_card_set = self._used_card_set.union(card_play.cards)
 
     def play_was_used(self, card_play):
         if not card_play:
             return False
-        for card in card_play.cards:
-            if card in self.used_cards:
-                return True
-        return False
+        return bool(self._used_card_set.intersection(card_play.cards))
+
+    def apply_play(self, card_play):
+        """
+        Makes card_play, None or a pass play to pass, and passes the turn on
+        Returns the undo information for revert_play
+        """
+        undo = (card_play, self._prev_play, self._used_card_set, self._current_turn)
+        if card_play:
+            self.cards_played(card_play)
+        self.increment_turn()
+        return undo
+
+    def revert_play(self, undo):
+        """Exactly reverts a play made with apply_play"""
+        card_play, self.prev_play, self.used_card_set, self.current_turn = undo
+        if card_play:
+            position = card_play.position
+            self.set_num_cards(position, self._player_cards[position] + len(card_play.cards))
+
+    def snapshot(self):
+        """Returns the state as an immutable tuple for restore"""
+        return (self._used_card_set, tuple(self._player_cards), self._current_turn, self._prev_play)
+
+    def restore(self, snapshot):
+        """Returns the state to a snapshot"""
+        self.used_card_set, player_cards, self.current_turn, self.prev_play = snapshot
+        for position, n_cards in enumerate(player_cards):
+            if self._player_cards[position] != n_cards:
+                self.set_num_cards(position, n_cards)
+
+    def copy(self):
+        """Returns a copy that shares the immutable used cards and the previous play"""
+        other = object.__new__(GameState)
+        other._key = self._key
+        other._used_card_set = self._used_card_set
+        other._player_cards = list(self._player_cards)
+        other._current_turn = self._current_turn
+        other._prev_play = self._prev_play
+        return other
 
     def increment_turn(self):
         """
@@ -63,10 +167,8 @@ class GameState(object):
         """
         Returns a list of unrevealed cards based on player 0's perspective
         """
-        deck = get_new_ordered_deck()
-        deck = remove_from_deck(deck, self.used_cards)
-        deck = remove_from_deck(deck, player0_cards)
-        return deck
+        deck = CardSet.full_deck().difference(self.used_card_set)
+        return deck.difference(player0_cards).to_cards()
 
     def get_winner(self):
         """returns turn number of winner"""
@@ -77,7 +179,11 @@ class GameState(object):
 
     def __eq__(self, other):
         return other != None and\
-               self.used_cards == other.used_cards and\
+               self.used_card_set == other.used_card_set and\
                self.player_cards == other.player_cards and\
                self.current_turn == other.current_turn and\
-               str(self.prev_play) == str(other.prev_play)
\ No newline at end of file
+               str(self.prev_play) == str(other.prev_play)
+
+    def __hash__(self):
+        """the zobrist key of the game state"""
+        return self._key
\ No newline at end of file
@@ -5,7 +5,8 @@ Provides useful functionality for game operations
 
 from random import shuffle
 
-from pokai.game.card import Card, VALUES, SUITS
+from pokai.game.card import Card, VALUES, SUITS, DECK
+from pokai.game.card_set import CardSet
 
 NUM_PLAYERS = 3
 TOTAL_CARDS = 54
@@ -23,21 +24,18 @@ PASS = 'pass'
 
 def get_new_ordered_deck():
     """Returns an ordered list of all the cards"""
-    deck = []
-    for v in VALUES:
-        for s in SUITS:
-            if v == "Z":
-                deck.append(Card(v, 0))
-                deck.append(Card(v, 1))
-                break
-            else:
-                deck.append(Card(v, s))
-    return deck
+    return list(DECK)
 
-def get_new_shuffled_deck():
-    """Returns a shuffled list of all the cards"""
+def get_new_shuffled_deck(rng=None):
+    """
+    Returns a shuffled list of all the cards
+    rng -- random.Random to shuffle with, None for the global random stream
+    """
     deck = get_new_ordered_deck()
-    shuffle(deck)
+    if rng is None:
+        shuffle(deck)
+    else:
+        rng.shuffle(deck)
     return deck
 
 def remove_from_deck(deck, cards):
@@ -45,9 +43,10 @@ def remove_from_deck(deck, cards):
     if not deck or not cards:
         return deck
 
-    for c in cards:
-        try:
-            deck.remove(c)
-        except ValueError:
-            raise ValueError('{} is not in the deck!'.format(str(c)))
+    deck_set = CardSet.from_cards(deck)
+    removed = CardSet.from_cards(cards)
+    missing = removed.difference(deck_set)
+    if missing:
+        raise ValueError('{} is not in the deck!'.format(str(next(iter(missing)))))
+    deck[:] = [c for c in deck if c not in removed]
     return deck
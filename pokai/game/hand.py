@@ -3,82 +3,205 @@ Hand module
 Contains the Hand class and other constants
 """
 
-from itertools import groupby, combinations, chain
+from bisect import bisect_left
+from itertools import combinations, chain
 
 from pokai.game.card import Card, SMALL_JOKER_VALUE, BIG_JOKER_VALUE, MIN_VALUE, MAX_VALUE
+from pokai.game.card_set import CardSet
 from pokai.game.game_tools import SINGLES, DOUBLES, TRIPLES, QUADRUPLES, STRAIGHTS,\
                                       DOUBLE_STRAIGHTS, ADJ_TRIPLES, DOUBLE_JOKER
 from pokai.game.card_play import Play
+from pokai.game.zobrist import HAND_CARD_KEYS
+from pokai.game.move_generator import STRAIGHT_TERMINAL_VAL, SMALLEST_STRAIGHT, iter_values,\
+                                      generate_basics, generate_straights, generate_adj_triples,\
+                                      generate_wilds, get_lowest_basic, get_lowest_straight,\
+                                      get_lowest_adj_triple, get_lowest_wild, make_cards,\
+                                      get_legal_moves, get_play_signature
 
-STRAIGHT_TERMINAL_VAL = 11
-SMALLEST_STRAIGHT = [5, 3, 2]
 CATEGORIES = [SINGLES, DOUBLES, TRIPLES, QUADRUPLES, STRAIGHTS, DOUBLE_STRAIGHTS,
               ADJ_TRIPLES, DOUBLE_JOKER]
+BASICS = CATEGORIES[0: 4]
 WILDS = [DOUBLE_JOKER, QUADRUPLES]
+NUM_RANKS = MAX_VALUE + 1
+STRAIGHT_VALUES_MASK = (1 << (STRAIGHT_TERMINAL_VAL + 1)) - 1
+ADJ_TRIPLE_STARTS_MASK = (1 << MAX_VALUE) - 1
+JOKERS_MASK = (1 << SMALL_JOKER_VALUE) | (1 << BIG_JOKER_VALUE)
 
 class Hand(object):
     """
     Hand object
-    Contains a list of cards, _cards.
-    Contains a dictionary of categories that a hand can play
+    Contains a CardSet of cards, _card_set, and a rank count vector, _counts,
+    where _counts[value] is the number of cards of that value (3 .. 2, small joker, big joker).
+    Contains a dictionary of categories that a hand can play, which is updated
+    only for the values touched when cards are added or removed.
+    The zobrist key of the cards, _key, is updated with every card and is the hash of the hand.
     """
     def __init__(self, cards):
         super(Hand, self).__init__()
+        self._card_set = CardSet()
+        self._key = 0
         self._cards = []
+        self._counts = [0] * NUM_RANKS
+        self._rank_cards = [[] for _ in range(NUM_RANKS)]
+        # bit v of _level_masks[i] is set when the hand has more than i cards of value v
+        self._level_masks = [0] * len(BASICS)
+        # values covered by the single and double straight categories
+        self._straight_masks = [0, 0]
+        self._categories = {x:[] for x in CATEGORIES}
+        # values of each basic group, kept parallel to _categories for bisecting
+        self._category_values = {x:[] for x in BASICS + [ADJ_TRIPLES]}
+        touched = 0
         for c in cards:
-            self._cards.append(c)
-        self._categories = {}
-        self._organize()
+            if self._add(c):
+                touched |= 1 << c.value
+        self._organize(touched)
 
-    def _organize(self):
+    def _organize(self, touched):
         """
-        Sorts the cards based on value and organizes the cards in categories
+        Updates the categories for the values in the bit mask touched
         """
-        self._cards.sort(key=lambda x: x.value, reverse=False)
-        self._categories = {x:[] for x in CATEGORIES}
-        counts = {value : list(c) for value, c in groupby(self._cards, lambda card: card.value)}
-        self._organize_basics(counts)
-        self._organize_straights(counts)
-        self._organize_jokers(counts)
-
-    def _organize_basics(self, counts):
-        """helper function that organizes singles, doubles, triples, and quadruples"""
-        for value, card_group in counts.items():
-            length = len(card_group)
-            for i in range(length):
-                self._categories[CATEGORIES[i]].append(card_group[: i + 1])
-            self._organize_adj_triples(counts, value)
-
-    def _organize_adj_triples(self, counts, value):
-        """helper function that organizes adj triples that start
-        at value"""
-        if (value + 1) not in counts:
+        if not touched:
             return
-        if len(counts[value]) == 3 and len(counts[value + 1]) == 3:
-            pair = counts[value] + counts[value + 1]
-            self._categories[ADJ_TRIPLES].append(pair)
-
-    def _organize_straights(self, counts):
-        """helper function that organizes straights"""
-        for i in range(2):
-            last_visited = -1
-            for value in counts:
-                if value <= last_visited:
-                    continue
-                
-                straight_group = []
-                # make sure value is Ace or less
-                while value in counts and value <= STRAIGHT_TERMINAL_VAL and len(counts[value]) > i:
-                    straight_group += counts[value][0: i + 1]
-                    value += 1
-                if len(straight_group) // (i + 1) >= SMALLEST_STRAIGHT[i]:
-                    self._categories[CATEGORIES[4 + i]].append(straight_group)
-                    last_visited = value - 1
-
-    def _organize_jokers(self, counts):
+        self._cards = None
+        changed_levels = 0
+        values = touched
+        while values:
+            low = values & -values
+            value = low.bit_length() - 1
+            changed_levels |= self._organize_basics(value)
+            values ^= low
+        self._organize_adj_triples(touched)
+        if touched & STRAIGHT_VALUES_MASK:
+            for i in range(2):
+                if changed_levels >> i & 1 or touched & self._straight_masks[i]:
+                    self._organize_straights(i)
+        if touched & JOKERS_MASK:
+            self._organize_jokers()
+
+    def _organize_basics(self, value):
+        """
+        helper function that organizes singles, doubles, triples, and quadruples of value
+        Returns a bit mask of the levels whose membership changed
+        """
+        card_group = self._rank_cards[value]
+        length = len(card_group)
+        bit = 1 << value
+        changed_levels = 0
+        for i, play_type in enumerate(BASICS):
+            level_mask = self._level_masks[i]
+            values = self._category_values[play_type]
+            groups = self._categories[play_type]
+            if length > i:
+                if level_mask & bit:
+                    groups[bisect_left(values, value)] = card_group[: i + 1]
+                else:
+                    index = bisect_left(values, value)
+                    values.insert(index, value)
+                    groups.insert(index, card_group[: i + 1])
+                    self._level_masks[i] = level_mask | bit
+                    changed_levels |= 1 << i
+            elif level_mask & bit:
+                index = bisect_left(values, value)
+                del values[index]
+                del groups[index]
+                self._level_masks[i] = level_mask & ~bit
+                changed_levels |= 1 << i
+        return changed_levels
+
+    def _organize_adj_triples(self, touched):
+        """helper function that organizes adj triples that start
+        at or right before a touched value"""
+        counts = self._counts
+        values = self._category_values[ADJ_TRIPLES]
+        groups = self._categories[ADJ_TRIPLES]
+        starts = (touched | touched >> 1) & ADJ_TRIPLE_STARTS_MASK
+        while starts:
+            low = starts & -starts
+            value = low.bit_length() - 1
+            starts ^= low
+            index = bisect_left(values, value)
+            present = index < len(values) and values[index] == value
+            if counts[value] == 3 and counts[value + 1] == 3:
+                group = self._rank_cards[value] + self._rank_cards[value + 1]
+                if present:
+                    groups[index] = group
+                else:
+                    values.insert(index, value)
+                    groups.insert(index, group)
+            elif present:
+                del values[index]
+                del groups[index]
+
+    def _organize_straights(self, i):
+        """
+        helper function that organizes straights where each card occurs i + 1 times
+        Straights are the runs of set bits in the level mask up to the Ace
+        """
+        mask = self._level_masks[i] & STRAIGHT_VALUES_MASK
+        straights = []
+        covered = 0
+        while mask:
+            low = mask & -mask
+            start = low.bit_length() - 1
+            end = ((mask + low) & ~mask).bit_length() - 1
+            mask &= ~((1 << end) - 1)
+            if end - start >= SMALLEST_STRAIGHT[i]:
+                straights.append([c for v in range(start, end)
+                                  for c in self._rank_cards[v][0: i + 1]])
+                covered |= (1 << end) - low
+        self._categories[CATEGORIES[4 + i]] = straights
+        self._straight_masks[i] = covered
+
+    def _organize_jokers(self):
         """helper function that organizes jokers"""
-        if SMALL_JOKER_VALUE in counts and BIG_JOKER_VALUE in counts:
-            self._categories[DOUBLE_JOKER].append([self._cards[-1], self._cards[-2]])
+        jokers = []
+        if self._counts[SMALL_JOKER_VALUE] and self._counts[BIG_JOKER_VALUE]:
+            jokers.append([self._rank_cards[BIG_JOKER_VALUE][0],
+                           self._rank_cards[SMALL_JOKER_VALUE][0]])
+        self._categories[DOUBLE_JOKER] = jokers
+
+    def __deepcopy__(self, memo):
+        """
+        Copies the hand without copying cards, which are immutable singletons,
+        or the groups in the categories, which are replaced rather than mutated
+        """
+        other = object.__new__(Hand)
+        other._card_set = self._card_set
+        other._key = self._key
+        other._cards = None
+        other._counts = list(self._counts)
+        other._rank_cards = [list(cards) for cards in self._rank_cards]
+        other._level_masks = list(self._level_masks)
+        other._straight_masks = list(self._straight_masks)
+        other._categories = {x: list(groups) for x, groups in self._categories.items()}
+        other._category_values = {x: list(values) for x, values in self._category_values.items()}
+        memo[id(self)] = other
+        return other
+
+    @staticmethod
+    def unique_plays(plays):
+        """
+        Yields the first play of each rank key, dropping plays that
+        only differ in the suits of their cards
+        """
+        seen = set()
+        for play in plays:
+            key = play.get_rank_key()
+            if key not in seen:
+                seen.add(key)
+                yield play
+
+    def make_play(self, move):
+        """Returns a new Play with the cards of a Move"""
+        return Play(-1, make_cards(move, self._rank_cards), len(move.kickers),
+                    play_type=move.play_type)
+
+    def _get_values_mask(self, cards):
+        """Returns a bit mask of the values of cards"""
+        mask = 0
+        for c in cards:
+            mask |= 1 << c.value
+        return mask
 
     def generate_possible_extra_cards(self, exclude_cards, each_count, extra_type):
         """
@@ -89,56 +212,26 @@ class Hand(object):
         """
         if extra_type != 1 and extra_type != 2:
             return []
-        extra_cards = []
-        exclude_values = set([c.value for c in exclude_cards])
-        possible_cards = []
-        for card_group in self._categories[CATEGORIES[each_count - 1]]:
-            if card_group[0].value not in exclude_values:
-                possible_cards.append(card_group)
+        candidates = self._level_masks[each_count - 1] & ~self._get_values_mask(exclude_cards)
+        possible_cards = [self._rank_cards[value][0: each_count]
+                          for value in iter_values(candidates)]
         extra_card_combos = combinations(possible_cards, extra_type)
         for combo in extra_card_combos:
             yield list(chain.from_iterable(combo))
 
-    def _get_extra_cards(self, exclude_cards, each_count, extra_type):
-        """        
-        exclude_cards -- cards to exclude from the list
-        each_count -- whether the extra cards should be singles are doubles
-        extra_type -- (1 or 2) the groupings of the extra cards (1 or 2 singles or doubles)
-        """
-        iterator = self.generate_possible_extra_cards(exclude_cards, each_count, extra_type)
-        return next(iterator, [])
-
-    def generate_possible_low_foundations(self, other_card, play_type):
-        """
-        Returns an iterator of all basic foundations
-        (individual singles, doubles, triples, or quadruples)
-        """
-        possibles = []
-        for card_group in self._categories[play_type]:
-            card = card_group[0]
-            if not other_card or card.value > other_card.value:
-                yield Play(-1, card_group, 0, play_type=play_type)
+    @staticmethod
+    def _get_base_value(other_card):
+        """Returns the value a play has to beat, -1 if there is no card to beat"""
+        return other_card.value if other_card else -1
 
     def generate_possible_basics(self, other_card, each_count, extra=0):
         """
         Returns an iterator of all the possible basic plays
         """
-        if each_count > 4:
-            return None
-        if each_count < 3:
-            extra = 0
-
-        plays = self.generate_possible_low_foundations(other_card, CATEGORIES[each_count - 1])
-        for play in plays:
-            extra_cards = []
-            if each_count == 3 and extra:
-                extra_cards = self._get_extra_cards(play.cards, extra, 1)
-            elif each_count == 4 and extra:
-                extra_cards = self._get_extra_cards(play.cards, extra // 2, 2)
-            if extra_cards or not extra:
-                play.cards += extra_cards
-                play.num_extra = len(extra_cards)
-                yield play
+        moves = generate_basics(self._level_masks, each_count,
+                                Hand._get_base_value(other_card), extra)
+        for move in moves:
+            yield self.make_play(move)
 
     def get_low(self, other_card, each_count, extra=0):
         """
@@ -150,22 +243,28 @@ class Hand(object):
                                            (2 or 4 for quad)
         Returns the lowest play with pos -1 or None
         """
-        iterator = self.generate_possible_basics(other_card, each_count, extra=extra)
-        return next(iterator, Play.get_pass_play())
+        move = get_lowest_basic(self._level_masks, each_count,
+                                Hand._get_base_value(other_card), extra)
+        return self._get_move_play(move)
+
+    def _get_move_play(self, move):
+        """Returns the play of a move or a pass play if there is no move"""
+        if move is None:
+            return Play.get_pass_play()
+        return self.make_play(move)
 
     def generate_possible_straights(self, other_card, each_count, length):
         """
         Returns an iterator of all the possible straights
-        length = each_count * distinct number of cards
+        length = distinct number of cards
         """
-        play_type = CATEGORIES[4 + each_count - 1]
-        for card_group in self._categories[play_type]:
-            if not other_card:
-                yield Play(-1, card_group, 0, play_type=play_type)
-                continue
-            for i, c in enumerate(card_group):
-                if c.value > other_card.value and len(card_group) - i >= length * each_count:
-                    yield Play(-1, card_group[i: i + length * each_count], 0, play_type=play_type)
+        if each_count == 3:
+            yield from self.generate_possible_adj_triples(other_card, 0)
+            return
+        moves = generate_straights(self._level_masks, each_count,
+                                   Hand._get_base_value(other_card), length)
+        for move in moves:
+            yield self.make_play(move)
 
     def get_low_straight(self, other_card, each_count, length):
         """
@@ -174,26 +273,24 @@ class Hand(object):
         other_card -- lowest card in the opposing straight
         each_count -- if its a single, double, or triple straight
         length -- length of the opposing straight
-                  each_count * distinct number of cards
+                  distinct number of cards
                   length is ignored when other_card is None
 
         Returns play with pos of -1 or None
         """
-        iterator = self.generate_possible_straights(other_card, each_count, length)
-        return next(iterator, Play.get_pass_play())
+        if each_count == 3:
+            return self.get_low_adj_triple(other_card, 0)
+        move = get_lowest_straight(self._level_masks, each_count,
+                                   Hand._get_base_value(other_card), length)
+        return self._get_move_play(move)
 
     def generate_possible_adj_triples(self, other_card, num_extra):
         """
         Returns an iterator of all the possible adj triples
         """
-        plays = self.generate_possible_straights(other_card, 3, 2)
-        for play in plays:
-            extra_cards = []
-            extra_cards = self._get_extra_cards(play.cards, num_extra // 2, 2)
-            if not num_extra or extra_cards:
-                play.cards += extra_cards
-                play.num_extra = len(extra_cards)
-                yield play
+        moves = generate_adj_triples(self._level_masks, Hand._get_base_value(other_card), num_extra)
+        for move in moves:
+            yield self.make_play(move)
 
     def get_low_adj_triple(self, other_card, num_extra):
         """
@@ -204,24 +301,38 @@ class Hand(object):
                        4 if it carries 2 doubles
         Returns play with pos of -1 or None
         """
-        iterator = self.generate_possible_adj_triples(other_card, num_extra)
-        return next(iterator, Play.get_pass_play())
+        move = get_lowest_adj_triple(self._level_masks, Hand._get_base_value(other_card), num_extra)
+        return self._get_move_play(move)
 
     def generate_possible_wilds(self, other_card):
         """
         Returns an iterator of all the possible wilds
         """
-        yield from self.generate_possible_basics(other_card, 4)
-        if self._categories[DOUBLE_JOKER]:
-            yield Play(-1, self._categories[DOUBLE_JOKER][0], 0, play_type=DOUBLE_JOKER)
+        for move in generate_wilds(self._level_masks, Hand._get_base_value(other_card)):
+            yield self.make_play(move)
 
     def get_low_wild(self, other_card):
         """
         Returns the lowest wild play that is above given card
         Pos of the play is -1
         """
-        iterator = self.generate_possible_wilds(other_card)
-        return next(iterator, Play.get_pass_play())
+        move = get_lowest_wild(self._level_masks, Hand._get_base_value(other_card))
+        return self._get_move_play(move)
+
+    def all_legal_moves(self, prev_play):
+        """
+        Returns a tuple of every distinct legal Move against prev_play
+        prev_play -- the play to beat, None or a pass play when leading
+        """
+        return get_legal_moves(tuple(self._counts), get_play_signature(prev_play))
+
+    def all_legal_plays(self, prev_play):
+        """
+        Returns a list of every distinct legal play against prev_play, including
+        every combination of extra cards. Plays have a position of -1
+        prev_play -- the play to beat, None or a pass play when leading
+        """
+        return [self.make_play(move) for move in self.all_legal_moves(prev_play)]
 
     def get_num_wild(self):
         """
@@ -231,45 +342,90 @@ class Hand(object):
 
     def add_cards(self, cards=None, card_strs=None):
         """adds a list of cards or list of string of cards to hand"""
-        did_add = cards or card_strs
+        touched = 0
         if cards:
             for c in cards:
-                self._add(c)
+                if self._add(c):
+                    touched |= 1 << c.value
         if card_strs:
             for card_str in card_strs:
-                self._add(Card.str_to_card(card_str))
-        if did_add:
-            self._organize()
+                c = Card.str_to_card(card_str)
+                if self._add(c):
+                    touched |= 1 << c.value
+        self._organize(touched)
 
     def _add(self, card):
-        if card.value > -1 and not self.contains(card):
-            self._cards.append(card)
+        """adds card to the set and count vector, returns true if it was new"""
+        if card.value < 0 or card in self._card_set:
+            return False
+        self._card_set = self._card_set.add(card)
+        self._key ^= HAND_CARD_KEYS[card.id]
+        self._counts[card.value] += 1
+        rank_cards = self._rank_cards[card.value]
+        index = 0
+        while index < len(rank_cards) and rank_cards[index].id < card.id:
+            index += 1
+        rank_cards.insert(index, card)
+        return True
 
     def remove_cards(self, cards):
         """removes a list of cards from hand"""
-        for c in cards:
-            self._remove(c)
-        self._organize()
-
-    def _remove(self, card):
-        if self.contains(card):
-            self._cards.remove(card)
+        removed = self._card_set.intersection(cards)
+        self._card_set = self._card_set.difference(removed)
+        touched = 0
+        for c in removed:
+            self._key ^= HAND_CARD_KEYS[c.id]
+            self._counts[c.value] -= 1
+            self._rank_cards[c.value].remove(c)
+            touched |= 1 << c.value
+        self._organize(touched)
+
+    def apply_play(self, card_play):
+        """removes the cards of a play from hand, None or a pass play changes nothing"""
+        if card_play:
+            self.remove_cards(card_play.cards)
+
+    def revert_play(self, card_play):
+        """puts the cards of a play applied with apply_play back into hand"""
+        if card_play:
+            self.add_cards(card_play.cards)
+
+    def snapshot(self):
+        """returns the cards in hand as an immutable CardSet for restore"""
+        return self._card_set
+
+    def restore(self, snapshot):
+        """returns hand to a snapshot, only the cards that changed are reorganized"""
+        if snapshot == self._card_set:
+            return
+        self.remove_cards(self._card_set.difference(snapshot))
+        self.add_cards(snapshot.difference(self._card_set))
 
     def contains(self, card):
         """returns true if the same card exists in hand"""
-        return card in self._cards
+        return card in self._card_set
+
+    def get_counts(self):
+        """gets the rank count vector of the hand"""
+        return self._counts
+
+    def get_card_set(self):
+        """gets all cards in hand as a CardSet"""
+        return self._card_set
 
     def get_card(self, index):
         """gets a single card at index"""
-        return self._cards[index]
+        return self.get_cards()[index]
 
     def get_cards(self):
         """gets all cards in hand"""
+        if self._cards is None:
+            self._cards = self._card_set.to_cards()
         return self._cards
 
     def num_cards(self):
         """number of cards"""
-        return len(self._cards)
+        return self._card_set.popcount()
 
     def print_categories(self):
         """prints out the sorted categories of the hand"""
@@ -281,16 +437,17 @@ class Hand(object):
                 print('|' + ' '.join('{}'.format(str(l)) for l in k) + '|')
 
     def __eq__(self, other):
-        """equality function"""
-        for c in self._cards:
-            if not other.contains(c):
-                return False
-        return True
+        """equality function, hands are equal when they hold the same cards"""
+        return isinstance(other, Hand) and self._card_set == other.get_card_set()
+
+    def __hash__(self):
+        """the zobrist key of the cards in hand"""
+        return self._key
 
     def __str__(self):
         """How the card is turned into a string"""
         sep = " | "
         s = sep
-        for card in self._cards:
+        for card in self.get_cards():
             s += card.display + sep
         return s.strip()
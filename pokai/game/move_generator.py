@@ -0,0 +1,336 @@
+"""
+Move generator module.
+Enumerates plays straight from a hand's rank histogram as compact Move descriptors.
+
+The histogram is held as level masks: bit v of masks[i] is set when the hand has
+more than i cards of value v. Cards are only attached to a move by make_cards.
+"""
+
+from collections import namedtuple
+from functools import lru_cache
+from itertools import combinations
+
+from pokai.game.card import MAX_VALUE, SMALL_JOKER_VALUE, BIG_JOKER_VALUE
+from pokai.game.game_tools import SINGLES, DOUBLES, TRIPLES, QUADRUPLES, STRAIGHTS,\
+                                 DOUBLE_STRAIGHTS, ADJ_TRIPLES, DOUBLE_JOKER
+
+STRAIGHT_TERMINAL_VAL = 11
+SMALLEST_STRAIGHT = [5, 3, 2]
+NUM_LEVELS = 4
+LEGAL_MOVES_CACHE_SIZE = 2 ** 16
+
+ALL_VALUES_MASK = (1 << (MAX_VALUE + 1)) - 1
+STRAIGHT_VALUES_MASK = (1 << (STRAIGHT_TERMINAL_VAL + 1)) - 1
+
+BASIC_TYPES = [SINGLES, DOUBLES, TRIPLES, QUADRUPLES]
+STRAIGHT_TYPES = [STRAIGHTS, DOUBLE_STRAIGHTS, ADJ_TRIPLES]
+EACH_COUNT = {SINGLES: 1, DOUBLES: 2, TRIPLES: 3, QUADRUPLES: 4, STRAIGHTS: 1,
+              DOUBLE_STRAIGHTS: 2, ADJ_TRIPLES: 3, DOUBLE_JOKER: 1}
+
+# ABOVE_MASKS[base + 1] -- values strictly greater than base
+ABOVE_MASKS = [ALL_VALUES_MASK & ~((1 << (base + 1)) - 1) for base in range(-1, MAX_VALUE + 1)]
+# WINDOW_MASKS[length][start] -- the values start .. start + length - 1
+WINDOW_MASKS = [[((1 << length) - 1) << start for start in range(MAX_VALUE + 1)]
+                for length in range(STRAIGHT_TERMINAL_VAL + 2)]
+
+# A single play without its cards
+# play_type -- the kind of play
+# base -- the lowest value of the base cards
+# length -- number of distinct values in the base cards (1 for basics)
+# kickers -- values of the extra cards, one entry per card, ascending
+Move = namedtuple('Move', ['play_type', 'base', 'length', 'kickers'])
+
+DOUBLE_JOKER_MOVE = Move(DOUBLE_JOKER, SMALL_JOKER_VALUE, 2, ())
+
+def get_level_masks(counts):
+    """Returns the level masks of a rank count vector"""
+    masks = [0] * NUM_LEVELS
+    for value, count in enumerate(counts):
+        for i in range(min(count, NUM_LEVELS)):
+            masks[i] |= 1 << value
+    return masks
+
+def iter_values(mask):
+    """Yields the values of the set bits of mask in ascending order"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+def get_runs(mask):
+    """Yields (start, end) of every run of consecutive values in mask, end exclusive"""
+    while mask:
+        low = mask & -mask
+        start = low.bit_length() - 1
+        end = ((mask + low) & ~mask).bit_length() - 1
+        mask &= ~((1 << end) - 1)
+        yield start, end
+
+def get_window_starts(mask, length):
+    """Returns a mask of the values that start length consecutive values in mask"""
+    starts = mask
+    for k in range(1, length):
+        starts &= mask >> k
+    return starts
+
+def get_lowest_kickers(masks, exclude_mask, each_count, num_groups):
+    """
+    Returns the lowest kicker values or None if the hand cannot carry them
+    exclude_mask -- values that cannot be used as kickers
+    each_count -- 1 for single kickers and 2 for double kickers
+    num_groups -- number of kicker singles or doubles
+    """
+    candidates = masks[each_count - 1] & ~exclude_mask
+    kickers = []
+    for _ in range(num_groups):
+        if not candidates:
+            return None
+        low = candidates & -candidates
+        kickers += [low.bit_length() - 1] * each_count
+        candidates ^= low
+    return tuple(kickers)
+
+def _get_kicker_shape(play_type, num_extra):
+    """Returns (each_count, num_groups) of the kickers a play with num_extra extra cards carries"""
+    if not num_extra:
+        return 0, 0
+    if play_type == TRIPLES:
+        return num_extra, 1
+    return num_extra // 2, 2
+
+def get_lowest_basic(masks, each_count, base=-1, num_extra=0):
+    """Returns the first move of generate_basics without creating a generator, or None"""
+    if each_count > NUM_LEVELS:
+        return None
+    if each_count < 3:
+        num_extra = 0
+    candidates = masks[each_count - 1] & ABOVE_MASKS[base + 1]
+    if not num_extra:
+        if not candidates:
+            return None
+        return Move(BASIC_TYPES[each_count - 1], (candidates & -candidates).bit_length() - 1, 1, ())
+    for move in generate_basics(masks, each_count, base, num_extra):
+        return move
+    return None
+
+def generate_basics(masks, each_count, base=-1, num_extra=0):
+    """
+    Yields the singles, doubles, triples or quadruples above base, lowest first,
+    with the lowest kickers that fit num_extra
+    """
+    if each_count > NUM_LEVELS:
+        return
+    if each_count < 3:
+        num_extra = 0
+    play_type = BASIC_TYPES[each_count - 1]
+    kicker_count, num_groups = _get_kicker_shape(play_type, num_extra)
+    for value in iter_values(masks[each_count - 1] & ABOVE_MASKS[base + 1]):
+        kickers = ()
+        if num_extra:
+            kickers = get_lowest_kickers(masks, 1 << value, kicker_count, num_groups)
+            if kickers is None:
+                continue
+        yield Move(play_type, value, 1, kickers)
+
+def generate_straights(masks, each_count, base=-1, length=-1):
+    """
+    Yields straights and double straights above base, lowest first
+    When base is -1, the longest straights are yielded and length is ignored
+    """
+    play_type = STRAIGHT_TYPES[each_count - 1]
+    mask = masks[each_count - 1] & STRAIGHT_VALUES_MASK
+    if base < 0:
+        for start, end in get_runs(mask):
+            if end - start >= SMALLEST_STRAIGHT[each_count - 1]:
+                yield Move(play_type, start, end - start, ())
+        return
+    starts = get_window_starts(mask, length) & ABOVE_MASKS[base + 1]
+    for start in iter_values(starts):
+        yield Move(play_type, start, length, ())
+
+def get_lowest_straight(masks, each_count, base=-1, length=-1):
+    """Returns the first move of generate_straights without creating a generator, or None"""
+    mask = masks[each_count - 1] & STRAIGHT_VALUES_MASK
+    if base < 0:
+        smallest = SMALLEST_STRAIGHT[each_count - 1]
+        while mask:
+            low = mask & -mask
+            start = low.bit_length() - 1
+            end = ((mask + low) & ~mask).bit_length() - 1
+            if end - start >= smallest:
+                return Move(STRAIGHT_TYPES[each_count - 1], start, end - start, ())
+            mask &= ~((1 << end) - 1)
+        return None
+    starts = get_window_starts(mask, length) & ABOVE_MASKS[base + 1]
+    if not starts:
+        return None
+    return Move(STRAIGHT_TYPES[each_count - 1], (starts & -starts).bit_length() - 1, length, ())
+
+def get_lowest_adj_triple(masks, base=-1, num_extra=0):
+    """Returns the first move of generate_adj_triples, or None"""
+    if not (masks[2] & ~masks[3]) & (masks[2] & ~masks[3]) >> 1:
+        return None
+    for move in generate_adj_triples(masks, base, num_extra):
+        return move
+    return None
+
+def get_lowest_wild(masks, base=-1):
+    """Returns the first move of generate_wilds without creating a generator, or None"""
+    move = get_lowest_basic(masks, 4, base)
+    if move is None and masks[0] >> SMALL_JOKER_VALUE & 1 and masks[0] >> BIG_JOKER_VALUE & 1:
+        return DOUBLE_JOKER_MOVE
+    return move
+
+def generate_adj_triples(masks, base=-1, num_extra=0):
+    """
+    Yields two adjacent triples above base, lowest first, with the lowest
+    kickers that fit num_extra
+    """
+    exact_triples = masks[2] & ~masks[3]
+    starts = get_window_starts(exact_triples, 2) & ABOVE_MASKS[base + 1]
+    kicker_count, num_groups = _get_kicker_shape(ADJ_TRIPLES, num_extra)
+    for start in iter_values(starts):
+        kickers = ()
+        if num_extra:
+            kickers = get_lowest_kickers(masks, WINDOW_MASKS[2][start], kicker_count, num_groups)
+            if kickers is None:
+                continue
+        yield Move(ADJ_TRIPLES, start, 2, kickers)
+
+def generate_wilds(masks, base=-1):
+    """Yields the quadruples above base followed by the double joker"""
+    yield from generate_basics(masks, 4, base)
+    if masks[0] >> SMALL_JOKER_VALUE & 1 and masks[0] >> BIG_JOKER_VALUE & 1:
+        yield DOUBLE_JOKER_MOVE
+
+def make_cards(move, rank_cards):
+    """
+    Returns the cards of a move
+    rank_cards -- list of the cards of each value in the hand
+    """
+    if move.play_type == DOUBLE_JOKER:
+        return [rank_cards[BIG_JOKER_VALUE][0], rank_cards[SMALL_JOKER_VALUE][0]]
+    each_count = EACH_COUNT[move.play_type]
+    cards = []
+    for value in range(move.base, move.base + move.length):
+        cards += rank_cards[value][0: each_count]
+    kickers = move.kickers
+    i = 0
+    while i < len(kickers):
+        value = kickers[i]
+        j = i
+        while j < len(kickers) and kickers[j] == value:
+            j += 1
+        cards += rank_cards[value][0: j - i]
+        i = j
+    return cards
+
+def generate_kickers(masks, exclude_mask, each_count, num_groups):
+    """
+    Yields every combination of kicker values, lowest first
+    exclude_mask -- values that cannot be used as kickers
+    each_count -- 1 for single kickers and 2 for double kickers
+    num_groups -- number of kicker singles or doubles
+    """
+    candidates = list(iter_values(masks[each_count - 1] & ~exclude_mask))
+    for combo in combinations(candidates, num_groups):
+        yield tuple(value for value in combo for _ in range(each_count))
+
+def _generate_all_kickers(masks, exclude_mask, play_type, num_extra):
+    """Yields the kickers of every legal shape with num_extra extra cards"""
+    if not num_extra:
+        yield ()
+        return
+    each_count, num_groups = _get_kicker_shape(play_type, num_extra)
+    yield from generate_kickers(masks, exclude_mask, each_count, num_groups)
+
+def _generate_all_with_type(masks, play_type, base, length, extras):
+    """
+    Yields every move of play_type above base
+    length -- number of distinct values in the base, -1 for every straight length
+    extras -- the numbers of extra cards that the move can carry
+    """
+    above = ABOVE_MASKS[base + 1]
+    if play_type in BASIC_TYPES:
+        each_count = EACH_COUNT[play_type]
+        for value in iter_values(masks[each_count - 1] & above):
+            for num_extra in extras:
+                for kickers in _generate_all_kickers(masks, 1 << value, play_type, num_extra):
+                    yield Move(play_type, value, 1, kickers)
+    elif play_type == ADJ_TRIPLES:
+        exact_triples = masks[2] & ~masks[3]
+        for start in iter_values(get_window_starts(exact_triples, 2) & above):
+            for num_extra in extras:
+                for kickers in _generate_all_kickers(masks, WINDOW_MASKS[2][start],
+                                                     play_type, num_extra):
+                    yield Move(play_type, start, 2, kickers)
+    elif play_type in STRAIGHT_TYPES:
+        each_count = EACH_COUNT[play_type]
+        mask = masks[each_count - 1] & STRAIGHT_VALUES_MASK
+        lengths = [length]
+        if length < 0:
+            lengths = range(SMALLEST_STRAIGHT[each_count - 1], STRAIGHT_TERMINAL_VAL + 2)
+        for straight_length in lengths:
+            for start in iter_values(get_window_starts(mask, straight_length) & above):
+                yield Move(play_type, start, straight_length, ())
+    elif play_type == DOUBLE_JOKER:
+        if masks[0] >> SMALL_JOKER_VALUE & 1 and masks[0] >> BIG_JOKER_VALUE & 1:
+            yield DOUBLE_JOKER_MOVE
+
+# the numbers of extra cards each kind of lead can carry
+LEAD_EXTRAS = [(SINGLES, [0]), (DOUBLES, [0]), (TRIPLES, [0, 1, 2]), (QUADRUPLES, [0, 2, 4]),
+               (STRAIGHTS, [0]), (DOUBLE_STRAIGHTS, [0]), (ADJ_TRIPLES, [0, 2, 4]),
+               (DOUBLE_JOKER, [0])]
+
+def get_play_signature(card_play):
+    """
+    Returns the suit free (play_type, base, length, num_extra) of a play,
+    or None for a missing or pass play
+    """
+    if not card_play:
+        return None
+    each_count = EACH_COUNT[card_play.play_type]
+    length = card_play.num_base_cards() // each_count
+    return (card_play.play_type, card_play.get_base_card().value, length, card_play.num_extra)
+
+def get_move_signature(move):
+    """Returns the play signature of the play of a Move, see get_play_signature"""
+    if move.play_type == DOUBLE_JOKER:
+        # the big joker is the first card of the play
+        return (DOUBLE_JOKER, BIG_JOKER_VALUE, 2, 0)
+    return (move.play_type, move.base, move.length, len(move.kickers))
+
+@lru_cache(maxsize=None)
+def get_move_values(move):
+    """Returns the values of the cards of a Move, one entry per card, ascending"""
+    if move.play_type == DOUBLE_JOKER:
+        return (SMALL_JOKER_VALUE, BIG_JOKER_VALUE)
+    each_count = EACH_COUNT[move.play_type]
+    values = [value for value in range(move.base, move.base + move.length) for _ in range(each_count)]
+    return tuple(sorted(values + list(move.kickers)))
+
+@lru_cache(maxsize=LEGAL_MOVES_CACHE_SIZE)
+def get_legal_moves(counts, signature):
+    """
+    Returns a tuple of every distinct legal move of a hand, lowest first
+    counts -- tuple rank count vector of the hand
+    signature -- play signature of the play to beat, None when leading
+    Results are memoized in a bounded LRU cache
+    """
+    masks = get_level_masks(counts)
+    moves = []
+    if signature is None:
+        for play_type, extras in LEAD_EXTRAS:
+            moves += _generate_all_with_type(masks, play_type, -1, -1, extras)
+        return tuple(moves)
+
+    play_type, base, length, num_extra = signature
+    if play_type == DOUBLE_JOKER:
+        return ()
+    if play_type == QUADRUPLES and not num_extra:
+        moves += _generate_all_with_type(masks, QUADRUPLES, base, 1, [0])
+    else:
+        moves += _generate_all_with_type(masks, play_type, base, length, [num_extra])
+        moves += _generate_all_with_type(masks, QUADRUPLES, -1, 1, [0])
+    moves += _generate_all_with_type(masks, DOUBLE_JOKER, -1, 2, [0])
+    return tuple(moves)
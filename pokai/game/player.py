@@ -24,16 +24,21 @@ class Player(object):
     def info(self):
         self.hand.print_categories()
 
+    def generate_possible_leads(self, game_state):
+        """
+        Returns an iterator of the lowest lead play of each kind, in order of preference
+        """
+        yield self._get_lead_adj_triples(game_state)
+        yield self._get_lead_straight(2, game_state)
+        yield self._get_lead_straight(1, game_state)
+        yield self._get_lead_triple(game_state)
+        yield self._get_lead_basic(2, game_state)
+        yield self._get_lead_basic(1, game_state)
+        yield self._get_lead_quadruple(game_state)
+        yield self._get_lead_wild(game_state)
+
     def get_possible_leads(self, game_state):
-        possible_leads = []
-        possible_leads.append(self._get_lead_adj_triples(game_state))
-        possible_leads.append(self._get_lead_straight(2, game_state))
-        possible_leads.append(self._get_lead_straight(1, game_state))
-        possible_leads.append(self._get_lead_triple(game_state))
-        possible_leads.append(self._get_lead_basic(2, game_state))
-        possible_leads.append(self._get_lead_basic(1, game_state))
-        possible_leads.append(self._get_lead_quadruple(game_state))
-        possible_leads.append(self._get_lead_wild(game_state))
+        possible_leads = self.generate_possible_leads(game_state)
         possible_leads = list(filter(lambda play: play, possible_leads))
         return possible_leads
 
@@ -42,7 +47,7 @@ class Player(object):
         Gets the best play if this player is starting.
         Returns lead play
         """
-        return self.get_possible_leads(game_state)[0]
+        return next(filter(lambda play: play, self.generate_possible_leads(game_state)))
 
     def _get_lead_basic(self, each_count, game_state):
         return self.hand.get_low(None, each_count)
@@ -0,0 +1,58 @@
+"""
+Zobrist module.
+Random 64 bit keys of the parts of a position. The key of a position is the xor
+of the keys of its parts, so it can be updated incrementally when a part changes.
+The keys come from a fixed seed and are the same in every process.
+"""
+
+import random
+
+from pokai.game.card import DECK, MAX_VALUE
+from pokai.game.game_tools import TOTAL_CARDS, NUM_PLAYERS, SINGLES, DOUBLES, TRIPLES, QUADRUPLES, STRAIGHTS,\
+                                  DOUBLE_STRAIGHTS, ADJ_TRIPLES, DOUBLE_JOKER
+from pokai.game.move_generator import get_play_signature
+
+ZOBRIST_SEED = 20170101
+
+_random = random.Random(ZOBRIST_SEED)
+
+def _get_keys(n):
+    return [_random.getrandbits(64) for _ in range(n)]
+
+# a card in hand and a card that has been played
+HAND_CARD_KEYS = _get_keys(len(DECK))
+USED_CARD_KEYS = _get_keys(len(DECK))
+# number of cards of each player, any count up to the whole deck
+NUM_CARDS_KEYS = [_get_keys(TOTAL_CARDS + 1) for _ in range(NUM_PLAYERS)]
+TURN_KEYS = _get_keys(NUM_PLAYERS)
+# parts of the previous play, the length and number of extras of a play are at most its number of cards
+PLAY_TYPE_KEYS = dict(zip([SINGLES, DOUBLES, TRIPLES, QUADRUPLES, STRAIGHTS,
+                           DOUBLE_STRAIGHTS, ADJ_TRIPLES, DOUBLE_JOKER], _get_keys(8)))
+PLAY_BASE_KEYS = _get_keys(MAX_VALUE + 1)
+PLAY_LENGTH_KEYS = _get_keys(TOTAL_CARDS + 1)
+PLAY_EXTRA_KEYS = _get_keys(TOTAL_CARDS + 1)
+PLAY_OWNER_KEYS = _get_keys(NUM_PLAYERS)
+
+def get_cards_key(bits, keys):
+    """
+    Returns the xor of the keys of the cards in the card set bits
+    keys -- HAND_CARD_KEYS or USED_CARD_KEYS
+    """
+    key = 0
+    while bits:
+        low = bits & -bits
+        key ^= keys[low.bit_length() - 1]
+        bits ^= low
+    return key
+
+def get_play_key(card_play):
+    """
+    Returns the key of the previous play from its suit free type, base,
+    length, number of extras and owner, 0 for a missing or pass play
+    """
+    signature = get_play_signature(card_play)
+    if signature is None:
+        return 0
+    play_type, base, length, num_extra = signature
+    return PLAY_TYPE_KEYS[play_type] ^ PLAY_BASE_KEYS[base] ^ PLAY_LENGTH_KEYS[length] ^\
+           PLAY_EXTRA_KEYS[num_extra] ^ PLAY_OWNER_KEYS[card_play.position]
@@ -0,0 +1,46 @@
+"""
+Helper module for the tests that play games out
+"""
+
+from pokai.game.game_state import GameState
+from pokai.game.game_tools import get_new_shuffled_deck
+from pokai.game.hand import Hand
+
+def play_out(players, game_state):
+    """Plays out a game with Player objects on a copy of game_state and returns the winner"""
+    game_state = game_state.copy()
+    while game_state.game_is_on():
+        turn = game_state.get_current_turn()
+        next_play = players[turn].get_best_play(game_state)
+        if next_play:
+            players[turn].play(next_play)
+            game_state.cards_played(next_play)
+        game_state.increment_turn()
+    return game_state.get_winner()
+
+def deal_position(rng):
+    """
+    Returns the cards of each player and the game state of a random position of up to
+    10 cards a player, following a random play of one of the players
+    rng -- random.Random choosing the position, the deck is shuffled by the global random stream
+    """
+    deck = get_new_shuffled_deck()
+    sizes = [rng.randint(1, 10) for _ in range(3)]
+    hands, start = [], 0
+    for size in sizes:
+        hands.append(deck[start: start + size])
+        start += size
+    game_state = GameState(20, 17)
+    game_state.used_cards = deck[start:]
+    game_state.player_cards = sizes
+    game_state.current_turn = rng.randrange(3)
+    if rng.random() < 0.8:
+        # a play of a random type made of the cards left
+        rest = Hand(deck[start:])
+        moves = {}
+        for move in rest.all_legal_moves(None):
+            moves.setdefault(move.play_type, []).append(move)
+        prev_play = rest.make_play(rng.choice(moves[rng.choice(sorted(moves))]))
+        prev_play.position = rng.randrange(3)
+        game_state.prev_play = prev_play
+    return hands, game_state
@@ -3,15 +3,18 @@ Testing Module for AI Player
 """
 
 from copy import deepcopy
+from time import time
 
 from pokai.game.card import Card
 from pokai.game.game_state import GameState
 from pokai.game.card_play import Play
 from pokai.game.hand import Hand
 from pokai.ai.aiplayer import AIPlayer
+from pokai.ai.monte_carlo import get_rng, sample_deal, sample_deals
 from pokai.game.game_tools import SINGLES, DOUBLES, TRIPLES, QUADRUPLES, STRAIGHTS,\
                                  DOUBLE_STRAIGHTS, ADJ_TRIPLES, DOUBLE_JOKER
 
+import ai_simulations
 from tests.play_checker import _check_single, _check_double, _check_triple, _check_adj_triple,\
                                      _check_quadruples, _check_straight, _check_wild
 
@@ -186,3 +189,50 @@ class TestAIPlayer:
         best_play = player.get_best_wild(self.game_state)
         assert best_play.get_base_card().name == 'A'
         _check_quadruples(best_play.cards)
+
+    def test_ai_time_limit(self):
+        prev_play = Play(2, [Card('3', 'h')], 0, play_type=SINGLES)
+        self.setup_game_state([prev_play])
+        self.test_ai_player_lv3.time_limit = 0.5
+        start = time()
+        best_play = self.test_ai_player_lv3.get_best_play(self.game_state)
+        assert time() - start < 1.5
+        candidates = self.test_ai_player_lv3.last_candidates
+        assert best_play in candidates
+        assert all(play.rollouts == candidates[0].rollouts > 0 for play in candidates)
+        # a bomb also beats the single
+        if best_play and not best_play.is_wild():
+            _check_single(best_play.cards)
+
+    def test_ai_deadline_passed(self):
+        prev_play = Play(2, [Card('3', 'h')], 0, play_type=SINGLES)
+        self.setup_game_state([prev_play])
+        # falls back on the fixed strategy, playing the lowest single
+        best_play = self.test_ai_player_lv2.get_best_play_before(self.game_state, time() - 1)
+        assert best_play[0].name == '4'
+
+    def test_ai_time_limit_only_pass(self):
+        prev_play = Play(2, Card.strs_to_cards(['Z0', 'Z1']), 0, play_type=DOUBLE_JOKER)
+        self.setup_game_state([prev_play])
+        self.test_ai_player_lv2.time_limit = 10
+        best_play = self.test_ai_player_lv2.get_best_play(self.game_state)
+        assert not best_play and best_play.rollouts == 0
+
+    def test_ai_seeded_play(self):
+        prev_play = Play(2, [Card('3', 'd')], 0, play_type=SINGLES)
+        self.setup_game_state([prev_play])
+        best_plays = []
+        for _ in range(2):
+            ai = AIPlayer(Hand(Card.strs_to_cards(TestAIPlayer.card_strs_lv2)), 0, "", seed=5)
+            best_plays.append(ai.get_best_singles(self.game_state))
+        assert best_plays[0] == best_plays[1]
+        assert best_plays[0].strength == best_plays[1].strength
+
+    def test_ai_simulation_seeds(self):
+        self.setup_game_state([None])
+        dealer_seed, ai_seed = ai_simulations.get_seeds(1, 2)
+        assert ai_simulations.get_seeds(1, 2) == [dealer_seed, ai_seed] and dealer_seed != ai_seed
+        ai, _, game_state = ai_simulations.setup_game(TestAIPlayer.card_strs_lv2, ai_seed)
+        # the AI does not sample the deal it is playing against
+        dealt = sample_deal(ai, game_state, get_rng(dealer_seed))
+        assert sample_deals(ai, game_state, 1, ai.rng)[0] != dealt
@@ -0,0 +1,122 @@
+"""
+Testing module for the batch simulator
+"""
+
+import random
+from time import time
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from pokai.ai.batch_simulator import *
+from pokai.ai.monte_carlo import simulate_one_game, sample_deal
+from pokai.game.card import Card
+from pokai.game.card_play import Play
+from pokai.game.card_set import CardSet
+from pokai.game.game_state import GameState
+from pokai.game.game_tools import QUADRUPLES, get_new_shuffled_deck
+from pokai.game.hand import Hand
+from pokai.game.player import Player
+from tests.game_helper import play_out, deal_position
+
+class TestBatchSimulator(object):
+    """
+    Test class for the batch simulator
+    """
+
+    def test_full_deals_match_player(self):
+        """tests the winner of every full deal is the winner of the Player games"""
+        random.seed(11)
+        game_state = GameState(20, 17)
+        deals = []
+        for _ in range(300):
+            deck = get_new_shuffled_deck()
+            deals.append([deck[0: 20], deck[20: 37], deck[37:]])
+        winners = play_batch(np.array([get_counts_array(deal) for deal in deals]), game_state)
+        for deal, winner in zip(deals, winners):
+            players = [Player(Hand(cards), position, "") for position, cards in enumerate(deal)]
+            assert play_out(players, game_state) == winner
+
+    def test_positions_match_player(self):
+        """tests positions following every kind of play against the Player games"""
+        rng = random.Random(12)
+        prev_types = set()
+        for _ in range(300):
+            hands, game_state = deal_position(rng)
+            if game_state.prev_play:
+                prev_types.add(game_state.prev_play.play_type)
+            winners = play_batch(get_counts_array(hands)[None], game_state)
+            players = [Player(Hand(cards), position, "") for position, cards in enumerate(hands)]
+            assert play_out(players, game_state) == winners[0]
+        assert len(prev_types) == len(PLAY_TYPES)
+
+    def test_following_quadruples(self):
+        """tests only a bomb with kickers falls back to the lowest wild"""
+        hands = [Card.strs_to_cards(strs) for strs in [['3d', '3s', '3c', '3h', '4d'], ['5d'], ['6d']]]
+        game_state = GameState(20, 17)
+        game_state.player_cards = [5, 1, 1]
+        game_state.prev_play = Play(2, Card.strs_to_cards(['Kd', 'Ks', 'Kc', 'Kh']), 0,
+                                    play_type=QUADRUPLES)
+        # the bomb is wild, so players 0 and 1 pass and player 2 goes out
+        assert play_batch(get_counts_array(hands)[None], game_state)[0] == 2
+        game_state.prev_play = Play(2, Card.strs_to_cards(['Kd', 'Ks', 'Kc', 'Kh', '7d', '8d']), 2,
+                                    play_type=QUADRUPLES)
+        # player 0 bombs and leads its last card
+        assert play_batch(get_counts_array(hands)[None], game_state)[0] == 0
+
+    def test_finished_games(self):
+        """tests games that are already over keep their winner"""
+        hands = [Card.strs_to_cards(['3d']), [], Card.strs_to_cards(['4d'])]
+        assert list(play_batch(get_counts_array(hands)[None], GameState(20, 17))) == [1]
+
+    def test_deal_batch(self):
+        """tests deals hand out the unrevealed cards by the number of cards of each player"""
+        deck = get_new_shuffled_deck()
+        player = Player(Hand(deck[0: 5]), 0, "")
+        game_state = GameState(20, 17)
+        game_state.used_cards = deck[12:]
+        game_state.player_cards = [5, 3, 4]
+        counts = deal_batch(player, game_state, 50, np.random.default_rng(0))
+        assert counts.shape == (50, 3, NUM_VALUES)
+        assert (counts[:, 0] == get_counts_array([player.hand])[0]).all()
+        assert (counts[:, 1].sum(axis=1) == 3).all() and (counts[:, 2].sum(axis=1) == 4).all()
+        assert (counts[:, 1] + counts[:, 2] == get_counts_array([deck[5: 12]])[0]).all()
+        # deals differ between games
+        assert len({row.tobytes() for row in counts[:, 1]}) > 1
+
+    def test_simulate_batch(self):
+        """tests the batch wins are reproducible and close to the Player win rate"""
+        random.seed(13)
+        deck = get_new_shuffled_deck()
+        player = Player(Hand(deck[0: 20]), 0, "")
+        game_state = GameState(20, 17)
+        wins = simulate_batch(player, 2000, game_state, np.random.default_rng(1))
+        assert wins == simulate_batch(player, 2000, game_state, np.random.default_rng(1))
+
+        loop_wins = 0
+        for _ in range(400):
+            deal = sample_deal(player, game_state)
+            players = [Player(Hand(deck[0: 20]), 0, ""), Player(Hand(CardSet(deal[0])), 1, ""),
+                       Player(Hand(CardSet(deal[1])), 2, "")]
+            loop_wins += play_out(players, game_state) == 0
+        assert abs(wins / 2000 - loop_wins / 400) < 0.1
+
+    def test_batch_throughput(self):
+        """tests the batch simulator is at least an order of magnitude faster than playing games one by one"""
+        random.seed(14)
+        deck = get_new_shuffled_deck()
+        player = Player(Hand(deck[0: 20]), 0, "")
+        game_state = GameState(20, 17)
+        counts = deal_batch(player, game_state, 4000, np.random.default_rng(2))
+
+        start = time()
+        play_batch(counts, game_state)
+        batch_rate = len(counts) / (time() - start)
+        start = time()
+        for _ in range(100):
+            players = [Player(Hand(deck[0: 20]), 0, ""), Player(Hand(deck[20: 37]), 1, ""),
+                       Player(Hand(deck[37:]), 2, "")]
+            simulate_one_game(players, game_state, False, endgame_cards=None)
+        loop_rate = 100 / (time() - start)
+        assert batch_rate > 10 * loop_rate
@@ -0,0 +1,77 @@
+"""
+Testing module for canonical.py
+"""
+
+import pytest
+
+from pokai.game.canonical import *
+from pokai.game.card import Card
+from pokai.game.card_play import Play
+from pokai.game.card_set import CardSet
+from pokai.game.game_state import GameState
+from pokai.game.game_tools import get_new_shuffled_deck
+from pokai.game.hand import Hand
+
+class TestCanonical(object):
+    """
+    Test class for canonical positions and plays
+    """
+
+    def test_pack_counts(self):
+        """tests packed counts are unpacked unchanged"""
+        counts = [4, 0, 3, 1, 2, 4, 4, 0, 0, 1, 2, 3, 4, 1, 1]
+        assert len(pack_counts(counts)) == COUNTS_SIZE
+        assert unpack_counts(pack_counts(counts)) == counts
+
+    def test_position_key_suit_free(self):
+        """tests positions that only differ in suits have the same key"""
+        game_state = GameState(20, 17)
+        game_state.prev_play = Play(2, [Card('K', 'h')], 0, play_type=SINGLES)
+        other = GameState(20, 17)
+        other.prev_play = Play(2, [Card('K', 'd')], 0, play_type=SINGLES)
+        bits = CardSet.from_cards(Card.strs_to_cards(['3h', '3s', '5d'])).bits
+        other_bits = CardSet.from_cards(Card.strs_to_cards(['3d', '3c', '5h'])).bits
+        assert get_position_key(bits, 0, game_state) == get_position_key(other_bits, 0, other)
+        other.prev_play = Play(1, [Card('K', 'd')], 0, play_type=SINGLES)
+        assert get_position_key(bits, 0, game_state) != get_position_key(other_bits, 0, other)
+        assert get_position_key(bits, 0, game_state) != get_position_key(bits, 1, game_state)
+        game_state.prev_play = None
+        assert get_position_key(bits, 0, game_state) != get_position_key(other_bits, 0, other)
+
+    def test_decode_position_key(self):
+        """tests the parts of a position are recovered from its key"""
+        game_state = GameState(20, 17)
+        game_state.apply_play(Play(0, Card.strs_to_cards(['7h', '7s', '7d', '4c']), 1, play_type=TRIPLES))
+        bits = CardSet.from_cards(Card.strs_to_cards(['3h', '3s', 'Z1'])).bits
+        hand_counts, used_counts, player_cards, turn, position, prev = \
+            decode_position_key(get_position_key(bits, 2, game_state))
+        assert hand_counts == CardSet(bits).get_value_counts()
+        assert used_counts == game_state.used_card_set.get_value_counts()
+        assert player_cards == [16, 17, 17] and turn == 1 and position == 2
+        assert prev == ((TRIPLES, 4, 1, 1), 0)
+        assert decode_position_key(get_position_key(bits, 2, GameState(20, 17)))[5] is None
+
+    def test_canonical_play_round_trip(self):
+        """tests plays made from their canonical form are equivalent plays from the hand"""
+        deck = get_new_shuffled_deck()
+        hand = Hand(deck[0: 20])
+        for card_play in hand.all_legal_plays(None):
+            canonical_play = get_canonical_play(card_play)
+            other = get_play_from_canonical(canonical_play, hand.get_card_set(), position=1)
+            assert get_canonical_play(other) == canonical_play
+            assert other.position == 1 and other.play_type == card_play.play_type
+            assert CardSet.from_cards(other.cards).issubset(hand.get_card_set())
+
+    def test_canonical_pass(self):
+        """tests passing has no canonical form"""
+        assert get_canonical_play(None) is None
+        assert get_canonical_play(Play.get_pass_play()) is None
+        assert not get_play_from_canonical(None, [], position=2)
+
+    def test_canonical_play_missing_cards(self):
+        """tests a play cannot be made from cards without its values"""
+        canonical_play = get_canonical_play(Play(0, Card.strs_to_cards(['7h', '7s']), 0, play_type=DOUBLES))
+        with pytest.raises(ValueError):
+            get_play_from_canonical(canonical_play, Card.strs_to_cards(['7d', '8d']))
+        other = get_play_from_canonical(canonical_play, Card.strs_to_cards(['7d', '7c', '8d']))
+        assert other.cards == Card.strs_to_cards(['7d', '7c'])
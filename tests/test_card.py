@@ -8,6 +8,8 @@ pytest test_card.py -vs
 -s : switch (allows printing)
 """
 import os
+import copy
+import pickle
 
 import pokai.game.card as card
 
@@ -75,3 +77,29 @@ class TestCard(object):
     def test_card_display_small_joker(self):
         """Testing if card recognizes big joker"""
         assert str(card.Card("Z", 0)) == 'joker'
+
+    """
+    INTERNING
+    """
+
+    def test_card_is_interned(self):
+        """Testing equal cards are the same object"""
+        assert card.Card('6', 'c') is card.Card.str_to_card('6C')
+        assert card.Card('Z', 0) is card.Card.from_id(52)
+
+    def test_card_ids(self):
+        """Testing ids are stable and ordered by value"""
+        ids = [c.id for c in card.DECK]
+        assert ids == list(range(54))
+        assert card.Card('3', 'h').id == 0
+        assert card.Card('Z', 1).id == 53
+
+    def test_card_copy_and_pickle(self):
+        """Testing copies return the interned card"""
+        c = card.Card('Q', 'd')
+        assert copy.deepcopy(c) is c
+        assert pickle.loads(pickle.dumps(c)) is c
+
+    def test_card_hash(self):
+        """Testing cards can be used in sets"""
+        assert len({card.Card('9', 'h'), card.Card('9', 'h'), card.Card('9', 'd')}) == 2
@@ -0,0 +1,67 @@
+"""
+Testing module for card_set.py
+"""
+
+from pokai.game.card import Card
+from pokai.game.card_set import CardSet, card_index
+from pokai.game.game_tools import get_new_ordered_deck
+
+class TestCardSet(object):
+    """
+    Test class for card sets
+    """
+
+    def setup_method(self):
+        self.cards = Card.strs_to_cards(['3h', '5d', '5s', 'Kc', 'Z1'])
+        self.card_set = CardSet.from_cards(self.cards)
+
+    def test_card_index_unique(self):
+        """tests every card in the deck has its own bit"""
+        indices = [card_index(c) for c in get_new_ordered_deck()]
+        assert sorted(indices) == list(range(54))
+
+    def test_contains(self):
+        """tests membership"""
+        for c in self.cards:
+            assert c in self.card_set
+        assert Card('5', 'h') not in self.card_set
+        assert Card('Z', 0) not in self.card_set
+
+    def test_popcount(self):
+        """tests number of cards"""
+        assert self.card_set.popcount() == 5
+        assert len(self.card_set) == 5
+        assert not CardSet()
+        assert len(CardSet.full_deck()) == 54
+
+    def test_union_difference(self):
+        """tests union and difference make new sets"""
+        other = CardSet.from_cards([Card('5', 'd'), Card('2', 'h')])
+        union = self.card_set.union(other)
+        assert len(union) == 6
+        difference = self.card_set.difference(other)
+        assert len(difference) == 4
+        assert Card('5', 'd') not in difference
+        assert len(self.card_set) == 5
+
+    def test_intersection(self):
+        """tests intersection with a list of cards"""
+        common = self.card_set.intersection([Card('K', 'c'), Card('K', 'h')])
+        assert common.to_cards() == [Card('K', 'c')]
+
+    def test_to_cards_sorted(self):
+        """tests cards come out ordered by value"""
+        values = [c.value for c in self.card_set]
+        assert values == sorted(values)
+        assert self.card_set.to_cards()[-1] == Card('Z', 1)
+
+    def test_equality(self):
+        """tests sets built in different orders are equal"""
+        assert CardSet.from_cards(reversed(self.cards)) == self.card_set
+        assert hash(CardSet.from_cards(reversed(self.cards))) == hash(self.card_set)
+
+    def test_value_counts(self):
+        """tests the number of cards of each value"""
+        counts = self.card_set.get_value_counts()
+        assert len(counts) == 15 and sum(counts) == 5
+        assert counts[0] == 1 and counts[2] == 2 and counts[10] == 1 and counts[14] == 1
@@ -0,0 +1,170 @@
+"""
+Testing module for the endgame solver
+"""
+
+import random
+
+from pokai.ai.endgame import *
+from pokai.ai.aiplayer import AIPlayer
+from pokai.ai.monte_carlo import simulate_one_game
+from pokai.game.card import Card
+from pokai.game.card_play import Play
+from pokai.game.game_state import GameState
+from pokai.game.game_tools import SINGLES, DOUBLES, get_new_ordered_deck, get_new_shuffled_deck, remove_from_deck
+from pokai.game.hand import Hand
+from pokai.game.move_generator import get_legal_moves, get_move_signature, get_move_values
+from pokai.game.player import Player
+
+def minimax(hands, turn, signature, owner, target):
+    """Plain search over every move without a transposition table or move ordering"""
+    if owner == turn:
+        signature = None
+    outcomes = []
+    for move in get_legal_moves(hands[turn], signature):
+        remaining = list(hands[turn])
+        for value in get_move_values(move):
+            remaining[value] -= 1
+        if not any(remaining):
+            outcomes.append(turn == target)
+            continue
+        child = list(hands)
+        child[turn] = tuple(remaining)
+        outcomes.append(minimax(child, (turn + 1) % 3, get_move_signature(move), turn, target))
+    if signature is not None:
+        outcomes.append(minimax(hands, (turn + 1) % 3, signature, owner, target))
+    return any(outcomes) if turn == target else all(outcomes)
+
+class TestEndgame(object):
+    """
+    Test class for the endgame solver
+    """
+
+    @staticmethod
+    def generate_game(card_strs):
+        """Returns the players holding card_strs and the game state with player 0 to lead"""
+        hands = [Hand(Card.strs_to_cards(strs)) for strs in card_strs]
+        game_state = GameState(20, 17)
+        game_state.used_cards = remove_from_deck(get_new_ordered_deck(),
+                                                 [c for hand in hands for c in hand.get_cards()])
+        game_state.player_cards = [hand.num_cards() for hand in hands]
+        game_state.current_turn = 0
+        return [Player(hand, position, "") for position, hand in enumerate(hands)], game_state
+
+    def test_solve_simple(self):
+        """tests going out and an opponent going out"""
+        solver = EndgameSolver()
+        hands = [get_counts(Card.strs_to_cards(['3d', '3s', '3c', '4c'])),
+                 get_counts([Card('K', 'd')]), get_counts([Card('8', 'd')])]
+        assert solver.solve(hands, 0, None, 0, 0)
+        assert not solver.solve(hands, 1, None, 1, 0)
+        # player 2 goes out first, player 1 is on the team of player 2
+        assert solver.solve(hands, 2, None, 2, 1) is False
+
+    def test_solve_needs_order(self):
+        """tests the solver leads the unbeatable single where the fixed strategy leads low and loses"""
+        players, game_state = TestEndgame.generate_game([['3d', 'Ad'], ['Kd'], ['5d']])
+        assert solve_game([player.hand for player in players], game_state)
+        assert not simulate_one_game(players, game_state, False, endgame_cards=None)
+        assert simulate_one_game(players, game_state, False)
+        # the game state is left as it was
+        assert game_state.player_cards == [2, 1, 1] and game_state.current_turn == 0
+
+    def test_solve_matches_minimax(self):
+        """tests the solver against a plain search on random small endgames"""
+        random.seed(3)
+        solver = EndgameSolver()
+        for _ in range(40):
+            deck = get_new_shuffled_deck()
+            sizes = [random.randint(1, 3) for _ in range(3)]
+            hands, start = [], 0
+            for size in sizes:
+                hands.append(get_counts(deck[start: start + size]))
+                start += size
+            turn = random.randrange(3)
+            target = random.randrange(3)
+            assert solver.solve(hands, turn, None, turn, target) == \
+                   minimax(hands, turn, None, turn, target)
+
+    def test_solve_following(self):
+        """tests solving when a play has to be beaten or passed"""
+        players, game_state = TestEndgame.generate_game([['5d', '5s', 'Ad'], ['Kd', '4d'], ['3d']])
+        game_state.prev_play = Play(2, [Card('Q', 'h')], 0, play_type=SINGLES)
+        # beating the queen with the ace keeps the lead for the pair
+        hands = [player.hand for player in players]
+        assert solve_game(hands, game_state)
+        # the two cannot be beaten, player 2 leads again and goes out
+        game_state.prev_play = Play(2, [Card('2', 'h')], 0, play_type=SINGLES)
+        assert not solve_game(hands, game_state)
+
+    def test_best_endgame_play(self):
+        """tests the best play is the one winning every deal"""
+        players, game_state = TestEndgame.generate_game([['3d', 'Ad'], ['Kd'], ['5d']])
+        deals = [(players[1].hand.get_card_set().bits, players[2].hand.get_card_set().bits),
+                 (players[2].hand.get_card_set().bits, players[1].hand.get_card_set().bits)]
+        best_play = get_best_endgame_play(players[0], game_state, deals)
+        assert best_play.cards == [Card('A', 'd')] and best_play.position == 0
+        assert best_play.strength == 1 and best_play.rollouts == 2
+
+    def test_ai_player_endgame(self):
+        """tests AIPlayer solves the endgame"""
+        players, game_state = TestEndgame.generate_game([['3d', 'Ad'], ['Kd'], ['5d']])
+        ai = AIPlayer(players[0].hand, 0, "")
+        best_play = ai.get_best_play(game_state)
+        assert best_play.cards == [Card('A', 'd')] and best_play.strength == 1
+        ai.endgame_cards = None
+        ai.forced_win_plays = None
+        ai.time_limit = 0.1
+        ai.get_best_play(game_state)
+        assert ai.last_candidates
+
+    def test_forced_win(self):
+        """tests plays winning whatever the other players hold"""
+        # every card in one play
+        players, game_state = TestEndgame.generate_game([['3d', '3s', '3c', '4c'], ['Kd'], ['5d']])
+        forced_win = get_forced_win(players[0], game_state)
+        assert forced_win.num_cards() == 4 and forced_win.strength == 1 and forced_win.position == 0
+        # the ace cannot be beaten and the three goes out
+        players, game_state = TestEndgame.generate_game([['3d', 'Ad'], ['Kd'], ['5d']])
+        assert get_forced_win(players[0], game_state).cards == [Card('A', 'd')]
+        assert get_forced_win(players[0], game_state, max_plays=0) is None
+        # the ace can be beaten by the unrevealed two
+        players, game_state = TestEndgame.generate_game([['3d', 'Ad'], ['2d'], ['5d']])
+        assert get_forced_win(players[0], game_state) is None
+        # the unrevealed bomb cannot be played by players holding 3 cards
+        players, game_state = TestEndgame.generate_game([['3d', 'Ad'], ['Kd', 'Ks', 'Kc'], ['Kh', '5d', '6d']])
+        assert get_forced_win(players[0], game_state).cards == [Card('A', 'd')]
+        game_state.player_cards = [2, 4, 2]
+        assert get_forced_win(players[0], game_state) is None
+
+    def test_forced_win_following(self):
+        """tests the forced win has to beat the previous play"""
+        players, game_state = TestEndgame.generate_game([['5d', '5s'], ['Kd'], ['3d']])
+        game_state.prev_play = Play(2, [Card('4', 'h'), Card('4', 's')], 0, play_type=DOUBLES)
+        assert get_forced_win(players[0], game_state).num_cards() == 2
+        game_state.prev_play = Play(2, [Card('6', 'h'), Card('6', 's')], 0, play_type=DOUBLES)
+        assert get_forced_win(players[0], game_state) is None
+        # the play to beat is this player's own, so it leads
+        game_state.prev_play = Play(0, [Card('6', 'h'), Card('6', 's')], 0, play_type=DOUBLES)
+        assert get_forced_win(players[0], game_state).num_cards() == 2
+
+    def test_forced_win_is_won(self):
+        """tests the solver wins every random small endgame with a forced win"""
+        random.seed(5)
+        fired = 0
+        for _ in range(300):
+            deck = get_new_shuffled_deck()
+            sizes = [random.randint(1, 5), random.randint(1, 4), random.randint(1, 4)]
+            hands, start = [], 0
+            for size in sizes:
+                hands.append(Hand(deck[start: start + size]))
+                start += size
+            game_state = GameState(20, 17)
+            game_state.used_cards = deck[start:]
+            game_state.player_cards = sizes
+            game_state.current_turn = 0
+            players = [Player(hand, position, "") for position, hand in enumerate(hands)]
+            forced_win = get_forced_win(players[0], game_state)
+            if forced_win:
+                fired += 1
+                assert solve_game([player.hand for player in players], game_state)
+        assert fired
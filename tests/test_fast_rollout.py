@@ -0,0 +1,75 @@
+"""
+Testing module for the fast rollout
+"""
+
+import random
+
+from pokai.ai.fast_rollout import *
+from pokai.ai.ismcts import get_move_key
+from pokai.ai.monte_carlo import simulate_one_game, simulate_deal, sample_deal
+from pokai.game.card_set import CardSet
+from pokai.game.game_state import GameState
+from pokai.game.game_tools import get_new_shuffled_deck
+from pokai.game.hand import Hand
+from pokai.game.player import Player
+from tests.game_helper import deal_position
+
+class TestFastRollout(object):
+    """
+    Test class for the fast rollout
+    """
+
+    def test_moves_match_player(self):
+        """tests the lead and follow moves are the plays of Player"""
+        rng = random.Random(21)
+        for _ in range(500):
+            hands, game_state = deal_position(rng)
+            player = Player(Hand(hands[0]), 0, "")
+            masks = get_level_masks(player.hand.get_counts())
+            prev_play = game_state.prev_play
+            if not prev_play or not prev_play.position:
+                move = get_lead_move(masks)
+            else:
+                move = get_follow_move(masks, get_play_signature(prev_play))
+            play = player.get_best_play(game_state)
+            assert get_move_key(move) == (play.get_rank_key() if play else None)
+
+    def test_full_deals_match_player(self):
+        """tests the winner of seeded full deals is the winner of the Player games"""
+        random.seed(22)
+        game_state = GameState(20, 17)
+        for endgame_cards in [ENDGAME_CARDS, None]:
+            for _ in range(500):
+                deck = get_new_shuffled_deck()
+                players = [Player(Hand(deck[0: 20]), 0, ""), Player(Hand(deck[20: 37]), 1, ""),
+                           Player(Hand(deck[37:]), 2, "")]
+                counts = [list(player.hand.get_counts()) for player in players]
+                won = play_out(counts, list(game_state.player_cards), 0, None, 0, endgame_cards)
+                assert won == simulate_one_game(players, game_state, False, endgame_cards=endgame_cards)
+
+    def test_positions_match_player(self):
+        """tests positions following every kind of play against the Player games"""
+        rng = random.Random(23)
+        for endgame_cards in [ENDGAME_CARDS, None]:
+            for _ in range(300):
+                hands, game_state = deal_position(rng)
+                player = Player(Hand(hands[0]), 0, "")
+                deal = (CardSet.from_cards(hands[1]).bits, CardSet.from_cards(hands[2]).bits)
+                won = play_deal(player.hand, game_state, deal, endgame_cards)
+                players = [player] + [Player(Hand(cards), position, "")
+                                      for position, cards in enumerate(hands) if position]
+                assert won == simulate_one_game(players, game_state, False, endgame_cards=endgame_cards)
+
+    def test_simulate_deal(self):
+        """tests simulate_deal plays fixed strategy players out on counts without changing them"""
+        random.seed(24)
+        deck = get_new_shuffled_deck()
+        player = Player(Hand(deck[0: 20]), 0, "")
+        game_state = GameState(20, 17)
+        for _ in range(100):
+            deal = sample_deal(player, game_state)
+            won = simulate_deal(player, game_state, deal)
+            assert player.hand.num_cards() == 20 and game_state.player_cards == [20, 17, 17]
+            players = [Player(Hand(deck[0: 20]), 0, ""), Player(Hand(CardSet(deal[0])), 1, ""),
+                       Player(Hand(CardSet(deal[1])), 2, "")]
+            assert won == simulate_one_game(players, game_state, False)
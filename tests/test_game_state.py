@@ -0,0 +1,122 @@
+"""
+Testing module for game_state.py
+"""
+
+from pokai.game.card import Card
+from pokai.game.card_play import Play
+from pokai.game.game_state import GameState
+from pokai.game.game_tools import SINGLES, DOUBLES
+
+class TestGameState(object):
+    """
+    Test class for making and unmaking plays on the game state
+    """
+
+    @staticmethod
+    def get_state(game_state):
+        return (game_state.used_card_set, list(game_state.player_cards),
+                game_state.current_turn, game_state.prev_play)
+
+    def test_apply_revert_play(self):
+        """tests reverting applied plays and passes gives back the same state"""
+        game_state = GameState(20, 17)
+        before = TestGameState.get_state(game_state)
+        plays = [Play(0, Card.strs_to_cards(['3h', '3s']), 0, play_type=DOUBLES), None,
+                 Play(2, Card.strs_to_cards(['5h', '5s']), 0, play_type=DOUBLES),
+                 Play.get_pass_play(position=0)]
+        undos = [game_state.apply_play(card_play) for card_play in plays]
+        assert game_state.player_cards == [18, 17, 15]
+        assert game_state.current_turn == 1
+        assert game_state.prev_play is plays[2]
+        for undo in reversed(undos):
+            game_state.revert_play(undo)
+        assert TestGameState.get_state(game_state) == before
+
+    def test_snapshot_restore(self):
+        """tests the state is restored to a snapshot"""
+        game_state = GameState(20, 17)
+        snapshot = game_state.snapshot()
+        before = TestGameState.get_state(game_state)
+        player_cards = game_state.player_cards
+        game_state.apply_play(Play(0, [Card('7', 'h')], 0, play_type=SINGLES))
+        game_state.apply_play(Play(1, [Card('9', 'h')], 0, play_type=SINGLES))
+        game_state.restore(snapshot)
+        assert TestGameState.get_state(game_state) == before
+        assert game_state.player_cards is player_cards
+
+    def test_copy(self):
+        """tests a copy does not change with the original"""
+        game_state = GameState(20, 17)
+        other = game_state.copy()
+        game_state.apply_play(Play(0, [Card('7', 'h')], 0, play_type=SINGLES))
+        assert other.player_cards == [20, 17, 17]
+        assert other.current_turn == 0 and other.prev_play is None
+        assert not other.used_card_set
+
+    def test_hash_matches_fresh_state(self):
+        """tests the incrementally updated key matches the key of a state set up directly"""
+        game_state = GameState(20, 17)
+        plays = [Play(0, Card.strs_to_cards(['3h', '3s']), 0, play_type=DOUBLES), None,
+                 Play(2, Card.strs_to_cards(['5h', '5s']), 0, play_type=DOUBLES)]
+        for card_play in plays:
+            game_state.apply_play(card_play)
+        fresh = GameState(20, 17)
+        fresh.used_cards = Card.strs_to_cards(['3h', '3s', '5h', '5s'])
+        fresh.player_cards = [18, 17, 15]
+        fresh.current_turn = 0
+        fresh.prev_play = Play(2, Card.strs_to_cards(['5d', '5c']), 0, play_type=DOUBLES)
+        assert hash(game_state) == hash(fresh)
+        assert hash(game_state.copy()) == hash(game_state)
+
+    def test_hash_parts(self):
+        """tests every part of the state changes the key and changing it back restores the key"""
+        game_state = GameState(20, 17)
+        key = hash(game_state)
+        game_state.current_turn = 1
+        assert hash(game_state) != key
+        game_state.current_turn = 0
+        assert hash(game_state) == key
+
+        game_state.set_num_cards(1, 16)
+        assert hash(game_state) != key
+        game_state.set_num_cards(1, 17)
+        assert hash(game_state) == key
+
+        game_state.used_cards = [Card('7', 'h')]
+        assert hash(game_state) != key
+        game_state.used_cards = []
+        assert hash(game_state) == key
+
+        keys = set()
+        for card_play in [Play(1, [Card('7', 'h')], 0, play_type=SINGLES),
+                          Play(2, [Card('7', 'h')], 0, play_type=SINGLES),
+                          Play(1, [Card('8', 'h')], 0, play_type=SINGLES),
+                          Play(1, Card.strs_to_cards(['7h', '7s']), 0, play_type=DOUBLES)]:
+            game_state.prev_play = card_play
+            keys.add(hash(game_state))
+        assert len(keys) == 4 and key not in keys
+        game_state.prev_play = None
+        assert hash(game_state) == key
+
+    def test_hash_revert(self):
+        """tests reverting plays and restoring snapshots gives back the key"""
+        game_state = GameState(20, 17)
+        key = hash(game_state)
+        snapshot = game_state.snapshot()
+        undo = game_state.apply_play(Play(0, [Card('7', 'h')], 0, play_type=SINGLES))
+        game_state.revert_play(undo)
+        assert hash(game_state) == key
+        game_state.apply_play(Play(0, [Card('7', 'h')], 0, play_type=SINGLES))
+        game_state.apply_play(Play(1, [Card('9', 'h')], 0, play_type=SINGLES))
+        game_state.restore(snapshot)
+        assert hash(game_state) == key
+
+    def test_hash_large_counts(self):
+        """tests any number of cards up to the whole deck has a key"""
+        game_state = GameState(20, 5)
+        assert game_state.player_cards == [20, 5, 29]
+        key = hash(game_state)
+        game_state.set_num_cards(0, 54)
+        assert hash(game_state) != key
+        game_state.set_num_cards(0, 20)
+        assert hash(game_state) == key
@@ -14,7 +14,8 @@ import random
 import pokai.game.card as card
 from pokai.game.card import SMALL_JOKER_VALUE, BIG_JOKER_VALUE
 import pokai.game.hand as hand
-from pokai.game.game_tools import get_new_shuffled_deck, DOUBLE_JOKER
+from pokai.game.game_tools import get_new_shuffled_deck, SINGLES, DOUBLES, DOUBLE_JOKER
+from pokai.game.card_play import Play
 
 from tests.play_checker import _check_single, _check_double, _check_triple, _check_adj_triple,\
                                      _check_quadruples, _check_straight, _check_wild
@@ -116,6 +117,78 @@ class TestHand(object):
         self.hand.add_cards(card_strs=['Z0', 'Z1'])
         assert len(self.hand._categories[DOUBLE_JOKER]) == 1
 
+    """
+    RANK COUNTS
+    """
+
+    def test_hand_counts(self):
+        """tests the rank count vector matches the cards"""
+        counts = self.hand.get_counts()
+        assert len(counts) == 15
+        assert sum(counts) == self.hand.num_cards()
+        assert counts[card.Card('7', 'h').value] == 4
+        self.hand.remove_cards([card.Card('7', 'h')])
+        assert counts[card.Card('7', 'h').value] == 3
+
+    def test_hand_incremental_categories(self):
+        """tests categories updated incrementally match a freshly built hand"""
+        deck = get_new_shuffled_deck()
+        h = hand.Hand(deck[0: 20])
+        for _ in range(TEST_MULTIPLIER * 200):
+            if random.random() < 0.5:
+                h.remove_cards(random.sample(deck, random.randint(1, 4)))
+            else:
+                h.add_cards(random.sample(deck, random.randint(1, 4)))
+            fresh = hand.Hand(h.get_cards())
+            assert h._categories == fresh._categories
+            assert h.get_counts() == fresh.get_counts()
+            assert hash(h) == hash(fresh) and h == fresh
+
+    def test_hand_apply_revert_play(self):
+        """tests reverting applied plays gives back exactly the same hand"""
+        deck = get_new_shuffled_deck()
+        h = hand.Hand(deck[0: 20])
+        fresh = hand.Hand(deck[0: 20])
+        applied = []
+        while h.num_cards():
+            card_play = random.choice(h.all_legal_plays(None))
+            h.apply_play(card_play)
+            applied.append(card_play)
+        h.apply_play(None)
+        for card_play in reversed(applied):
+            h.revert_play(card_play)
+        assert h.get_card_set() == fresh.get_card_set()
+        assert h._categories == fresh._categories
+        assert h.get_counts() == fresh.get_counts()
+        assert hash(h) == hash(fresh)
+
+    def test_hand_snapshot_restore(self):
+        """tests a hand restored to a snapshot matches a freshly built hand"""
+        deck = get_new_shuffled_deck()
+        h = hand.Hand(deck[0: 20])
+        snapshot = h.snapshot()
+        h.remove_cards(deck[0: 5])
+        h.add_cards(deck[30: 33])
+        h.restore(snapshot)
+        fresh = hand.Hand(deck[0: 20])
+        assert h.get_card_set() == fresh.get_card_set()
+        assert h._categories == fresh._categories
+
+    """
+    SUIT FREE PLAYS
+    """
+
+    def test_hand_unique_plays(self):
+        """tests plays that only differ in suits are dropped"""
+        plays = [Play(-1, [card.Card('7', 'h')], 0, play_type=SINGLES),
+                 Play(-1, [card.Card('7', 's')], 0, play_type=SINGLES),
+                 Play(-1, card.Card.strs_to_cards(['7h', '7s']), 0, play_type=DOUBLES),
+                 Play(-1, card.Card.strs_to_cards(['7d', '7c']), 0, play_type=DOUBLES),
+                 Play(-1, [card.Card('8', 'd')], 0, play_type=SINGLES)]
+        unique = list(hand.Hand.unique_plays(plays))
+        assert unique == [plays[0], plays[2], plays[4]]
+        assert plays[0].get_rank_key() == plays[1].get_rank_key()
+
 class TestGetLow(object):
     def setup_method(self):
         self.hand = hand.Hand(cards)
@@ -0,0 +1,155 @@
+"""
+Testing module for information set Monte Carlo tree search
+"""
+
+import time
+
+import pytest
+
+import pokai.ai.ismcts as ismcts
+from pokai.ai.ismcts import *
+from pokai.ai.aiplayer import AIPlayer, ISMCTS_STRATEGY, PARALLEL_ISMCTS_STRATEGY
+from pokai.ai.monte_carlo import start_pool, shutdown_pool
+from pokai.game.card import Card
+from pokai.game.card_play import Play
+from pokai.game.game_state import GameState
+from pokai.game.game_tools import SINGLES, TRIPLES, get_new_ordered_deck, remove_from_deck
+from pokai.game.hand import Hand
+
+class TestISMCTS(object):
+    """
+    Test class for ismcts
+    """
+
+    @staticmethod
+    def generate_game_state(computer_card_strs, unrevealed_card_strs, n_cards1):
+        game_state = GameState(20, 17)
+        unused_cards = Card.strs_to_cards(computer_card_strs + unrevealed_card_strs)
+        game_state.used_cards = remove_from_deck(get_new_ordered_deck(), unused_cards)
+        game_state.player_cards = [len(computer_card_strs), n_cards1, len(unrevealed_card_strs) - n_cards1]
+        game_state.current_turn = 0
+        return game_state, Hand(Card.strs_to_cards(computer_card_strs))
+
+    def test_move_key(self):
+        """tests move keys match the rank keys of their plays"""
+        hand = Hand(Card.strs_to_cards(['3h', '3s', '3d', '4s', '4h', '4d', '5d', '5c', '6s', '7c',
+                                        '8h', '9d', '9c', '0c', 'Z0', 'Z1', '2c', '2d', '2h', '2s']))
+        prev_play = Play(1, Card.strs_to_cards(['6h', '6c', '6d', '8s']), 1, play_type=TRIPLES)
+        for move in hand.all_legal_moves(None) + hand.all_legal_moves(prev_play):
+            assert get_move_key(move) == hand.make_play(move).get_rank_key()
+        assert get_move_key(None) is None
+
+    def test_cards_key(self):
+        """tests keys of observed cards"""
+        cards = Card.strs_to_cards(['5h', '3s', '3d', '3c'])
+        assert get_cards_key(cards) == (TRIPLES, (0, 0, 0, 2), 1)
+        cards = Card.strs_to_cards(['5h', '3s', '5s', '3d', '3c'])
+        assert get_cards_key(cards) == (TRIPLES, (0, 0, 0, 2, 2), 2)
+
+    def test_finds_winning_play(self):
+        """tests the search plays out the whole hand when it can"""
+        game_state, hand = TestISMCTS.generate_game_state(['3d', '3s', '3c', '4c'],
+                                                          ['Qd', 'Qs', 'Qc', '7c', 'Kd', 'Ks', 'Kc', '8d'], 1)
+        search = ISMCTS(0)
+        best_play = search.get_best_play(hand, game_state, n_iterations=300)
+        assert best_play.play_type == TRIPLES and best_play.num_cards() == 4
+        assert best_play.strength == 1 and best_play.rollouts > 0
+        assert best_play.position == 0
+
+    def test_tree_reuse(self):
+        """tests the subtree of the plays that were made is kept"""
+        game_state, hand = TestISMCTS.generate_game_state(['3d', '4s', '6c', '8c', '0h'],
+                                                          ['Qd', 'Qs', 'Qc', '7c', 'Kd', 'Ks', 'Kc', '8d'], 4)
+        search = ISMCTS(0)
+        best_play = search.get_best_play(hand, game_state, n_iterations=2000)
+        node = search.root.children[best_play.get_rank_key()]
+        assert best_play.play_type == SINGLES
+
+        hand.remove_cards(best_play.cards)
+        game_state.cards_played(best_play)
+        game_state.increment_turn()
+        # the next player passes and the following player beats the play
+        game_state.increment_turn()
+        next_play = Play(2, [Card('K', 'd')], 0, play_type=SINGLES)
+        game_state.cards_played(next_play)
+        game_state.increment_turn()
+
+        expected = node.children[None].children[next_play.get_rank_key()]
+        visits = expected.visits
+        search.get_best_play(hand, game_state, n_iterations=10)
+        assert search.root is expected and expected.visits == visits + 10
+
+    def test_new_tree_without_history(self):
+        """tests a new tree is started when the plays cannot be matched"""
+        game_state, hand = TestISMCTS.generate_game_state(['3d', '4s', '6c', '8c', '0h'],
+                                                          ['Qd', 'Qs', 'Qc', '7c', 'Kd', 'Ks', 'Kc', '8d'], 4)
+        search = ISMCTS(0)
+        search.get_best_play(hand, game_state, n_iterations=50)
+        old_root = search.root
+        search.get_best_play(hand, game_state, n_iterations=5)
+        assert search.root is not old_root and search.root.visits == 5
+
+    def test_ai_player_strategy(self):
+        """tests the search is used by AIPlayer"""
+        game_state, hand = TestISMCTS.generate_game_state(['3d', '3s', '3c', '4c'],
+                                                          ['Qd', 'Qs', 'Qc', '7c', 'Kd', 'Ks', 'Kc', '8d'], 1)
+        ai = AIPlayer(hand, 0, "", time_limit=0.3, strategy=ISMCTS_STRATEGY)
+        best_play = ai.get_best_play(game_state)
+        assert best_play.num_cards() == 4
+
+    def test_merge_statistics(self):
+        """tests root statistics of several trees are summed"""
+        merged = merge_statistics([{None: (3, 1), 'a': (5, 2)}, {'a': (1, 1), 'b': (2, 0)}])
+        assert merged == {None: (3, 1), 'a': (6, 3), 'b': (2, 0)}
+
+    def test_parallel_search(self):
+        """tests the root parallel search"""
+        game_state, hand = TestISMCTS.generate_game_state(['3d', '3s', '3c', '4c'],
+                                                          ['Qd', 'Qs', 'Qc', '7c', 'Kd', 'Ks', 'Kc', '8d'], 1)
+        start_pool(2)
+        best_play = get_best_play_parallel(hand, game_state, 0, n_iterations=400)
+        shutdown_pool()
+        assert best_play.num_cards() == 4 and best_play.strength == 1
+        assert best_play.rollouts <= 400
+
+    def test_ai_player_parallel_strategy(self):
+        """tests the root parallel search is used by AIPlayer"""
+        game_state, hand = TestISMCTS.generate_game_state(['3d', '3s', '3c', '4c'],
+                                                          ['Qd', 'Qs', 'Qc', '7c', 'Kd', 'Ks', 'Kc', '8d'], 1)
+        ai = AIPlayer(hand, 0, "", time_limit=0.3, strategy=PARALLEL_ISMCTS_STRATEGY)
+        start = time.time()
+        best_play = ai.get_best_play(game_state)
+        assert time.time() - start < 1.5
+        assert best_play.num_cards() == 4
+
+    def test_seeded_search(self):
+        """tests searches with the same seed grow the same trees"""
+        game_state, hand = TestISMCTS.generate_game_state(['3d', '4s', '7c', '9h', 'Jd', 'Ks'],
+                                                          ['5d', '6s', '8c', '0c', 'Qd', 'Qs', 'Ah', '2d'], 4)
+        statistics = []
+        for _ in range(2):
+            search = ISMCTS(0, rng=8)
+            search.search(hand, game_state, n_iterations=300)
+            statistics.append(search.get_root_statistics())
+        assert statistics[0] == statistics[1]
+        start_pool(2)
+        best_plays = [get_best_play_parallel(hand, game_state, 0, n_iterations=300, rng=9)
+                      for _ in range(2)]
+        shutdown_pool()
+        assert best_plays[0] == best_plays[1]
+        assert (best_plays[0].strength, best_plays[0].rollouts) ==\
+               (best_plays[1].strength, best_plays[1].rollouts)
+
+    def test_interrupted_iteration(self, monkeypatch):
+        """tests an iteration that fails part way still restores the game state"""
+        game_state, hand = TestISMCTS.generate_game_state(['3d', '4s', '7c', '9h', 'Jd', 'Ks'],
+                                                          ['5d', '6s', '8c', '0c', 'Qd', 'Qs', 'Ah', '2d'], 4)
+        key = hash(game_state)
+        player_cards = list(game_state.player_cards)
+        def failing_rollout(hands, game_state):
+            raise KeyboardInterrupt
+        monkeypatch.setattr(ismcts, 'rollout', failing_rollout)
+        with pytest.raises(KeyboardInterrupt):
+            ISMCTS(0).search(hand, game_state, n_iterations=1)
+        assert hash(game_state) == key and game_state.player_cards == player_cards
+        assert game_state.prev_play is None and game_state.current_turn == 0
@@ -2,14 +2,20 @@
 Testing module for Monte Carlo simulations
 """
 
+import random
 import time
 
+import pytest
+
 from pokai.ai.monte_carlo import *
+from pokai.ai.monte_carlo import _get_position_after_play, _simulation_chunk
+from pokai.game.canonical import get_position_key
 from pokai.game.card import Card
 from pokai.game.hand import Hand
 from pokai.game.player import Player
 from pokai.game.game_state import GameState
 import pokai.game.game_tools as game_tools
+import pokai.ai.monte_carlo as monte_carlo
 from pokai.game.card_play import Play
 
 class TestMC(object):
@@ -149,3 +155,255 @@ class TestMC(object):
         assert ordered_best_plays[0] == play2
         assert ordered_best_plays[1] == play1
 
+    def test_pool_start_and_shutdown(self):
+        """tests the worker pool is reused and can be restarted"""
+        pool = start_pool(2)
+        assert get_pool() is pool
+        assert simulate_multiprocesses(self.test_player_lv4, 10, self.game_state) <= 10
+        shutdown_pool()
+        assert simulate_multiprocesses(self.test_player_lv4, 7, self.game_state, 2) <= 7
+        assert get_pool(2) is not pool
+        shutdown_pool()
+
+    def test_split_games(self):
+        """tests games are split into chunks without losing the remainder"""
+        assert split_games(10, 4) == [3, 3, 2, 2]
+        assert split_games(3, 8) == [1, 1, 1]
+
+    def test_estimate_play_strengths_batch(self):
+        """tests batched estimates are returned in the order of the plays"""
+        computer_card_strs = ['3d', '3s', '3c', '4c']
+        unrevealed_card_strs = ['Qd', 'Qs', 'Qc', '7c', 'Kd', 'Ks', 'Kc', '8d']
+        game_state, computer = TestMC.generate_game_state(computer_card_strs, unrevealed_card_strs, 1)
+        plays = [Play(0, [Card('3', 'd')], 0, play_type=SINGLES),
+                 Play(0, Card.strs_to_cards(computer_card_strs), 1, play_type=TRIPLES), None]
+        strengths = estimate_play_strengths(plays, computer, game_state, n_games=200)
+        assert len(strengths) == 3
+        assert all(0 <= strength <= 1 for strength in strengths)
+        # playing out the whole hand always wins
+        assert strengths[1] == 1
+        assert estimate_play_strengths([], computer, game_state) == []
+
+    def test_estimate_play_results_common_deals(self):
+        """tests all plays are evaluated on the same deals"""
+        computer_card_strs = ['3d', '3s', '3c', '4c']
+        unrevealed_card_strs = ['Qd', 'Qs', 'Qc', '7c', 'Kd', 'Ks', 'Kc', '8d']
+        game_state, computer = TestMC.generate_game_state(computer_card_strs, unrevealed_card_strs, 1)
+        deals = sample_deals(computer, game_state, 20)
+        unrevealed_bits = CardSet.from_cards(game_state.get_unrevealed_cards(computer.hand.get_cards())).bits
+        for bits1, bits2 in deals:
+            assert CardSet(bits1).popcount() == 1 and not bits1 & bits2
+            assert bits1 | bits2 == unrevealed_bits
+        plays = [Play(0, [Card('3', 'd')], 0, play_type=SINGLES),
+                 Play(0, Card.strs_to_cards(computer_card_strs), 1, play_type=TRIPLES)]
+        results = estimate_play_results(plays, computer, game_state, deals=deals)
+        assert len(results) == 2 and all(len(play_results) == 20 for play_results in results)
+        assert results[1] == [1] * 20
+        # the same deal always plays out the same way
+        assert estimate_play_results(plays[:1], computer, game_state, deals=deals)[0] == results[0]
+
+    def test_best_play_paired(self):
+        """tests best play on common deals"""
+        computer_card_strs = ['3d', '3s', '3c', '4c']
+        unrevealed_card_strs = ['Qd', 'Qs', 'Qc', '7c', 'Kd', 'Ks', 'Kc', '8d']
+        game_state, computer = TestMC.generate_game_state(computer_card_strs, unrevealed_card_strs, 1)
+        win = Play(0, Card.strs_to_cards(computer_card_strs), 1, play_type=TRIPLES)
+        single = Play(0, [Card('3', 'd')], 0, play_type=SINGLES)
+        assert get_best_play(iter([single, win]), computer, game_state, method=PAIRED) == win
+
+    def test_confidence_interval(self):
+        """tests the confidence interval of a win rate"""
+        assert get_confidence_interval(0, 0) == (0.0, 1.0)
+        low, high = get_confidence_interval(50, 100)
+        assert low < 0.5 < high and abs((0.5 - low) - (high - 0.5)) < 1e-9
+        narrow_low, narrow_high = get_confidence_interval(500, 1000)
+        assert narrow_high - narrow_low < high - low
+        assert get_confidence_interval(100, 100)[1] > 0.999
+
+    def test_is_best_separated(self):
+        """tests the best play is only separated when the intervals do not overlap"""
+        assert is_best_separated([100, 10], 100)
+        assert not is_best_separated([52, 48], 100)
+        assert is_best_separated([30], 100)
+        assert not is_best_separated([], 0)
+
+    def test_estimate_play_strengths_adaptive(self):
+        """tests adaptive estimation stops early on an obvious decision"""
+        computer_card_strs = ['3d', '3s', '3c', '4c']
+        unrevealed_card_strs = ['Qd', 'Qs', 'Qc', '7c', 'Kd', 'Ks', 'Kc', '8d']
+        game_state, computer = TestMC.generate_game_state(computer_card_strs, unrevealed_card_strs, 1)
+        plays = [Play(0, Card.strs_to_cards(computer_card_strs), 1, play_type=TRIPLES), None]
+        strengths, n_games = estimate_play_strengths_adaptive(plays, computer, game_state,
+                                                              max_games=1000, round_games=50)
+        assert strengths[0] == 1
+        assert n_games < 1000 and n_games % 50 == 0
+        win = Play(0, Card.strs_to_cards(computer_card_strs), 1, play_type=TRIPLES)
+        best_play = get_best_play(iter([win]), computer, game_state, method=ADAPTIVE)
+        assert best_play == win and best_play.rollouts == ROUND_SIMULATIONS
+
+    def test_estimate_hand_strength_adaptive(self):
+        """tests adaptive hand strength respects the budget"""
+        strength, n_games = estimate_hand_strength_adaptive(self.test_player_lv4, self.game_state,
+                                                            precision=0.001, max_games=200)
+        assert 0 <= strength <= 1 and n_games == 200
+        strength, n_games = estimate_hand_strength_adaptive(self.test_player_lv4, self.game_state,
+                                                            precision=0.5)
+        assert n_games == ROUND_SIMULATIONS
+
+    def test_estimate_play_strengths_bandit(self):
+        """tests successive halving spends more games on the stronger plays"""
+        computer_card_strs = ['3d', '3s', '3c', '4c']
+        unrevealed_card_strs = ['Qd', 'Qs', 'Qc', '7c', 'Kd', 'Ks', 'Kc', '8d']
+        game_state, computer = TestMC.generate_game_state(computer_card_strs, unrevealed_card_strs, 1)
+        plays = [Play(0, [Card('3', 'd')], 0, play_type=SINGLES),
+                 Play(0, [Card('4', 'c')], 0, play_type=SINGLES),
+                 Play(0, Card.strs_to_cards(computer_card_strs), 1, play_type=TRIPLES)]
+        strengths, games = estimate_play_strengths_bandit(plays, computer, game_state, budget=300)
+        assert strengths[2] == 1
+        assert games[2] == max(games) and games[2] > min(games)
+        assert sum(games) <= 300
+        assert estimate_play_strengths_bandit([], computer, game_state) == ([], [])
+
+    def test_best_play_bandit(self):
+        """tests best play by successive halving"""
+        computer_card_strs = ['3d', '3s', '3c', '4c']
+        unrevealed_card_strs = ['Qd', 'Qs', 'Qc', '7c', 'Kd', 'Ks', 'Kc', '8d']
+        game_state, computer = TestMC.generate_game_state(computer_card_strs, unrevealed_card_strs, 1)
+        win = Play(0, Card.strs_to_cards(computer_card_strs), 1, play_type=TRIPLES)
+        single = Play(0, [Card('3', 'd')], 0, play_type=SINGLES)
+        assert get_best_play(iter([single, win]), computer, game_state, method=BANDIT) == win
+        with pytest.raises(ValueError):
+            get_best_play(iter([single]), computer, game_state, method='unknown')
+
+    def test_strength_cache(self):
+        """tests cached games are topped up and least recently used positions are dropped"""
+        cache = StrengthCache(maxsize=2)
+        assert cache.lookup('a', 10) == (0, 0)
+        cache.add('a', 3, 5)
+        assert cache.lookup('a', 10) == (3, 5)
+        cache.add('a', 4, 5)
+        assert cache.lookup('a', 10) == (7, 10)
+        cache.add('b', 1, 1)
+        cache.lookup('a', 10)
+        cache.add('c', 1, 1)
+        assert len(cache) == 2 and cache.lookup('b', 1) == (0, 0)
+        statistics = cache.get_statistics()
+        assert (statistics['hits'], statistics['top_ups'], statistics['misses']) == (2, 1, 2)
+        assert statistics['hit_rate'] == 0.4 and statistics['size'] == 2
+        cache.clear()
+        assert not len(cache) and cache.get_hit_rate() == 0
+
+    def test_estimate_play_strengths_cached(self):
+        """tests estimated positions are reused and topped up"""
+        computer_card_strs = ['3d', '3s', '3c', '4c']
+        # too many deals to be estimated exactly
+        unrevealed_card_strs = ['Qd', 'Qs', 'Qc', '7c', 'Kd', 'Ks', 'Kc', '8d', '5d', '5s', '6d', '6s', '9d', '9s', '0d', '0s']
+        game_state, computer = TestMC.generate_game_state(computer_card_strs, unrevealed_card_strs, 8)
+        plays = [Play(0, [Card('3', 'd')], 0, play_type=SINGLES),
+                 Play(0, [Card('3', 'd')], 0, play_type=SINGLES), None]
+        cache = get_strength_cache()
+        cache.clear()
+        strengths = estimate_play_strengths(plays, computer, game_state, n_games=100)
+        # the two plays lead to the same position, which is simulated once
+        assert strengths[0] == strengths[1]
+        assert len(cache) == 2 and cache.misses == 2
+
+        assert estimate_play_strengths(plays, computer, game_state, n_games=100) == strengths
+        assert cache.hits == 2
+        estimate_play_strengths(plays, computer, game_state, n_games=150)
+        assert cache.top_ups == 2
+        bits, game_state_sim = _get_position_after_play(plays[0], computer, game_state)
+        assert cache.lookup(get_position_key(bits, 0, game_state_sim), 0)[1] == 150
+        estimate_play_strengths(plays[:1], computer, game_state, n_games=100, use_cache=False)
+        assert cache.get_statistics()['size'] == 2
+
+    def test_get_exact_deals(self):
+        """tests deals are enumerated once up to suits with their number of suit variants"""
+        computer_card_strs = ['3d', '3s', '3c', '4c']
+        unrevealed_card_strs = ['Qd', 'Qs', 'Qc', '7c', 'Kd', 'Ks', 'Kc', '8d']
+        game_state, computer = TestMC.generate_game_state(computer_card_strs, unrevealed_card_strs, 3)
+        bits = computer.hand.get_card_set().bits
+        deals = get_exact_deals(bits, 0, game_state)
+        assert sum(weight for _, weight in deals) == choose(8, 3)
+        splits = set()
+        for (bits1, bits2), _ in deals:
+            assert not bits1 & bits2
+            assert bits1 | bits2 == CardSet.from_cards(Card.strs_to_cards(unrevealed_card_strs)).bits
+            assert CardSet(bits1).popcount() == 3
+            splits.add((tuple(CardSet(bits1).get_value_counts()), tuple(CardSet(bits2).get_value_counts())))
+        assert len(splits) == len(deals)
+        assert get_exact_deals(bits, 0, game_state, max_deals=choose(8, 3) - 1) is None
+
+    def test_estimate_exact_strength(self):
+        """tests small endgames are estimated exactly"""
+        computer_card_strs = ['3d', '3s', '3c', '4c']
+        unrevealed_card_strs = ['Qd', 'Qs', 'Qc', '7c', 'Kd', 'Ks', 'Kc', '8d']
+        game_state, computer = TestMC.generate_game_state(computer_card_strs, unrevealed_card_strs, 1)
+        game_state.current_turn = 0
+        # the triple with a kicker wins on every deal
+        assert estimate_hand_strength(computer, game_state) == 1
+        plays = [Play(0, [Card('3', 'd')], 0, play_type=SINGLES), None]
+        cache = get_strength_cache()
+        cache.clear()
+        strengths = estimate_play_strengths(plays, computer, game_state, n_games=10)
+        assert estimate_play_strengths(plays, computer, game_state, n_games=10) == strengths
+        assert not len(cache)
+
+    def test_task_seeds(self):
+        """tests every task gets its own seed drawn from the stream, or none without a stream"""
+        assert get_task_seeds(None, 3) == [None] * 3
+        seeds = get_task_seeds(random.Random(1), 8)
+        assert len(set(seeds)) == 8 and seeds == get_task_seeds(get_rng(1), 8)
+        rng = random.Random(2)
+        assert get_rng(rng) is rng and get_rng(None) is None
+
+    def test_seeded_simulate(self):
+        """tests seeded deals and games are reproducible"""
+        computer = self.test_player_lv1
+        deals = sample_deals(computer, self.game_state, 20, random.Random(3))
+        assert deals == sample_deals(computer, self.game_state, 20, random.Random(3))
+        assert deals != sample_deals(computer, self.game_state, 20, random.Random(4))
+        wins = simulate(computer, 300, self.game_state, rng=3)
+        assert wins == simulate(computer, 300, self.game_state, rng=3)
+
+    def test_seeded_simulate_multiprocesses(self):
+        """tests each chunk plays from its own seed whichever worker runs it"""
+        bits = self.test_player_lv3.hand.get_card_set().bits
+        wins = simulate_multiprocesses(self.test_player_lv3, 400, self.game_state, 2, rng=5)
+        assert wins == simulate_multiprocesses(self.test_player_lv3, 400, self.game_state, 2, rng=5)
+        seeds = get_task_seeds(random.Random(5), 2)
+        assert wins == sum(_simulation_chunk((bits, 0, self.game_state, 200, seed)) for seed in seeds)
+
+    def test_seeded_play_strengths(self):
+        """tests seeded play strengths are reproducible for every estimation method"""
+        game_state = GameState(17, 17)
+        game_state.increment_turn()
+        game_state.increment_turn()
+        game_state.cards_played(Play(2, [Card('3', 'h')], 0, play_type=SINGLES))
+        game_state.increment_turn()
+        plays = [Play(0, [card], 0, play_type=SINGLES) for card in Card.strs_to_cards(['5h', '0d', 'Ac'])]
+        plays.append(None)
+        computer = self.test_player_lv1
+        cache_size = len(get_strength_cache())
+        strengths = estimate_play_strengths(plays, computer, game_state, n_games=200, rng=6)
+        # seeded estimates neither read nor fill the cache
+        assert len(get_strength_cache()) == cache_size
+        assert strengths == estimate_play_strengths(plays, computer, game_state, n_games=200, rng=6)
+        for method in [PAIRED, ADAPTIVE, BANDIT]:
+            best_plays = [get_best_play(plays[0: 3], computer, game_state, method=method, rng=7)
+                          for _ in range(2)]
+            assert best_plays[0] == best_plays[1]
+            assert (best_plays[0].strength, best_plays[0].rollouts) ==\
+                   (best_plays[1].strength, best_plays[1].rollouts)
+
+    def test_simulate_interrupted(self, monkeypatch):
+        """tests the hand is restored when a game fails part way"""
+        computer = self.test_player_lv1
+        n_cards = computer.hand.num_cards()
+        def failing_game(player, game_state, display, rng=None):
+            player.play(Play(0, [player.hand.get_cards()[0]], 0, play_type=SINGLES))
+            raise KeyboardInterrupt
+        monkeypatch.setattr(monte_carlo, 'simulate_one_random_game', failing_game)
+        with pytest.raises(KeyboardInterrupt):
+            simulate(computer, 10, self.game_state)
+        assert computer.hand.num_cards() == n_cards
@@ -0,0 +1,172 @@
+"""
+Testing module for move_generator.py
+"""
+
+import random
+
+from pokai.game.card import Card
+from pokai.game.hand import Hand
+from pokai.game.card_play import Play
+from pokai.game.game_tools import get_new_shuffled_deck, SINGLES, DOUBLES, TRIPLES, QUADRUPLES,\
+                                 STRAIGHTS, DOUBLE_STRAIGHTS, ADJ_TRIPLES, DOUBLE_JOKER
+from pokai.game.move_generator import Move, get_level_masks, generate_basics, generate_straights,\
+                                      generate_adj_triples, generate_wilds, get_lowest_basic,\
+                                      get_lowest_straight, get_lowest_adj_triple, get_lowest_wild,\
+                                      make_cards, get_legal_moves
+
+from tests.play_checker import _check_single, _check_double, _check_triple, _check_adj_triple,\
+                               _check_quadruples, _check_straight, _check_wild
+
+# if you want to run more random tests, increase
+TEST_MULTIPLIER = 1
+
+def _get_random_hands(num_hands, num_cards=17):
+    """returns a list of random hands"""
+    hands = []
+    for _ in range(num_hands):
+        hands.append(Hand(get_new_shuffled_deck()[0: num_cards]))
+    return hands
+
+class TestMoveGenerator(object):
+    """
+    Test class for the move generator
+    """
+
+    def setup_method(self):
+        self.hand = Hand(Card.strs_to_cards(['3s', '4s', '5h', '5s', '6s', '6h', '6d', '7s',
+                                             '7h', '7d', '8c', '8d', '8h', 'Z0', 'Z1']))
+        self.masks = get_level_masks(self.hand.get_counts())
+
+    def test_level_masks(self):
+        """tests level masks match the hand"""
+        assert self.masks == self.hand._level_masks
+
+    def test_basics(self):
+        """tests basics are above base and lowest first"""
+        moves = list(generate_basics(self.masks, 2, base=Card('5', 'h').value))
+        assert [m.base for m in moves] == [3, 4, 5]
+
+    def test_triple_kickers(self):
+        """tests triples carry the lowest kicker not in the base"""
+        move = get_lowest_basic(self.masks, 3, num_extra=2)
+        assert move == Move('triples', 3, 1, (2, 2))
+
+    def test_straights_lead(self):
+        """tests the longest straight is led"""
+        move = get_lowest_straight(self.masks, 1)
+        assert move.base == 0 and move.length == 6
+
+    def test_straights_windows(self):
+        """tests every window of the given length above base is generated"""
+        moves = list(generate_straights(self.masks, 2, base=2, length=3))
+        assert [m.base for m in moves] == [3]
+        assert moves[0].play_type == DOUBLE_STRAIGHTS
+
+    def test_adj_triples(self):
+        """tests adj triples with kickers"""
+        moves = list(generate_adj_triples(self.masks, num_extra=2))
+        assert [(m.base, m.kickers) for m in moves] == [((3, (0, 1))), (4, (0, 1))]
+
+    def test_wilds(self):
+        """tests the double joker is generated last"""
+        moves = list(generate_wilds(self.masks))
+        assert moves[-1].play_type == DOUBLE_JOKER
+        assert make_cards(moves[-1], self.hand._rank_cards) == [Card('Z', 1), Card('Z', 0)]
+
+    def test_lowest_matches_generated(self):
+        """tests the lowest move lookups agree with the generators on random hands"""
+        for h in _get_random_hands(TEST_MULTIPLIER * 300):
+            masks = h._level_masks
+            base = random.randint(-1, 12)
+            for each_count in range(1, 5):
+                for extra in [0, 1, 2, 4]:
+                    generated = next(generate_basics(masks, each_count, base, extra), None)
+                    assert get_lowest_basic(masks, each_count, base, extra) == generated
+            for each_count, length in [(1, 5), (1, 7), (2, 3), (2, 4)]:
+                generated = next(generate_straights(masks, each_count, base, length), None)
+                assert get_lowest_straight(masks, each_count, base, length) == generated
+            for extra in [0, 2, 4]:
+                generated = next(generate_adj_triples(masks, base, extra), None)
+                assert get_lowest_adj_triple(masks, base, extra) == generated
+            assert get_lowest_wild(masks, base) == next(generate_wilds(masks, base), None)
+
+    def test_generated_plays_valid(self):
+        """tests every generated straight and adj triple is a valid play"""
+        for h in _get_random_hands(TEST_MULTIPLIER * 300, num_cards=20):
+            c = random.choice(h.get_cards() + [None])
+            for play in h.generate_possible_straights(c, 1, 5):
+                _check_straight(play.cards, 1)
+            for play in h.generate_possible_straights(c, 2, 3):
+                _check_straight(play.cards, 2)
+            for extra in [0, 2, 4]:
+                for play in h.generate_possible_adj_triples(c, extra):
+                    _check_adj_triple(play.cards, extra)
+            for play in h.generate_possible_wilds(c):
+                _check_wild(play.cards)
+
+class TestLegalMoves(object):
+    """
+    Test class for the full legal move enumeration
+    """
+
+    def setup_method(self):
+        self.hand = Hand(Card.strs_to_cards(['3s', '3d', '3h', '4s', '4d', '4h', '5h', '5s',
+                                             '6s', '7h', '8d', '9c', '0c', 'Z0', 'Z1',
+                                             '2c', '2d', '2h', '2s']))
+
+    def test_lead_counts(self):
+        """tests the number of leads of each kind"""
+        plays = self.hand.all_legal_plays(None)
+        play_types = [play.play_type for play in plays]
+        assert play_types.count(DOUBLE_JOKER) == 1
+        # 3 to 10 gives straights of length 5 to 8
+        assert play_types.count(STRAIGHTS) == 4 + 3 + 2 + 1
+        # 33344 455 has one double straight
+        assert play_types.count(DOUBLE_STRAIGHTS) == 1
+
+    def test_triple_with_every_kicker(self):
+        """tests every single kicker is offered with a triple"""
+        prev_play = Play(1, Card.strs_to_cards(['7s', '7c', '7d', '5c']), 1, play_type=TRIPLES)
+        plays = self.hand.all_legal_plays(prev_play)
+        triples = [play for play in plays if play.play_type == TRIPLES]
+        # 222 with any of the 10 other values
+        assert len(triples) == 10
+        for play in triples:
+            _check_triple(play.cards)
+            assert play.num_extra == 1
+        assert plays[-1].play_type == DOUBLE_JOKER
+
+    def test_follow_includes_lowest(self):
+        """tests the lowest play of the fixed strategy is one of the legal plays"""
+        for h in _get_random_hands(TEST_MULTIPLIER * 100):
+            c = random.choice(h.get_cards())
+            prev_play = Play(1, [c], 0, play_type=SINGLES)
+            plays = h.all_legal_plays(prev_play)
+            low = h.get_low(c, 1)
+            if low:
+                assert low in [Play(-1, p.cards, 0, p.play_type) for p in plays]
+            for play in plays:
+                assert play.play_type in [SINGLES, QUADRUPLES, DOUBLE_JOKER]
+
+    def test_legal_plays_valid_and_distinct(self):
+        """tests every lead is a valid play and there are no duplicates"""
+        checkers = {SINGLES: _check_single, DOUBLES: _check_double, TRIPLES: _check_triple,
+                    QUADRUPLES: _check_quadruples, DOUBLE_JOKER: _check_wild}
+        for h in _get_random_hands(TEST_MULTIPLIER * 50, num_cards=20):
+            moves = h.all_legal_moves(None)
+            assert len(set(moves)) == len(moves)
+            for play in h.all_legal_plays(None):
+                assert Play.get_play_from_cards(play.cards).play_type == play.play_type
+                if play.play_type in checkers:
+                    checkers[play.play_type](play.cards)
+                elif play.play_type == ADJ_TRIPLES:
+                    _check_adj_triple(play.cards, play.num_extra)
+                else:
+                    _check_straight(play.cards, 1 if play.play_type == STRAIGHTS else 2)
+
+    def test_legal_moves_memoized(self):
+        """tests the same histogram and previous play hit the cache"""
+        get_legal_moves.cache_clear()
+        self.hand.all_legal_moves(None)
+        Hand(self.hand.get_cards()).all_legal_moves(Play.get_pass_play())
+        assert get_legal_moves.cache_info().hits == 1
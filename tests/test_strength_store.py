@@ -0,0 +1,130 @@
+"""
+Testing module for the on disk strength store
+"""
+
+import multiprocessing
+import sqlite3
+
+import pytest
+
+from pokai.ai.monte_carlo import StrengthCache, get_strength_cache, get_strength_store,\
+                                 use_strength_store, close_strength_store, estimate_play_strengths
+from pokai.ai.strength_store import StrengthStore, STORE_VERSION
+from pokai.game.card import Card
+from pokai.game.card_play import Play
+from pokai.game.game_state import GameState
+from pokai.game.game_tools import SINGLES, get_new_ordered_deck, remove_from_deck
+from pokai.game.hand import Hand
+from pokai.game.player import Player
+
+def _add_games(path):
+    store = StrengthStore(path)
+    for _ in range(50):
+        store.add_many([('a', 1, 2), ('b', 0, 1)])
+    store.close()
+
+class TestStrengthStore(object):
+    """
+    Test class for the strength store
+    """
+
+    def test_add_and_lookup(self, tmp_path):
+        """tests games are added to the stored counts"""
+        store = StrengthStore(str(tmp_path / 'strengths.db'))
+        assert store.lookup('a') == (0, 0)
+        store.add('a', 3, 5)
+        store.add_many([('a', 1, 5), ('b', 2, 2), ('c', 0, 0)])
+        assert store.lookup('a') == (4, 10) and store.lookup('b') == (2, 2)
+        assert len(store) == 2
+        store.close()
+        assert StrengthStore(str(tmp_path / 'strengths.db')).lookup('a') == (4, 10)
+
+    def test_schema_version(self, tmp_path):
+        """tests stores of another version are rejected and the current version is reopened"""
+        path = str(tmp_path / 'strengths.db')
+        StrengthStore(path).close()
+        connection = sqlite3.connect(path)
+        assert connection.execute('PRAGMA user_version').fetchone()[0] == STORE_VERSION
+        connection.close()
+        StrengthStore(path).close()
+
+        # a store of the first version, with text keys and no user_version
+        old_path = str(tmp_path / 'old.db')
+        connection = sqlite3.connect(old_path)
+        connection.execute('CREATE TABLE positions '
+                           '(key TEXT PRIMARY KEY, wins INTEGER NOT NULL, games INTEGER NOT NULL)')
+        connection.close()
+        with pytest.raises(ValueError):
+            StrengthStore(old_path)
+
+    def test_concurrent_writers(self, tmp_path):
+        """tests no games are lost when several processes write at once"""
+        path = str(tmp_path / 'strengths.db')
+        StrengthStore(path).close()
+        processes = [multiprocessing.Process(target=_add_games, args=(path,)) for _ in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        store = StrengthStore(path)
+        assert store.lookup('a') == (200, 400) and store.lookup('b') == (0, 200)
+
+    def test_warm_load(self, tmp_path):
+        """tests the most simulated positions are loaded into the cache"""
+        store = StrengthStore(str(tmp_path / 'strengths.db'))
+        store.add_many([('a', 1, 10), ('b', 1, 30), ('c', 1, 20)])
+        cache = StrengthCache(maxsize=2)
+        assert store.warm_load(cache) == 2
+        assert cache.lookup('b', 0) == (1, 30) and cache.lookup('c', 0) == (1, 20)
+        assert cache.lookup('a', 0) == (0, 0)
+
+    def test_use_store_twice(self, tmp_path):
+        """tests opening the same store again does not add its games to the cached ones"""
+        path = str(tmp_path / 'strengths.db')
+        store = StrengthStore(path)
+        store.add_many([('a', 1, 10), ('b', 3, 30)])
+        store.close()
+        cache = get_strength_cache()
+        try:
+            cache.add('b', 2, 5)
+            for _ in range(2):
+                use_strength_store(path)
+                assert cache.lookup('a', 0) == (1, 10) and cache.lookup('b', 0) == (3, 30)
+                assert len(cache) == 2
+        finally:
+            close_strength_store()
+            cache.clear()
+
+    def test_estimates_use_store(self, tmp_path):
+        """tests estimates are recorded in the store and reused by a later run"""
+        computer_card_strs = ['3d', '3s', '3c', '4c']
+        unrevealed_card_strs = ['Qd', 'Qs', 'Qc', '7c', 'Kd', 'Ks', 'Kc', '8d', '5d', '5s', '6d', '6s', '9d', '9s', '0d', '0s']
+        game_state = GameState(20, 17)
+        game_state.used_cards = remove_from_deck(get_new_ordered_deck(),
+                                                 Card.strs_to_cards(computer_card_strs + unrevealed_card_strs))
+        game_state.player_cards = [4, 8, 8]
+        game_state.current_turn = 0
+        computer = Player(Hand(Card.strs_to_cards(computer_card_strs)), 0, "")
+        plays = [Play(0, [Card('3', 'd')], 0, play_type=SINGLES), None]
+
+        path = str(tmp_path / 'strengths.db')
+        cache = get_strength_cache()
+        try:
+            cache.clear()
+            use_strength_store(path)
+            strengths = estimate_play_strengths(plays, computer, game_state, n_games=100)
+            assert len(get_strength_store()) == 2
+
+            # a new run starts with an empty cache and warm loads the store
+            cache.clear()
+            use_strength_store(path)
+            assert len(cache) == 2
+            assert estimate_play_strengths(plays, computer, game_state, n_games=100) == strengths
+
+            # positions missing from the cache are looked up in the store
+            cache.clear()
+            assert estimate_play_strengths(plays, computer, game_state, n_games=100) == strengths
+            assert cache.misses == 2
+        finally:
+            close_strength_store()
+            cache.clear()